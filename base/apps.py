@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class BaseConfig(AppConfig):
+    name = "base"
+
+    def ready(self):
+        from base import signals  # noqa: F401
+        from base.utils.db_router import check_db_pin_cache
+        from base.utils.throttling import check_throttle_cache
+
+        check_throttle_cache()
+        check_db_pin_cache()
@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Boot gunicorn with gunicorn.conf.py and a single worker, then time how long until it answers "
+        "and how much slower the first request to --path is than the next ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--path", default="/api/health/", help="Path whose first-request latency is measured")
+        parser.add_argument("--token", default=None, help="Bearer token for authenticated paths")
+        parser.add_argument("--follow-up", type=int, default=5, help="Warm requests timed after the first one")
+        parser.add_argument("--boot-timeout", type=float, default=60.0)
+
+    def _get(self, url, headers):
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=30) as r:
+                r.read()
+        except urllib.error.HTTPError:
+            pass
+        return (time.perf_counter() - started) * 1000
+
+    def handle(self, *args, **options):
+        base_url = f"http://127.0.0.1:{options['port']}"
+        headers = {"Authorization": f"Bearer {options['token']}"} if options["token"] else {}
+        env = {**os.environ, "WEB_CONCURRENCY": "1", "PORT": str(options["port"])}
+
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            [
+                sys.executable, "-m", "gunicorn",
+                "-c", str(settings.BASE_DIR / "gunicorn.conf.py"),
+                "rd_studio_backend.wsgi:application",
+            ],
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            # Poll a path that isn't being measured, so the first --path hit stays cold
+            probe = f"{base_url}/__cold_start_probe__/"
+            while True:
+                if server.poll() is not None:
+                    raise CommandError(f"gunicorn exited with status {server.returncode} before answering")
+                if time.perf_counter() - started > options["boot_timeout"]:
+                    raise CommandError("gunicorn did not answer within --boot-timeout")
+                try:
+                    urllib.request.urlopen(probe, timeout=1).read()
+                    break
+                except urllib.error.HTTPError:
+                    break
+                except OSError:
+                    time.sleep(0.05)
+            boot_ms = (time.perf_counter() - started) * 1000
+
+            first_ms = self._get(base_url + options["path"], headers)
+            warm = sorted(self._get(base_url + options["path"], headers) for _ in range(options["follow_up"]))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+        warm_ms = warm[len(warm) // 2] if warm else 0.0
+        self.stdout.write(
+            f"boot={boot_ms:.0f}ms first_request={first_ms:.1f}ms warm_median={warm_ms:.1f}ms "
+            f"cold_penalty={first_ms - warm_ms:.1f}ms"
+        )
@@ -0,0 +1,57 @@
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer a running server with concurrent GETs and report throughput and latency. "
+        "Run once against the WSGI profile and once against gunicorn.asgi.conf.py to compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--path", action="append", help="Path to request (repeatable); defaults to api/health/")
+        parser.add_argument("--token", default=None, help="Bearer token for authenticated paths")
+        parser.add_argument("--concurrency", type=int, default=100)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--timeout", type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        base_url = options["base_url"].rstrip("/")
+        paths = options["path"] or ["/api/health/"]
+        headers = {"Authorization": f"Bearer {options['token']}"} if options["token"] else {}
+
+        def fetch(index):
+            url = base_url + paths[index % len(paths)]
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=options["timeout"]) as r:
+                    r.read()
+                    ok = r.status < 500
+            except urllib.error.HTTPError as e:
+                ok = e.code < 500
+            except OSError:
+                ok = False
+            return ok, (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            results = list(executor.map(fetch, range(options["requests"])))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for _, latency in results)
+        errors = sum(1 for ok, _ in results if not ok)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+        self.stdout.write(
+            f"requests={len(results)} concurrency={options['concurrency']} errors={errors}\n"
+            f"throughput={len(results) / elapsed:.1f} req/s "
+            f"p50={statistics.median(latencies):.1f}ms p95={percentile(0.95):.1f}ms p99={percentile(0.99):.1f}ms"
+        )
@@ -0,0 +1,73 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+
+from base.models import CreditLedger, User
+from base.utils.credits import InsufficientCredit, debit_credit
+
+
+class Command(BaseCommand):
+    help = (
+        "Stress the credit debit path with parallel uploads against a throwaway user and verify no updates "
+        "are lost. Needs PostgreSQL; SQLite serialises writers and will report lock errors instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--parallel", type=int, default=100)
+        parser.add_argument("--credits", type=int, default=60, help="Starting balance; keep below --parallel")
+
+    def handle(self, *args, **options):
+        parallel = options["parallel"]
+        credits = options["credits"]
+
+        marker = uuid.uuid4().hex[:12]
+        user = User.objects.create(
+            username=f"bench-{marker}@example.invalid",
+            email=f"bench-{marker}@example.invalid",
+            phone=f"bench-{marker}",
+            remaining_credit=credits,
+        )
+
+        def upload(_):
+            try:
+                debit_credit(user.id)
+                return True
+            except InsufficientCredit:
+                return False
+            finally:
+                # Each worker thread opened its own connection
+                close_old_connections()
+                connection.close()
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=parallel) as executor:
+                results = list(executor.map(upload, range(parallel)))
+            elapsed = time.perf_counter() - started
+
+            user.refresh_from_db()
+            succeeded = sum(results)
+            ledger_rows = CreditLedger.objects.filter(user=user).count()
+            expected_success = min(parallel, credits)
+
+            self.stdout.write(
+                f"parallel={parallel} start={credits} succeeded={succeeded} rejected={parallel - succeeded} "
+                f"remaining={user.remaining_credit} used={user.used_credit} ledger_rows={ledger_rows} "
+                f"elapsed={elapsed * 1000:.0f}ms"
+            )
+
+            consistent = (
+                succeeded == expected_success
+                and user.remaining_credit == credits - succeeded
+                and user.used_credit == succeeded
+                and ledger_rows == succeeded
+            )
+        finally:
+            user.delete()
+
+        if not consistent:
+            raise CommandError("Lost or duplicated credit updates detected")
+        self.stdout.write(self.style.SUCCESS("No lost updates"))
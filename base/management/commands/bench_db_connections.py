@@ -0,0 +1,72 @@
+import copy
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from base.models import User
+
+MODES = ("per-request", "persistent", "pool")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request latency of a small query when every request opens a new Postgres "
+        "connection, keeps a persistent per-thread one, or checks one out of a psycopg pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mode", action="append", choices=MODES, help="Mode to run (repeatable); default all")
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=8, help="Threads, like gthread threads per worker")
+        parser.add_argument("--pool-size", type=int, default=None, help="Pool max_size; defaults to --concurrency")
+
+    def _register_alias(self, mode, pool_size):
+        settings_dict = copy.deepcopy(connections["default"].settings_dict)
+        options = {key: value for key, value in settings_dict["OPTIONS"].items() if key != "pool"}
+        if mode == "pool":
+            options["pool"] = {"min_size": pool_size, "max_size": pool_size, "timeout": 30}
+        settings_dict["OPTIONS"] = options
+        settings_dict["CONN_MAX_AGE"] = 600 if mode == "persistent" else 0
+
+        alias = f"bench_{mode.replace('-', '_')}"
+        connections.settings[alias] = settings_dict
+        return alias
+
+    def handle(self, *args, **options):
+        if connections["default"].vendor != "postgresql":
+            raise CommandError("This benchmark needs the PostgreSQL database configured in DATABASES")
+
+        pool_size = options["pool_size"] or options["concurrency"]
+        for mode in options["mode"] or MODES:
+            alias = self._register_alias(mode, pool_size)
+
+            def handle_request(_):
+                connection = connections[alias]
+                started = time.perf_counter()
+                User.objects.using(alias).only("id").first()
+                # What Django does when a request finishes (request_finished -> close_old_connections)
+                connection.close_if_unusable_or_obsolete()
+                return (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+                latencies = sorted(executor.map(handle_request, range(options["requests"])))
+            elapsed = time.perf_counter() - started
+
+            line = (
+                f"{mode:<12} requests={len(latencies)} throughput={len(latencies) / elapsed:.0f} req/s "
+                f"p50={statistics.median(latencies):.2f}ms "
+                f"p95={latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]:.2f}ms"
+            )
+            if mode == "pool":
+                stats = connections[alias].pool.get_stats()
+                line += (
+                    f" connections_opened={stats.get('connections_num', 0)}"
+                    f" waits={stats.get('requests_queued', 0)}"
+                    f" wait_ms_total={stats.get('requests_wait_ms', 0)}"
+                )
+                connections[alias].close_pool()
+            self.stdout.write(line)
@@ -0,0 +1,50 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from base.models import User
+from base.utils.passwords import PasswordVerificationBusy, calibrate_hasher, hash_password, verify_user_password
+
+
+class Command(BaseCommand):
+    help = "Measure password-check throughput and latency through the bounded hashing pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--target-ms", type=int, default=None)
+
+    def handle(self, *args, **options):
+        iterations = calibrate_hasher(options["target_ms"])
+        self.stdout.write(f"Calibrated PBKDF2 iterations: {iterations}")
+
+        # Unsaved user with an up-to-date hash, so no rehash (and no DB write) is triggered
+        user = User(phone="0000000000", password=hash_password("bench-password"))
+
+        def attempt(_):
+            started = time.perf_counter()
+            try:
+                verify_user_password(user, "bench-password")
+            except PasswordVerificationBusy:
+                return None
+            return (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            results = list(executor.map(attempt, range(options["requests"])))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(r for r in results if r is not None)
+        rejected = len(results) - len(latencies)
+        if not latencies:
+            self.stdout.write(self.style.ERROR(f"All {rejected} attempts were rejected as busy"))
+            return
+
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f"requests={len(results)} concurrency={options['concurrency']} rejected={rejected}\n"
+            f"throughput={len(latencies) / elapsed:.1f}/s "
+            f"p50={statistics.median(latencies):.1f}ms p99={p99:.1f}ms"
+        )
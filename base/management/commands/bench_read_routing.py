@@ -0,0 +1,63 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay GET requests in-process and report how many queries and how much DB time each "
+        "database alias served. With replicas configured (DB_REPLICA_HOSTS), the primary's share "
+        "is what remains of its read load. --write-path sends a POST first to show read-your-writes pinning."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", action="append", help="GET path (repeatable); defaults to api/health/")
+        parser.add_argument("--token", default=None, help="Bearer token for authenticated paths")
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--write-path", default=None, help="POST this path before the GETs")
+
+    def handle(self, *args, **options):
+        if not settings.DB_REPLICA_ALIASES:
+            self.stdout.write("No replicas configured; every query will be served by the primary.")
+
+        paths = options["path"] or ["/api/health/"]
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {options['token']}"} if options["token"] else {}
+        client = Client(**headers)
+        totals = {alias: {"queries": 0, "ms": 0.0} for alias in connections}
+
+        def counter(alias):
+            def wrapper(execute, sql, params, many, context):
+                started = time.perf_counter()
+                try:
+                    return execute(sql, params, many, context)
+                finally:
+                    totals[alias]["queries"] += 1
+                    totals[alias]["ms"] += (time.perf_counter() - started) * 1000
+
+            return wrapper
+
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(counter(alias)))
+
+            if options["write_path"]:
+                response = client.post(options["write_path"])
+                if response.status_code >= 400:
+                    raise CommandError(f"POST {options['write_path']} returned {response.status_code}")
+                # Only the reads that follow the write are of interest
+                for alias in totals:
+                    totals[alias] = {"queries": 0, "ms": 0.0}
+
+            for index in range(options["requests"]):
+                client.get(paths[index % len(paths)])
+
+        all_ms = sum(alias_totals["ms"] for alias_totals in totals.values()) or 1.0
+        for alias, alias_totals in totals.items():
+            self.stdout.write(
+                f"{alias:<12} queries={alias_totals['queries']} db_time={alias_totals['ms']:.1f}ms "
+                f"share={alias_totals['ms'] / all_ms * 100:.0f}%"
+            )
@@ -0,0 +1,82 @@
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter: boot Django through the WSGI entry point and time the first request
+FIRST_REQUEST_SCRIPT = """
+import time
+started = time.perf_counter()
+from rd_studio_backend.wsgi import application
+from django.test import Client
+booted = time.perf_counter()
+Client().get({path!r})
+done = time.perf_counter()
+print(f"{{(booted - started) * 1000:.1f}} {{(done - booted) * 1000:.1f}}")
+"""
+
+
+def _parse_importtime(stderr):
+    """
+    Return [(cumulative_us, module)] for top-level imports in `-X importtime` output, largest first.
+
+    Nested imports are indented under their parent and already counted in its
+    cumulative time, so only unindented rows are kept.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative_us, module = line[len("import time:"):].split("|")
+        module = module[1:].rstrip()
+        if cumulative_us.strip().isdigit() and not module.startswith(" "):
+            rows.append((int(cumulative_us), module))
+    return sorted(rows, reverse=True)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure process startup with `python -X importtime`: wall time of `manage.py check`, "
+        "WSGI boot plus first-request latency, and the heaviest top-level imports."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per measurement")
+        parser.add_argument("--path", default="/api/health/", help="Path requested by the first-request run")
+        parser.add_argument("--top", type=int, default=10, help="Number of heaviest imports to list")
+
+    def _run(self, args):
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", *args],
+            cwd=settings.BASE_DIR,
+            env=os.environ.copy(),
+            capture_output=True,
+            text=True,
+        )
+        return (time.perf_counter() - started) * 1000, result
+
+    def handle(self, *args, **options):
+        check_ms = []
+        for _ in range(options["runs"]):
+            elapsed, result = self._run(["manage.py", "check"])
+            check_ms.append(elapsed)
+        imports = _parse_importtime(result.stderr)
+
+        boot_ms, first_ms = [], []
+        for _ in range(options["runs"]):
+            _, result = self._run(["-c", FIRST_REQUEST_SCRIPT.format(path=options["path"])])
+            boot, first = result.stdout.split()[-2:]
+            boot_ms.append(float(boot))
+            first_ms.append(float(first))
+
+        self.stdout.write(
+            f"manage.py check: best={min(check_ms):.0f}ms\n"
+            f"wsgi boot: best={min(boot_ms):.0f}ms  first request {options['path']}: best={min(first_ms):.1f}ms"
+        )
+        self.stdout.write("Heaviest imports during `manage.py check` (cumulative):")
+        for us, module in imports[: options["top"]]:
+            self.stdout.write(f"  {us / 1000:8.1f}ms  {module}")
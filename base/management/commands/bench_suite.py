@@ -0,0 +1,463 @@
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from io import BytesIO
+
+import django
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile, SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+BENCHMARKS = ["compress_image", "s3_upload", "media_post", "media_serializer", "user_list", "media_item_partitions"]
+
+IMAGE_SIZES = {"small": (800, 600), "hd": (1920, 1080), "large": (4000, 3000)}
+IMAGE_FORMATS = ["JPEG", "PNG", "WEBP"]
+MEDIA_POST_FILE_COUNTS = [1, 50, 300]
+SERIALIZER_ITEM_COUNTS = [10, 100, 1000]
+ITEMS_PER_ALBUM = 40
+
+
+def _make_image(width, height, image_format, seed=0):
+    """A photo-like test image: a gradient with seeded noise, so encoders can't cheat and runs repeat exactly."""
+    from PIL import Image
+
+    gradient = Image.linear_gradient("L").resize((width, height))
+    base = Image.merge("RGB", (gradient, gradient.rotate(90, expand=False), gradient.transpose(Image.FLIP_LEFT_RIGHT)))
+    noise = Image.frombytes("RGB", (width, height), random.Random(seed).randbytes(width * height * 3))
+    image = Image.blend(base, noise, 0.25)
+    buffer = BytesIO()
+    image.save(buffer, format=image_format, **({"quality": 92} if image_format in ("JPEG", "WEBP") else {}))
+    return buffer.getvalue()
+
+
+def _uploaded(data, name, content_type):
+    return InMemoryUploadedFile(BytesIO(data), "file", name, content_type, len(data), None)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, cwd=settings.BASE_DIR
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the media pipeline, serializer and user-list benchmarks offline (throwaway test database, "
+        "local S3 stand-in, in-memory caches) and save the timings as a JSON baseline. On PostgreSQL, "
+        "media_item_partitions times album reads and writes before and after partitioning media_library_items. "
+        "--compare diffs the run against an earlier baseline and flags regressions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--only", action="append", choices=BENCHMARKS, help="Benchmark to run (repeatable)")
+        parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case; the median is reported")
+        parser.add_argument("--output", default=None, help="Result file; defaults to benchmarks/<commit>.json")
+        parser.add_argument("--compare", default=None, help="Baseline JSON to diff against")
+        parser.add_argument("--threshold", type=float, default=0.10, help="Slowdown ratio counted as a regression")
+        parser.add_argument("--fail-on-regression", action="store_true")
+        parser.add_argument("--users", type=int, default=10_000, help="Users seeded for the user_list benchmark")
+        parser.add_argument(
+            "--item-months", type=int, default=24, help="Months of albums seeded for media_item_partitions"
+        )
+        parser.add_argument("--albums-per-month", type=int, default=200, help="Albums seeded per month (40 items each)")
+        parser.add_argument("--s3-latency-ms", type=int, default=20, help="Per-call latency of the S3 stand-in")
+        parser.add_argument("--s3-bandwidth-mbps", type=float, default=50, help="Upload MB/s of the S3 stand-in")
+        parser.add_argument("--keepdb", action="store_true", help="Reuse the test database between runs")
+        parser.add_argument("--noinput", action="store_false", dest="interactive")
+
+    def handle(self, *args, **options):
+        selected = options["only"] or BENCHMARKS
+        commit = _git_commit()
+        output = options["output"] or os.path.join(
+            "benchmarks", f"{commit or datetime.now().strftime('%Y%m%d%H%M%S')}.json"
+        )
+
+        self.options = options
+        self.results = {}
+        with self._bench_environment(options):
+            for name in selected:
+                self.stdout.write(f"== {name}")
+                getattr(self, f"bench_{name}")()
+
+        report = {
+            "meta": {
+                "commit": commit,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connections["default"].vendor,
+                "machine": platform.machine(),
+                "cpu_count": os.cpu_count(),
+                "options": {
+                    key: options[key]
+                    for key in (
+                        "repeat",
+                        "users",
+                        "s3_latency_ms",
+                        "s3_bandwidth_mbps",
+                        "item_months",
+                        "albums_per_month",
+                    )
+                },
+            },
+            "results": self.results,
+        }
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(output, "w") as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+        self.stdout.write(f"Saved {len(self.results)} results to {output}")
+
+        if options["compare"]:
+            with open(options["compare"]) as fh:
+                baseline = json.load(fh)
+            regressions = self._compare(baseline, report, options["threshold"])
+            if regressions and options["fail_on_regression"]:
+                raise CommandError(f"{regressions} benchmark(s) regressed by more than {options['threshold']:.0%}")
+
+    @contextmanager
+    def _bench_environment(self, options):
+        """A throwaway test database, no replicas, private caches and the S3 stand-in."""
+        connection = connections["default"]
+        old_name = connection.settings_dict["NAME"]
+        with tempfile.TemporaryDirectory(prefix="bench-s3-") as s3_dir, override_settings(
+            DATABASE_ROUTERS=[],
+            CACHES={
+                "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "bench-default"},
+                settings.SHARED_CACHE_ALIAS: {
+                    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                    "LOCATION": "bench-shared",
+                },
+            },
+            CACHE_INVALIDATION_BUS=False,
+            PROFILING_SAMPLE_RATE=0.0,
+            # Nothing in this process has built the S3 client yet, so get_s3_client picks these up
+            AWS_S3_LOCAL_DIR=s3_dir,
+            AWS_S3_LOCAL_LATENCY_MS=options["s3_latency_ms"],
+        ):
+            connection.creation.create_test_db(
+                verbosity=0, autoclobber=not options["interactive"], serialize=False, keepdb=options["keepdb"]
+            )
+            try:
+                yield
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+
+    def _measure(self, name, fn, **extra):
+        """Run `fn` --repeat times after one untimed warm-up and record wall time and SQL queries."""
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries[-1] += 1
+            return execute(sql, params, many, context)
+
+        fn()
+        timings = []
+        with connections["default"].execute_wrapper(count):
+            for _ in range(self.options["repeat"]):
+                queries.append(0)
+                started = time.perf_counter()
+                fn()
+                timings.append((time.perf_counter() - started) * 1000)
+
+        result = {
+            "runs": len(timings),
+            "min_ms": round(min(timings), 3),
+            "median_ms": round(statistics.median(timings), 3),
+            "max_ms": round(max(timings), 3),
+            "queries": statistics.median(queries),
+            **extra,
+        }
+        self.results[name] = result
+        self.stdout.write(
+            f"  {name:<40} median={result['median_ms']:>10.1f}ms  min={result['min_ms']:>10.1f}ms  "
+            f"queries={result['queries']:g}"
+        )
+        return result
+
+    def bench_compress_image(self):
+        from base.utils.s3_utils import _compress_image
+
+        for label, (width, height) in IMAGE_SIZES.items():
+            for image_format in IMAGE_FORMATS:
+                data = _make_image(width, height, image_format)
+                name = f"page.{image_format.lower()}"
+                content_type = f"image/{image_format.lower()}"
+                output_kb = _compress_image(_uploaded(data, name, content_type)).size // 1024
+
+                self._measure(
+                    f"compress_image.{image_format.lower()}.{label}",
+                    lambda: _compress_image(_uploaded(data, name, content_type)),
+                    input_kb=len(data) // 1024,
+                    output_kb=output_kb,
+                )
+
+    def bench_s3_upload(self):
+        from base.utils.local_s3 import LocalS3Client
+        from base.utils.s3_utils import upload_file_to_s3
+
+        data = _make_image(*IMAGE_SIZES["hd"], "JPEG")
+        client = LocalS3Client(
+            latency_ms=self.options["s3_latency_ms"], bandwidth_mbps=self.options["s3_bandwidth_mbps"]
+        )
+        file_count = 50
+
+        def run():
+            # Same fan-out as MediaView.post
+            with ThreadPoolExecutor(max_workers=12) as executor:
+                files = [_uploaded(data, f"page_{i}.jpg", "image/jpeg") for i in range(file_count)]
+                list(executor.map(lambda f: upload_file_to_s3(f, folder_name="bench", s3_client=client), files))
+
+        result = self._measure(f"s3_upload.files_{file_count}", run, input_kb=len(data) // 1024)
+        result["files_per_s"] = round(file_count / (result["median_ms"] / 1000), 1)
+
+    def bench_media_post(self):
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        from base.models import User
+
+        user = User.objects.create(
+            username="bench-lab@example.com",
+            email="bench-lab@example.com",
+            phone="+10000000000",
+            role=2,
+            remaining_credit=1_000_000,
+        )
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+        data = _make_image(*IMAGE_SIZES["hd"], "JPEG")
+
+        for file_count in MEDIA_POST_FILE_COUNTS:
+            extra = {"input_kb": len(data) // 1024}
+            max_files = settings.DATA_UPLOAD_MAX_NUMBER_FILES
+            if max_files is not None and file_count > max_files:
+                # Measure the pipeline anyway, but make the production limit visible in the baseline
+                extra["note"] = f"DATA_UPLOAD_MAX_NUMBER_FILES={max_files} raised for this case; production rejects it"
+
+            def run():
+                # "<page_type>_<name>", as the studio app names pages
+                files = [SimpleUploadedFile(f"1_page{i}.jpg", data, "image/jpeg") for i in range(file_count)]
+                response = client.post(
+                    reverse("media"), {"media_type": 0, "studio_name": "Bench Studio", "media_items": files}
+                )
+                if response.status_code != 201:
+                    raise CommandError(f"MediaView.post returned {response.status_code}: {response.content[:300]!r}")
+
+            with override_settings(DATA_UPLOAD_MAX_NUMBER_FILES=max(file_count, max_files or 0)):
+                self._measure(f"media_post.files_{file_count}", run, **extra)
+
+    def bench_media_serializer(self):
+        from base.models import MediaLibrary, User
+        from base.views.operation.serializers import MediaLibrarySerializer
+
+        owner = User.objects.create(
+            username="bench-studio@example.com", email="bench-studio@example.com", phone="+10000000001", role=1
+        )
+        for item_count in SERIALIZER_ITEM_COUNTS:
+            payload = {
+                "media_type": 0,
+                "media_title": "Bench album",
+                "studio_name": "Bench Studio",
+                "created_by": owner.id,
+                "media_items": [
+                    {
+                        "media_url": f"https://{settings.AWS_S3_CUSTOM_DOMAIN}/bench/{i}.jpg",
+                        "media_item_title": f"{i}.jpg",
+                        "media_item_description": f"Uploaded file: {i}.jpg",
+                        "page_type": 1,
+                    }
+                    for i in range(item_count)
+                ],
+            }
+            created = []
+
+            def write():
+                media_unique_id = f"bench-{item_count}-{len(created)}"
+                serializer = MediaLibrarySerializer(data={**payload, "media_unique_id": media_unique_id})
+                serializer.is_valid(raise_exception=True)
+                created.append(serializer.save())
+
+            def read():
+                library = MediaLibrary.objects.prefetch_related("media_library_items").get(pk=created[0].pk)
+                MediaLibrarySerializer(library).data
+
+            self._measure(f"media_serializer.write.items_{item_count}", write)
+            self._measure(f"media_serializer.read.items_{item_count}", read)
+
+    def bench_user_list(self):
+        from decimal import Decimal
+
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        from base.models import User, UserPaymentTransaction
+
+        user_count = self.options["users"]
+        admin = User.objects.create(
+            username="bench-admin@example.com", email="bench-admin@example.com", phone="+10000000002", role=3
+        )
+        users = User.objects.bulk_create(
+            [
+                User(
+                    username=f"bench-user-{i}@example.com",
+                    email=f"bench-user-{i}@example.com",
+                    phone=f"+2{i:010d}",
+                    first_name="Bench",
+                    last_name=str(i),
+                    role=i % 3,
+                )
+                for i in range(user_count)
+            ],
+            batch_size=1000,
+        )
+        # Roughly one in five users has paid at least once
+        UserPaymentTransaction.objects.bulk_create(
+            [
+                UserPaymentTransaction(
+                    user=user,
+                    transaction_id=f"bench-{user.pk}",
+                    transaction_amount=Decimal("499.00"),
+                    operation_count=10,
+                )
+                for user in users[::5]
+            ],
+            batch_size=1000,
+        )
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(admin).access_token}")
+
+        def run():
+            response = client.get(reverse("user"))
+            if response.status_code != 200:
+                raise CommandError(f"UserView.get returned {response.status_code}")
+
+        self._measure(f"user_list.users_{user_count}", run)
+
+    def bench_media_item_partitions(self):
+        from django.db import connection
+
+        from base.models import MediaLibrary, MediaLibraryItem, User
+        from base.utils import partitions
+        from base.views.operation.serializers import MediaLibrarySerializer
+
+        if connection.vendor != "postgresql":
+            self.stdout.write("  skipped: needs PostgreSQL")
+            return
+
+        months = self.options["item_months"]
+        archive_studio = User.objects.create(
+            username="bench-archive@example.com", email="bench-archive@example.com", phone="+10000000003", role=1
+        )
+        recent_studio = User.objects.create(
+            username="bench-recent@example.com", email="bench-recent@example.com", phone="+10000000004", role=1
+        )
+        with connection.cursor() as cursor:
+            # Albums spread evenly over the last `months` months, the newest 20 owned by recent_studio
+            cursor.execute(
+                """
+                INSERT INTO media_libraries
+                    (media_unique_id, media_type, is_favorite, is_active, created_at, updated_at, created_by_id)
+                SELECT 'bench-partition-' || n, 0, false, true, now() - (n * %s || ' days')::interval, now(),
+                       CASE WHEN n <= 20 THEN %s ELSE %s END
+                FROM generate_series(1, %s) n
+                """,
+                [
+                    30.0 / self.options["albums_per_month"],
+                    recent_studio.id,
+                    archive_studio.id,
+                    months * self.options["albums_per_month"],
+                ],
+            )
+            cursor.execute(
+                """
+                INSERT INTO media_library_items
+                    (media_library_id, media_url, page_type, is_active, created_at, updated_at)
+                SELECT m.id, 'https://bench/' || m.id || '/' || i || '.jpg', 1, true,
+                       m.created_at + i * interval '1 second', now()
+                FROM media_libraries m, generate_series(1, %s) i
+                WHERE m.media_unique_id LIKE 'bench-partition-%%'
+                """,
+                [ITEMS_PER_ALBUM],
+            )
+            cursor.execute("ANALYZE media_libraries, media_library_items")
+        newest = MediaLibrary.objects.filter(created_by=archive_studio).order_by("-created_at").first()
+        oldest = MediaLibrary.objects.filter(created_by=archive_studio).order_by("created_at").first()
+        created = []
+
+        def read_album(media_library_id):
+            def run():
+                media_library = MediaLibrary.objects.get(pk=media_library_id)
+                partitions.prefetch_album_items([media_library])
+                MediaLibrarySerializer(media_library).data
+
+            return run
+
+        def studio_list():
+            media_libraries = MediaLibrary.objects.filter(created_by=recent_studio).order_by("-id")
+            MediaLibrarySerializer(partitions.prefetch_album_items(media_libraries), many=True).data
+
+        def write_album():
+            media_library = MediaLibrary.objects.create(
+                media_unique_id=f"bench-partition-new-{len(created)}", media_type=0, created_by=archive_studio
+            )
+            MediaLibraryItem.objects.bulk_create(
+                MediaLibraryItem(media_library=media_library, media_url=f"https://bench/new/{i}.jpg")
+                for i in range(ITEMS_PER_ALBUM)
+            )
+            created.append(media_library)
+
+        def measure_all(layout, **extra):
+            self._measure(f"media_item_partitions.{layout}.recent_album", read_album(newest.pk), **extra)
+            self._measure(f"media_item_partitions.{layout}.recent_studio_list", studio_list, **extra)
+            self._measure(f"media_item_partitions.{layout}.old_album", read_album(oldest.pk), **extra)
+            self._measure(f"media_item_partitions.{layout}.write_album", write_album, **extra)
+
+        item_count = MediaLibraryItem.objects.count()
+        measure_all("plain", items=item_count)
+
+        partitions.convert(batch_size=100_000, log=lambda message: None)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE media_library_items")
+        measure_all("partitioned", items=item_count)
+
+        # Keep the last year attached, as a retention policy would
+        a_year_ago = partitions.add_months(partitions.month_start(datetime.now(timezone.utc)), -12)
+        detached = partitions.detach_partitions(a_year_ago)
+        measure_all(
+            "detached",
+            items=MediaLibraryItem.objects.count(),
+            note=f"{len(detached)} old months detached; old_album reads an album whose items are gone",
+        )
+
+    def _compare(self, baseline, report, threshold):
+        """Print median changes against `baseline`; returns how many cases regressed beyond `threshold`."""
+        self.stdout.write(f"== compared with {baseline['meta'].get('commit') or 'baseline'}")
+        regressions = 0
+        for name, result in sorted(report["results"].items()):
+            before = baseline["results"].get(name)
+            if before is None:
+                self.stdout.write(f"  {name:<40} new")
+                continue
+            change = (result["median_ms"] - before["median_ms"]) / before["median_ms"] if before["median_ms"] else 0.0
+            flag = ""
+            if change > threshold:
+                regressions += 1
+                flag = "  REGRESSION"
+            elif change < -threshold:
+                flag = "  faster"
+            self.stdout.write(
+                f"  {name:<40} {before['median_ms']:>10.1f}ms -> {result['median_ms']:>10.1f}ms "
+                f"({change:+.1%}){flag}"
+            )
+        return regressions
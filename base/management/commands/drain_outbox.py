@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from base.utils.outbox import drain_batch
+
+
+class Command(BaseCommand):
+    help = "Run pending outbox side effects (payment credit grants, ...) in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--max-attempts", type=int, default=5)
+        parser.add_argument("--forever", action="store_true", help="Keep polling instead of exiting when drained")
+        parser.add_argument("--interval", type=float, default=2.0, help="Seconds to sleep when idle with --forever")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            claimed = drain_batch(options["batch_size"], options["max_attempts"])
+            total += claimed
+            if claimed:
+                continue
+            if not options["forever"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(f"Drained {total} outbox events")
@@ -0,0 +1,287 @@
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+from itertools import accumulate
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.urls import reverse
+
+from base.management.commands.bench_suite import _make_image
+
+# Every synthetic account's email starts with this, so they're easy to find and remove
+LOADTEST_EMAIL_PREFIX = "loadtest-"
+LOADTEST_PASSWORD = "loadtest-password"
+
+DEFAULT_MIX = "upload=1,share_link=16,admin_list=1,login=2"
+
+
+def _parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def _multipart(fields, files):
+    """Encode form fields and (field, filename, content type, bytes) files as multipart/form-data."""
+    boundary = uuid.uuid4().hex
+    chunks = []
+    for name, value in fields.items():
+        chunks.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, filename, content_type, data in files:
+        chunks.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n".encode()
+        )
+        chunks.append(data)
+        chunks.append(b"\r\n")
+    chunks.append(f"--{boundary}--\r\n".encode())
+    return b"".join(chunks), f"multipart/form-data; boundary={boundary}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive a running server with a weighted mix of synthetic studio traffic (album uploads, share-link "
+        "views, admin listings, logins) and report throughput, p50/p95/p99 latency and error rates per "
+        "scenario. Start the server against a disposable database with AWS_S3_LOCAL_DIR set (local S3 "
+        "stand-in) and the THROTTLE_LOGIN_* rates raised, then run once with --seed to create the accounts."
+    )
+
+    scenarios = ["upload", "share_link", "admin_list", "login"]
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--concurrency", type=int, default=50, help="Virtual users")
+        parser.add_argument("--duration", type=float, default=60.0, help="Seconds to generate load for")
+        parser.add_argument("--ramp-up", type=float, default=10.0, help="Seconds over which virtual users start")
+        parser.add_argument("--think-ms", type=int, default=0, help="Pause between a virtual user's requests")
+        parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Scenario weights (default {DEFAULT_MIX})")
+        parser.add_argument("--upload-files", default="5-40", help="Files per album upload, as min-max")
+        parser.add_argument("--timeout", type=float, default=120.0)
+        parser.add_argument("--seed-random", type=int, default=0, help="Seed for the traffic generator")
+        parser.add_argument("--output", default=None, help="Also write the report to this JSON file")
+        parser.add_argument("--seed", action="store_true", help="Create the synthetic accounts and albums first")
+        parser.add_argument("--studios", type=int, default=20)
+        parser.add_argument("--customers", type=int, default=200)
+        parser.add_argument("--albums-per-studio", type=int, default=5)
+        parser.add_argument(
+            "--allow-non-debug", action="store_true", help="Allow --seed with DEBUG off (staging databases)"
+        )
+
+    def handle(self, *args, **options):
+        mix = _parse_mix(options["mix"])
+        unknown = set(mix) - set(self.scenarios)
+        if unknown:
+            raise CommandError(f"Unknown scenarios in --mix: {', '.join(sorted(unknown))}")
+        low, _, high = options["upload_files"].partition("-")
+        self.upload_files = (int(low), int(high or low))
+
+        if options["seed"]:
+            if not settings.DEBUG and not options["allow_non_debug"]:
+                raise CommandError("Refusing to seed load-test accounts with DEBUG off; see --allow-non-debug")
+            self._seed(options)
+        self._load_fixtures()
+
+        self.base_url = options["base_url"].rstrip("/")
+        self.timeout = options["timeout"]
+        results = self._run(mix, options)
+        report = self._report(results, options["duration"])
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(f"Saved report to {options['output']}")
+
+    def _seed(self, options):
+        from base.models import MediaLibrary, MediaLibraryItem, User
+        from base.utils.passwords import hash_password
+
+        # One hash shared by every account; hashing per account would dominate seeding
+        password = hash_password(LOADTEST_PASSWORD)
+
+        def account(kind, index, role, **extra):
+            email = f"{LOADTEST_EMAIL_PREFIX}{kind}-{index}@example.com"
+            return User(
+                username=email,
+                email=email,
+                phone=f"+9{role}{index:09d}",
+                password=password,
+                first_name=kind.title(),
+                last_name=str(index),
+                role=role,
+                **extra,
+            )
+
+        users = [account("admin", 0, 3)]
+        users += [
+            account("studio", i, 1, organization_name=f"Studio {i}", remaining_credit=1_000_000)
+            for i in range(options["studios"])
+        ]
+        users += [account("customer", i, 0) for i in range(options["customers"])]
+
+        with transaction.atomic():
+            User.objects.bulk_create(users, ignore_conflicts=True, batch_size=1000)
+            studios = User.objects.filter(email__startswith=f"{LOADTEST_EMAIL_PREFIX}studio-")
+            for studio in studios:
+                for album in range(options["albums_per_studio"]):
+                    media_library, created = MediaLibrary.objects.get_or_create(
+                        media_unique_id=f"{LOADTEST_EMAIL_PREFIX}{studio.id}-{album}",
+                        defaults={
+                            "media_type": 0,
+                            "media_title": f"Album {album}",
+                            "studio_name": studio.organization_name,
+                            "created_by": studio,
+                        },
+                    )
+                    if created:
+                        folder_url = f"https://{settings.AWS_S3_CUSTOM_DOMAIN}/loadtest/{media_library.id}"
+                        MediaLibraryItem.objects.bulk_create(
+                            MediaLibraryItem(
+                                media_library=media_library,
+                                media_url=f"{folder_url}/{page}.jpg",
+                                media_item_title=f"{page}.jpg",
+                                page_type=1,
+                            )
+                            for page in range(40)
+                        )
+        self.stdout.write(f"Seeded {len(users)} accounts and their albums")
+
+    def _load_fixtures(self):
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        from base.models import MediaLibrary, User
+
+        accounts = User.objects.filter(email__startswith=LOADTEST_EMAIL_PREFIX)
+        admin = accounts.filter(role=3).first()
+        studios = list(accounts.filter(role=1))
+        self.customer_phones = list(accounts.filter(role=0).values_list("phone", flat=True))
+        self.album_ids = list(
+            MediaLibrary.objects.filter(created_by__in=studios).order_by("id").values_list("media_unique_id", flat=True)
+        )
+        if admin is None or not studios or not self.customer_phones or not self.album_ids:
+            raise CommandError("No load-test accounts found; run once with --seed")
+
+        self.admin_token = str(RefreshToken.for_user(admin).access_token)
+        self.studio_tokens = [str(RefreshToken.for_user(studio).access_token) for studio in studios]
+        # A few albums go viral: popularity falls off as 1/rank
+        self.album_cum_weights = list(accumulate(1 / (rank + 1) for rank in range(len(self.album_ids))))
+        self.upload_image = _make_image(1920, 1080, "JPEG")
+
+    def _request(self, method, path, body=None, headers=None):
+        request = urllib.request.Request(self.base_url + path, data=body, headers=headers or {}, method=method)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            status = e.code
+        except OSError:
+            # Refused, reset or timed out
+            status = 0
+        return status, (time.perf_counter() - started) * 1000
+
+    def scenario_upload(self, rng):
+        file_count = rng.randint(*self.upload_files)
+        body, content_type = _multipart(
+            {"media_type": 0, "media_title": "Load test album"},
+            [("media_items", f"1_page{i}.jpg", "image/jpeg", self.upload_image) for i in range(file_count)],
+        )
+        headers = {
+            "Authorization": f"Bearer {rng.choice(self.studio_tokens)}",
+            "Content-Type": content_type,
+            "Idempotency-Key": uuid.UUID(int=rng.getrandbits(128)).hex,
+        }
+        return self._request("POST", reverse("media"), body, headers)
+
+    def scenario_share_link(self, rng):
+        media_unique_id = rng.choices(self.album_ids, cum_weights=self.album_cum_weights)[0]
+        return self._request("GET", reverse("external-media-id", args=[media_unique_id]))
+
+    def scenario_admin_list(self, rng):
+        return self._request("GET", reverse("user"), headers={"Authorization": f"Bearer {self.admin_token}"})
+
+    def scenario_login(self, rng):
+        body = json.dumps({"phone": rng.choice(self.customer_phones), "password": LOADTEST_PASSWORD}).encode()
+        return self._request("POST", reverse("login"), body, {"Content-Type": "application/json"})
+
+    def _run(self, mix, options):
+        names = [name for name in self.scenarios if mix.get(name)]
+        weights = [mix[name] for name in names]
+        results = defaultdict(list)
+        started = time.monotonic()
+        deadline = started + options["duration"]
+
+        def virtual_user(index):
+            rng = random.Random(options["seed_random"] + index)
+            time.sleep(options["ramp_up"] * index / max(options["concurrency"], 1))
+            while time.monotonic() < deadline:
+                name = rng.choices(names, weights=weights)[0]
+                status, latency = getattr(self, f"scenario_{name}")(rng)
+                results[name].append((status, latency))
+                if options["think_ms"]:
+                    time.sleep(options["think_ms"] / 1000)
+
+        threads = [
+            threading.Thread(target=virtual_user, args=(index,), daemon=True)
+            for index in range(options["concurrency"])
+        ]
+        self.stdout.write(
+            f"Running {options['concurrency']} virtual users for {options['duration']:g}s against {self.base_url}"
+        )
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def _report(self, results, duration):
+        def summarize(samples):
+            latencies = sorted(latency for _, latency in samples)
+            statuses = defaultdict(int)
+            for status, _ in samples:
+                statuses[status] += 1
+            throttled = statuses.get(429, 0)
+            errors = sum(count for status, count in statuses.items() if not 200 <= status < 300 and status != 429)
+
+            def percentile(p):
+                return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 1)
+
+            return {
+                "requests": len(samples),
+                "throughput_rps": round(len(samples) / duration, 2),
+                "error_rate": round(errors / len(samples), 4),
+                "errors": errors,
+                "throttled": throttled,
+                "statuses": {str(status): count for status, count in sorted(statuses.items())},
+                "p50_ms": round(statistics.median(latencies), 1),
+                "p95_ms": percentile(0.95),
+                "p99_ms": percentile(0.99),
+                "max_ms": round(latencies[-1], 1),
+            }
+
+        report = {name: summarize(samples) for name, samples in results.items() if samples}
+        all_samples = [sample for samples in results.values() for sample in samples]
+        if all_samples:
+            report["total"] = summarize(all_samples)
+
+        self.stdout.write(
+            f"{'scenario':<12} {'requests':>9} {'req/s':>8} {'errors':>8} {'429s':>6} "
+            f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+        )
+        for name, summary in report.items():
+            self.stdout.write(
+                f"{name:<12} {summary['requests']:>9} {summary['throughput_rps']:>8.1f} "
+                f"{summary['error_rate']:>8.2%} {summary['throttled']:>6} "
+                f"{summary['p50_ms']:>9.1f} {summary['p95_ms']:>9.1f} {summary['p99_ms']:>9.1f}"
+            )
+        return report
@@ -0,0 +1,131 @@
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from base.utils import partitions
+
+
+def _month(value):
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+class Command(BaseCommand):
+    help = (
+        "Manage the monthly created_at partitions of media_library_items (PostgreSQL). "
+        "convert: partition the existing table online, keeping the old one as media_library_items_legacy; "
+        "ensure: create upcoming months (run from cron); detach: take months older than --older-than-months "
+        "out of the table, hiding their items; attach: put a detached month back; archive: export detached "
+        "months to S3 and drop them; drop-legacy: drop the pre-conversion table; status: list partitions."
+    )
+
+    actions = ["status", "convert", "ensure", "detach", "attach", "archive", "drop-legacy"]
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=self.actions)
+        parser.add_argument("--batch-size", type=int, default=10_000, help="Rows copied per transaction (convert)")
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=None,
+            help="Future months to create (default MEDIA_ITEMS_PARTITION_MONTHS_AHEAD)",
+        )
+        parser.add_argument(
+            "--fix-item-dates",
+            action="store_true",
+            help="Move items dated before their album to the album's created_at instead of refusing to convert",
+        )
+        parser.add_argument("--older-than-months", type=int, default=None, help="Months kept attached (detach)")
+        parser.add_argument(
+            "--tablespace",
+            default=settings.MEDIA_ITEMS_ARCHIVE_TABLESPACE,
+            help="Move detached months to this tablespace (default MEDIA_ITEMS_ARCHIVE_TABLESPACE)",
+        )
+        parser.add_argument("--month", action="append", type=_month, help="YYYY-MM (attach, archive; repeatable)")
+        parser.add_argument("--all-detached", action="store_true", help="Archive every detached month")
+        parser.add_argument("--noinput", action="store_false", dest="interactive")
+
+    def handle(self, *args, **options):
+        try:
+            getattr(self, f"handle_{options['action'].replace('-', '_')}")(options)
+        except partitions.PartitioningError as e:
+            raise CommandError(str(e))
+
+    def _confirm(self, options, question):
+        if options["interactive"] and input(f"{question} Type 'yes' to continue: ") != "yes":
+            raise CommandError("Cancelled")
+
+    def handle_status(self, options):
+        if not partitions.is_partitioned():
+            self.stdout.write(f"{partitions.TABLE} is not partitioned")
+            return
+        for partition in partitions.list_partitions():
+            state = "attached" if partition["attached"] else "DETACHED"
+            self.stdout.write(
+                f"{partition['name']:<34} {state:<9} rows~{max(partition['rows_estimate'], 0):>12,} "
+                f"{partition['bytes'] / 1024 / 1024:>10.1f} MB  tablespace={partition['tablespace']}"
+            )
+        stray = partitions.default_partition_rows()
+        if stray:
+            self.stderr.write(f"{stray} rows are in {partitions.DEFAULT_PARTITION}; some month has no partition")
+
+    def handle_convert(self, options):
+        self._confirm(
+            options,
+            f"This copies {partitions.TABLE} into a partitioned table and swaps it in under a brief exclusive lock.",
+        )
+        partitions.convert(
+            batch_size=options["batch_size"],
+            months_ahead=options["months_ahead"],
+            fix_item_dates=options["fix_item_dates"],
+            log=self.stdout.write,
+        )
+
+    def handle_ensure(self, options):
+        created = partitions.ensure_partitions(options["months_ahead"])
+        self.stdout.write(f"Created {len(created)} partitions" + (f": {', '.join(created)}" if created else ""))
+        stray = partitions.default_partition_rows()
+        if stray:
+            self.stderr.write(f"{stray} rows are in {partitions.DEFAULT_PARTITION}; some month has no partition")
+
+    def handle_detach(self, options):
+        if options["older_than_months"] is None:
+            raise CommandError("detach needs --older-than-months")
+        before = partitions.add_months(
+            partitions.month_start(datetime.now(timezone.utc)), -options["older_than_months"]
+        )
+        self._confirm(options, f"Items of albums created before {before:%Y-%m} will stop showing up.")
+        detached = partitions.detach_partitions(before, tablespace=options["tablespace"] or None)
+        self.stdout.write(f"Detached {len(detached)} partitions" + (f": {', '.join(detached)}" if detached else ""))
+
+    def handle_attach(self, options):
+        if not options["month"]:
+            raise CommandError("attach needs --month")
+        for month in options["month"]:
+            self.stdout.write(f"Attached {partitions.attach_partition(month)}")
+
+    def handle_archive(self, options):
+        if options["all_detached"]:
+            names = [
+                partition["name"]
+                for partition in partitions.list_partitions()
+                if not partition["attached"] and partition["month"] is not None
+            ]
+        elif options["month"]:
+            names = [partitions.partition_name(month) for month in options["month"]]
+        else:
+            raise CommandError("archive needs --month or --all-detached")
+        if not names:
+            self.stdout.write("Nothing to archive")
+            return
+        self._confirm(options, f"{', '.join(names)} will be exported to S3 and dropped.")
+        for name in names:
+            key, rows = partitions.archive_partition(name)
+            self.stdout.write(f"Archived {rows} rows of {name} to s3://{settings.AWS_STORAGE_BUCKET_NAME}/{key}")
+
+    def handle_drop_legacy(self, options):
+        self._confirm(options, f"{partitions.LEGACY_TABLE} will be dropped.")
+        if partitions.drop_legacy_table():
+            self.stdout.write(f"Dropped {partitions.LEGACY_TABLE}")
+        else:
+            self.stdout.write(f"No {partitions.LEGACY_TABLE} table")
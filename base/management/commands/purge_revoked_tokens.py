@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from base.models import RevokedToken
+
+
+class Command(BaseCommand):
+    help = "Delete revoked access tokens that have expired anyway (pair with simplejwt's flushexpiredtokens)"
+
+    def handle(self, *args, **options):
+        deleted, _ = RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+        self.stdout.write(f"Deleted {deleted} expired revoked tokens")
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from base.models import CreditLedger, User
+from base.utils.cache import invalidate_user
+
+
+class Command(BaseCommand):
+    help = "Compare User.remaining_credit against the credit ledger and optionally repair drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Set remaining_credit to the ledger balance for every drifted user",
+        )
+
+    def handle(self, *args, **options):
+        ledger_balance = (
+            CreditLedger.objects.filter(user=OuterRef("pk"))
+            .order_by()
+            .values("user")
+            .annotate(balance=Sum("delta"))
+            .values("balance")
+        )
+        users = User.objects.annotate(
+            ledger_balance=Coalesce(Subquery(ledger_balance), Value(0), output_field=IntegerField())
+        )
+
+        drifted = list(
+            users.exclude(remaining_credit=F("ledger_balance")).values_list(
+                "id", "remaining_credit", "ledger_balance"
+            )
+        )
+        for user_id, remaining_credit, balance in drifted:
+            self.stdout.write(f"user={user_id} remaining_credit={remaining_credit} ledger={balance}")
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("All balances match the ledger"))
+            return
+
+        if options["fix"]:
+            # The ledger is the source of truth; one set-based UPDATE repairs every drifted row
+            fixed = User.objects.filter(id__in=[user_id for user_id, _, _ in drifted]).update(
+                remaining_credit=Coalesce(Subquery(ledger_balance), Value(0), output_field=IntegerField())
+            )
+            for user_id, _, _ in drifted:
+                invalidate_user(user_id)
+            self.stdout.write(self.style.SUCCESS(f"Repaired {fixed} balances"))
+        else:
+            self.stdout.write(self.style.WARNING(f"{len(drifted)} balances drifted; rerun with --fix to repair"))
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from base.utils.rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = "Incrementally refresh the revenue and credit-usage reporting rollups"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--forever", action="store_true", help="Keep refreshing instead of running once")
+        parser.add_argument("--interval", type=float, default=60.0, help="Seconds between refreshes with --forever")
+
+    def handle(self, *args, **options):
+        while True:
+            recomputed = refresh_rollups()
+            self.stdout.write(", ".join(f"{name}: {days} days recomputed" for name, days in recomputed.items()))
+            if not options["forever"]:
+                break
+            time.sleep(options["interval"])
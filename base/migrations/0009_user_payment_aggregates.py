@@ -0,0 +1,58 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_payment_aggregates(apps, schema_editor):
+    User = apps.get_model("base", "User")
+    UserPaymentTransaction = apps.get_model("base", "UserPaymentTransaction")
+
+    per_user = UserPaymentTransaction.objects.filter(user=OuterRef("pk")).order_by().values("user")
+    User.objects.update(
+        total_paid=Coalesce(
+            Subquery(per_user.annotate(total=Sum("transaction_amount", filter=Q(transaction_status=1))).values("total")),
+            Value(0),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+        pending_transaction_count=Coalesce(
+            Subquery(per_user.annotate(pending=Count("id", filter=Q(transaction_status=0))).values("pending")),
+            Value(0),
+            output_field=IntegerField(),
+        ),
+        last_payment_transaction=Subquery(
+            UserPaymentTransaction.objects.filter(user=OuterRef("pk")).order_by("-id").values("id")[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0008_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='last_payment_transaction',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='base.userpaymenttransaction'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='pending_transaction_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='total_paid',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddIndex(
+            model_name='userpaymenttransaction',
+            index=models.Index(fields=['user', '-id'], name='upt_user_id_desc_idx'),
+        ),
+        migrations.RunPython(backfill_payment_aggregates, migrations.RunPython.noop),
+    ]
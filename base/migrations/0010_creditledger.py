@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def record_opening_balances(apps, schema_editor):
+    # Seed the ledger with today's balances so reconcile_credits has a starting point
+    User = apps.get_model("base", "User")
+    CreditLedger = apps.get_model("base", "CreditLedger")
+
+    balances = User.objects.exclude(remaining_credit=0).values_list("id", "remaining_credit")
+    CreditLedger.objects.bulk_create(
+        (CreditLedger(user_id=user_id, delta=remaining_credit, reason=0) for user_id, remaining_credit in balances.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0009_user_payment_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreditLedger',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('delta', models.IntegerField()),
+                ('reason', models.IntegerField(choices=[(0, 'Opening Balance'), (1, 'Media Upload'), (2, 'Payment Grant'), (3, 'Refund'), (4, 'Adjustment')])),
+                ('remarks', models.CharField(blank=True, max_length=200, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('media_library', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='credit_ledger_entries', to='base.medialibrary')),
+                ('payment_transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='credit_ledger_entries', to='base.userpaymenttransaction')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='credit_ledger_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'credit_ledger',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.RunPython(record_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0010_creditledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('event_type', models.CharField(max_length=50)),
+                ('dedupe_key', models.CharField(max_length=200, unique=True)),
+                ('payload', models.JSONField(default=dict)),
+                ('status', models.IntegerField(choices=[(0, 'Pending'), (1, 'Processed'), (2, 'Failed')], default=0)),
+                ('attempts', models.IntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'outbox_events',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='creditledger',
+            constraint=models.UniqueConstraint(condition=models.Q(('reason', 2)), fields=('payment_transaction',), name='credit_ledger_one_grant_per_payment'),
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(fields=['status', 'id'], name='outbox_status_id_idx'),
+        ),
+    ]
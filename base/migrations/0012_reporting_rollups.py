@@ -0,0 +1,80 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0011_outboxevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreditUsageDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('day', models.DateField()),
+                ('credits_consumed', models.IntegerField(default=0)),
+                ('upload_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'credit_usage_daily_rollups',
+            },
+        ),
+        migrations.CreateModel(
+            name='RevenueDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('day', models.DateField()),
+                ('transaction_method', models.IntegerField(choices=[(0, 'UPI'), (1, 'Cash'), (2, 'Bank Transfer'), (3, 'Other')])),
+                ('transaction_status', models.IntegerField(choices=[(0, 'Pending'), (1, 'Completed'), (2, 'Failed')])),
+                ('role', models.IntegerField(choices=[(0, 'Customer'), (1, 'Studio'), (2, 'Lab'), (3, 'Admin'), (4, 'Super Admin')])),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_operation_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'revenue_daily_rollups',
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_updated_at', models.DateTimeField(blank=True, null=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'rollup_watermarks',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='creditledger',
+            index=models.Index(fields=['created_at'], name='credit_ledger_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userpaymenttransaction',
+            index=models.Index(fields=['updated_at'], name='upt_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userpaymenttransaction',
+            index=models.Index(fields=['created_at'], name='upt_created_at_idx'),
+        ),
+        migrations.AddField(
+            model_name='creditusagedailyrollup',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='credit_usage_rollups', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='revenuedailyrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'transaction_method', 'transaction_status', 'role'), name='revenue_rollup_bucket'),
+        ),
+        migrations.AddConstraint(
+            model_name='creditusagedailyrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'user'), name='credit_usage_rollup_bucket'),
+        ),
+    ]
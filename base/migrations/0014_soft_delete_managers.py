@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0013_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='medialibrary',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_by', '-id'], name='media_lib_active_owner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medialibraryitem',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['media_library', 'id'], name='media_item_active_lib_idx'),
+        ),
+    ]
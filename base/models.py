@@ -4,11 +4,28 @@ from email.policy import default
 from enum import unique
 
 from django.contrib.auth.models import AbstractUser
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
 # Create your models here.
 
 
+class ActiveManager(models.Manager):
+    """
+    Default manager of soft-deletable models: rows with is_active=False are left out.
+
+    Related managers and prefetch_related build on the default manager, so
+    nested lookups like `media_library_items` skip deleted rows too. Each
+    model also keeps `all_with_inactive` for the rare query that needs them.
+    Forward foreign keys, saves and cascades go through Django's base
+    manager, which stays unfiltered.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_active=True)
+
+
+
 class User(AbstractUser):
     USER_TYPE_CHOICES = (
         (0, "Customer"),
@@ -41,6 +58,13 @@ class User(AbstractUser):
     remaining_credit = models.IntegerField(default=0)
     used_credit = models.IntegerField(default=0)
 
+    # Payment aggregates kept in step by base.utils.payments so the profile never scans history
+    total_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    pending_transaction_count = models.IntegerField(default=0)
+    last_payment_transaction = models.ForeignKey(
+        "UserPaymentTransaction", on_delete=models.SET_NULL, related_name="+", null=True, blank=True
+    )
+
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username", "first_name", "last_name"]
 
@@ -62,10 +86,14 @@ class UserSocialLinks(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
 
+    objects = ActiveManager()
+    all_with_inactive = models.Manager()
+
     class Meta:
         db_table = "user_social_links"
         verbose_name_plural = "User Social Links"
 
+
 class UserAddress(models.Model):
     id = models.AutoField(primary_key=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -81,6 +109,9 @@ class UserAddress(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
 
+    objects = ActiveManager()
+    all_with_inactive = models.Manager()
+
     class Meta:
         unique_together = ["user", "is_primary"]
         db_table = "user_addresses"
@@ -113,6 +144,9 @@ class UserEvents(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
 
+    objects = ActiveManager()
+    all_with_inactive = models.Manager()
+
     class Meta:
         db_table = "user_events"
         verbose_name_plural = "User Functionalities"
@@ -150,9 +184,18 @@ class MediaLibrary(models.Model):
     instagram_profile_url = models.CharField(max_length=100, null=True, blank=True)
     whatsapp_number = models.CharField(max_length=20, null=True, blank=True)
 
+    objects = ActiveManager()
+    all_with_inactive = models.Manager()
+
     class Meta:
         db_table = "media_libraries"
         verbose_name_plural = "Media Libraries"
+        indexes = [
+            # A studio's dashboard list, newest first; deleted albums stay out of the index
+            models.Index(
+                fields=["created_by", "-id"], condition=models.Q(is_active=True), name="media_lib_active_owner_idx"
+            ),
+        ]
 
 
 class MediaLibraryItem(models.Model):
@@ -179,9 +222,18 @@ class MediaLibraryItem(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
 
+    objects = ActiveManager()
+    all_with_inactive = models.Manager()
+
     class Meta:
         db_table = "media_library_items"
         ordering = ["id"]
+        indexes = [
+            # The items prefetch: one album's live items in id order
+            models.Index(
+                fields=["media_library", "id"], condition=models.Q(is_active=True), name="media_item_active_lib_idx"
+            ),
+        ]
 
 
 class UserPaymentTransaction(models.Model):
@@ -212,3 +264,162 @@ class UserPaymentTransaction(models.Model):
     class Meta:
         db_table = "user_payment_transactions"
         ordering = ["-id"]
+        indexes = [
+            # Keyset pagination of a user's history walks this index newest-first
+            models.Index(fields=["user", "-id"], name="upt_user_id_desc_idx"),
+            # Watermark scans and day-range recomputes in base.utils.rollups
+            models.Index(fields=["updated_at"], name="upt_updated_at_idx"),
+            models.Index(fields=["created_at"], name="upt_created_at_idx"),
+        ]
+
+
+class CreditLedger(models.Model):
+    """Append-only record of every change to User.remaining_credit; see base.utils.credits."""
+
+    REASON_CHOICES = (
+        (0, "Opening Balance"),
+        (1, "Media Upload"),
+        (2, "Payment Grant"),
+        (3, "Refund"),
+        (4, "Adjustment"),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="credit_ledger_entries")
+    delta = models.IntegerField()
+    reason = models.IntegerField(choices=REASON_CHOICES)
+    media_library = models.ForeignKey(
+        MediaLibrary, on_delete=models.SET_NULL, related_name="credit_ledger_entries", null=True, blank=True
+    )
+    payment_transaction = models.ForeignKey(
+        UserPaymentTransaction, on_delete=models.SET_NULL, related_name="credit_ledger_entries", null=True, blank=True
+    )
+    remarks = models.CharField(max_length=200, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "credit_ledger"
+        ordering = ["-id"]
+        indexes = [
+            models.Index(fields=["created_at"], name="credit_ledger_created_at_idx"),
+        ]
+        constraints = [
+            # A payment can only ever grant its credits once, however often the outbox replays it
+            models.UniqueConstraint(
+                fields=["payment_transaction"], condition=models.Q(reason=2), name="credit_ledger_one_grant_per_payment"
+            ),
+        ]
+
+
+class OutboxEvent(models.Model):
+    """Side effects recorded in the same transaction as the write that caused them; see base.utils.outbox."""
+
+    STATUS_CHOICES = (
+        (0, "Pending"),
+        (1, "Processed"),
+        (2, "Failed"),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    event_type = models.CharField(max_length=50)
+    dedupe_key = models.CharField(max_length=200, unique=True)
+    payload = models.JSONField(default=dict)
+    status = models.IntegerField(choices=STATUS_CHOICES, default=0)
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "outbox_events"
+        indexes = [
+            models.Index(fields=["status", "id"], name="outbox_status_id_idx"),
+        ]
+
+
+class IdempotencyKey(models.Model):
+    """Outcome of a request sent with an Idempotency-Key header; see base.utils.idempotency."""
+
+    STATUS_CHOICES = (
+        (0, "In Progress"),
+        (1, "Completed"),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="idempotency_keys")
+    key = models.CharField(max_length=255)
+    request_fingerprint = models.CharField(max_length=300)
+    status = models.IntegerField(choices=STATUS_CHOICES, default=0)
+    response_status = models.IntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "idempotency_keys"
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="idempotency_key_per_user"),
+        ]
+
+
+class RevokedToken(models.Model):
+    """Access tokens revoked before expiry (refresh tokens use simplejwt's blacklist)."""
+
+    id = models.AutoField(primary_key=True)
+    jti = models.CharField(max_length=255, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="revoked_tokens", null=True)
+    expires_at = models.DateTimeField(db_index=True)
+    # Indexed for the per-worker incremental sync (base.utils.revocation)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = "revoked_tokens"
+
+
+class RevenueDailyRollup(models.Model):
+    """Per-day payment totals by method, status and payer role; rebuilt by base.utils.rollups."""
+
+    id = models.BigAutoField(primary_key=True)
+    day = models.DateField()
+    transaction_method = models.IntegerField(choices=UserPaymentTransaction.TRANSACTION_METHOD_CHOICES)
+    transaction_status = models.IntegerField(choices=UserPaymentTransaction.TRANSACTION_STATUS_CHOICES)
+    role = models.IntegerField(choices=User.USER_TYPE_CHOICES)
+    transaction_count = models.IntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_operation_count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "revenue_daily_rollups"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "transaction_method", "transaction_status", "role"], name="revenue_rollup_bucket"
+            ),
+        ]
+
+
+class CreditUsageDailyRollup(models.Model):
+    """Per-day credits consumed by each user (studio/lab); rebuilt by base.utils.rollups."""
+
+    id = models.BigAutoField(primary_key=True)
+    day = models.DateField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="credit_usage_rollups")
+    credits_consumed = models.IntegerField(default=0)
+    upload_count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "credit_usage_daily_rollups"
+        constraints = [
+            models.UniqueConstraint(fields=["day", "user"], name="credit_usage_rollup_bucket"),
+        ]
+
+
+class RollupWatermark(models.Model):
+    """How far each rollup has consumed its source table."""
+
+    name = models.CharField(max_length=50, primary_key=True)
+    last_updated_at = models.DateTimeField(null=True, blank=True)
+    last_id = models.BigIntegerField(default=0)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "rollup_watermarks"
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from base.models import MediaLibrary, User, UserSocialLinks
+from base.utils.cache import invalidate_media, invalidate_user
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    invalidate_user(instance.id)
+
+
+@receiver([post_save, post_delete], sender=UserSocialLinks)
+def invalidate_social_link_cache(sender, instance, **kwargs):
+    invalidate_user(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=MediaLibrary)
+def invalidate_media_cache(sender, instance, **kwargs):
+    invalidate_media(instance)
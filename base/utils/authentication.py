@@ -0,0 +1,72 @@
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from base.utils.cache import AUTH_USERS
+from base.utils.db_router import SAFE_METHODS, pin_reads_if_recent_write, read_from_primary
+from base.utils.revocation import is_revoked
+
+
+class RevocableJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that also rejects access tokens revoked through logout.
+
+    The revocation check is served from an in-memory Bloom filter, so valid
+    tokens cost no extra query. Once the user is known, their reads are pinned
+    to the primary if they wrote recently (see base.utils.db_router). For safe
+    requests the user comes from the AUTH_USERS cache, which holds only what
+    authentication and role checks need (never the password hash); any other
+    field is loaded on first access. Writes always load the full row fresh,
+    since handlers may save it.
+    """
+
+    # Loaded on the cached user; every other field is deferred
+    cached_fields = ["id", "role", "is_active"]
+
+    def authenticate(self, request):
+        self.use_cached_user = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if is_revoked(validated_token[api_settings.JTI_CLAIM]):
+            raise InvalidToken("Token has been revoked")
+        return validated_token
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        pin_reads_if_recent_write(user_id)
+        # SimpleJWT stores the id claim as a string
+        if not getattr(self, "use_cached_user", False) or not str(user_id).isdigit():
+            return super().get_user(validated_token)
+
+        cached = AUTH_USERS.get(int(user_id))
+        if cached is None:
+            # From the primary: after an admin deactivates or demotes this user, a replica
+            # could still hand back the old row, and the pin belongs to the admin, not to them
+            with read_from_primary():
+                user = super().get_user(validated_token)
+            cached = {field: getattr(user, field) for field in self.cached_fields}
+            # Enough to check REVOKE_TOKEN_CLAIM without caching the credential itself
+            cached["password_md5"] = get_md5_hash_password(user.password)
+            AUTH_USERS.set(int(user_id), cached)
+            return user
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not cached["is_active"]:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        if (
+            api_settings.CHECK_REVOKE_TOKEN
+            and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != cached["password_md5"]
+        ):
+            raise AuthenticationFailed("The user's password has been changed.", code="password_changed")
+        # from_db expects values in the model's field order
+        fields = [
+            field.attname for field in self.user_model._meta.concrete_fields if field.attname in self.cached_fields
+        ]
+        return self.user_model.from_db(DEFAULT_DB_ALIAS, fields, [cached[field] for field in fields])
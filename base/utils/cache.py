@@ -0,0 +1,331 @@
+"""
+Two-tier cache: a bounded in-process LRU in front of the shared cache backend.
+
+Values are grouped into namespaces (user profiles, share links, ...). Each
+namespace fixes its key type and TTLs and keeps its own hit/miss/eviction
+counters. The local tier answers most reads without a network hop. Deletes are
+broadcast to other workers over base.utils.invalidation_bus; while that bus is
+down, the short local TTL bounds how long a peer can serve a deleted entry.
+When the shared backend is process-local (LocMem, no REDIS_URL) it is treated
+like the LRU: evicted by the bus and held no longer than the local TTL.
+
+Invalidation:
+- `namespace.delete(key)` drops one entry from both tiers.
+- `namespace.invalidate_all()` bumps the namespace generation stored in the
+  shared backend, which orphans every existing entry at once.
+
+Cached values are shared between threads; treat them as read-only.
+"""
+
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+from base.utils.db_router import read_from_primary
+from base.utils.invalidation_bus import ALL_KEYS, ensure_listener, is_listening, publish
+
+_MISSING = object()
+
+# name -> CacheNamespace, for stats and cross-process eviction
+NAMESPACES = {}
+
+
+def is_process_local(alias):
+    """True when the cache `alias` lives in this process's memory, so other workers can't see it."""
+    return isinstance(caches[alias], LocMemCache)
+
+
+class LocalLRU:
+    """Thread-safe, size-bounded LRU whose entries carry their own expiry."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        """Store `value`; returns how many entries were evicted to make room."""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class CacheNamespace:
+    """
+    A typed key space cached in both tiers.
+
+    Args:
+        name: Prefix for shared-backend keys; also the stats label
+        key_type: Type every key must have (e.g. int for user ids)
+        ttl: Seconds an entry lives in the shared backend
+        local_ttl: Seconds an entry lives in this process's LRU when the
+            invalidation bus is not connected; with it, entries live `ttl`
+        max_local_entries: LRU capacity; defaults to CACHE_LOCAL_MAX_ENTRIES
+    """
+
+    def __init__(self, name, key_type, ttl, local_ttl, max_local_entries=None):
+        if name in NAMESPACES:
+            raise ValueError(f"Cache namespace {name!r} is already defined")
+        self.name = name
+        self.key_type = key_type
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self._max_local_entries = max_local_entries
+        self._local = None
+        self._generation = None
+        self._generation_checked_at = 0.0
+        self._stats = Counter()
+        self._stats_lock = threading.Lock()
+        NAMESPACES[name] = self
+
+    @property
+    def local(self):
+        if self._local is None:
+            self._local = LocalLRU(self._max_local_entries or settings.CACHE_LOCAL_MAX_ENTRIES)
+        return self._local
+
+    @property
+    def shared(self):
+        return caches[settings.SHARED_CACHE_ALIAS]
+
+    def _count(self, stat, amount=1):
+        with self._stats_lock:
+            self._stats[stat] += amount
+
+    def _local_ttl(self):
+        return self.ttl if is_listening() else self.local_ttl
+
+    def _shared_is_private(self):
+        return is_process_local(settings.SHARED_CACHE_ALIAS)
+
+    def _shared_ttl(self):
+        # A process-local "shared" backend is just another private copy, so it gets the LRU's bound
+        return self._local_ttl() if self._shared_is_private() else self.ttl
+
+    def _check_key(self, key):
+        if not isinstance(key, self.key_type):
+            raise TypeError(f"Cache namespace {self.name!r} expects {self.key_type.__name__} keys, got {key!r}")
+
+    def _generation_key(self):
+        return f"cache_generation_{self.name}"
+
+    def _current_generation(self):
+        """
+        The namespace generation, re-read from the shared backend every local_ttl.
+
+        A missing generation (never set, or evicted) is replaced by the current
+        time in ms, so it can never collide with one whose entries were orphaned.
+        """
+        now = time.monotonic()
+        if self._generation is None or now - self._generation_checked_at >= self._local_ttl():
+            try:
+                generation = self.shared.get(self._generation_key())
+                if generation is None:
+                    self.shared.add(self._generation_key(), int(time.time() * 1000), timeout=None)
+                    generation = self.shared.get(self._generation_key())
+            except Exception:
+                self._count("errors")
+                generation = self._generation if self._generation is not None else 0
+            if generation != self._generation:
+                self.local.clear()
+            self._generation = generation
+            self._generation_checked_at = now
+        return self._generation
+
+    def _shared_key(self, key, generation):
+        return f"{self.name}:{generation}:{key}"
+
+    def get(self, key, default=None):
+        self._check_key(key)
+        ensure_listener()
+        generation = self._current_generation()
+
+        value = self.local.get(key)
+        if value is not _MISSING:
+            self._count("local_hits")
+            return value
+
+        try:
+            value = self.shared.get(self._shared_key(key, generation), _MISSING)
+        except Exception:
+            self._count("errors")
+            value = _MISSING
+        if value is _MISSING:
+            self._count("misses")
+            return default
+
+        self._count("shared_hits")
+        self._count("evictions", self.local.set(key, value, self._local_ttl()))
+        return value
+
+    def set(self, key, value):
+        self._check_key(key)
+        generation = self._current_generation()
+        try:
+            self.shared.set(self._shared_key(key, generation), value, self._shared_ttl())
+        except Exception:
+            self._count("errors")
+        self._count("evictions", self.local.set(key, value, self._local_ttl()))
+
+    def get_or_set(self, key, compute):
+        """
+        Return the cached value for `key`, computing and storing it on a miss.
+
+        `compute` reads from the primary. A miss often follows the invalidation
+        of a write that a lagging replica hasn't applied yet, and a stale row
+        cached then would outlive the lag by the whole ttl.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            with read_from_primary():
+                value = compute()
+            self.set(key, value)
+        return value
+
+    def delete(self, key, broadcast=True):
+        """
+        Drop `key` from the shared backend and this process's LRU.
+
+        With `broadcast=False` the caller publishes the eviction itself, to
+        batch several keys into one message.
+        """
+        self._check_key(key)
+        self.evict_local(key)
+        try:
+            self.shared.delete(self._shared_key(key, self._current_generation()))
+        except Exception:
+            self._count("errors")
+        self._count("invalidations")
+        if broadcast:
+            publish([(self.name, key)])
+
+    def evict_local(self, key):
+        """Drop `key` from this process's LRU, and from the shared backend if that is process-local too."""
+        self.local.delete(key)
+        if self._shared_is_private():
+            try:
+                self.shared.delete(self._shared_key(key, self._current_generation()))
+            except Exception:
+                self._count("errors")
+
+    def clear_local(self):
+        """
+        Empty this process's LRU and re-read the generation on the next access.
+
+        A process-local shared backend is emptied too, by bumping the generation
+        stored in it.
+        """
+        self.local.clear()
+        if self._shared_is_private():
+            self._bump_generation()
+        self._generation_checked_at = 0.0
+
+    def _bump_generation(self):
+        try:
+            self.shared.incr(self._generation_key())
+        except ValueError:
+            self.shared.set(self._generation_key(), int(time.time() * 1000), timeout=None)
+        except Exception:
+            self._count("errors")
+
+    def invalidate_all(self):
+        """Orphan every entry in the namespace by bumping its generation."""
+        self._bump_generation()
+        self._generation = None
+        self.local.clear()
+        self._count("invalidations")
+        publish([(self.name, ALL_KEYS)])
+
+    def stats(self):
+        with self._stats_lock:
+            stats = {
+                stat: self._stats[stat]
+                for stat in ("local_hits", "shared_hits", "misses", "evictions", "invalidations", "errors")
+            }
+        lookups = stats["local_hits"] + stats["shared_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["local_hits"] + stats["shared_hits"]) / lookups, 3) if lookups else 0.0
+        stats["local_entries"] = len(self.local)
+        return stats
+
+
+def get_cache_stats():
+    """Per-namespace counters for this worker process."""
+    return {"pid": os.getpid(), "namespaces": {name: ns.stats() for name, ns in NAMESPACES.items()}}
+
+
+USER_PROFILES = CacheNamespace("user_profile", int, ttl=300, local_ttl=5)
+PUBLIC_PROFILES = CacheNamespace("public_profile", int, ttl=3600, local_ttl=30)
+# Field projections of the user row (no password hash) for RevocableJWTAuthentication
+AUTH_USERS = CacheNamespace("auth_user_fields", int, ttl=300, local_ttl=5)
+MEDIA_LISTS = CacheNamespace("media_list", int, ttl=300, local_ttl=5)
+SHARE_LINKS = CacheNamespace("share_link", str, ttl=3600, local_ttl=30)
+PAYMENT_REPORTS = CacheNamespace("payment_report", str, ttl=900, local_ttl=60)
+
+
+def invalidate_user(user_id):
+    """
+    Forget everything cached about a user once the current transaction commits.
+
+    Deferring to commit keeps a concurrent reader from re-caching the old row
+    between our delete and the commit.
+    """
+
+    def invalidate():
+        namespaces = (USER_PROFILES, PUBLIC_PROFILES, AUTH_USERS)
+        for namespace in namespaces:
+            namespace.delete(user_id, broadcast=False)
+        publish([(namespace.name, user_id) for namespace in namespaces])
+
+    transaction.on_commit(invalidate)
+
+
+def invalidate_media(media_library):
+    """Forget a media library's share-link payload and its owner's media list after commit."""
+    media_unique_id = media_library.media_unique_id
+    created_by_id = media_library.created_by_id
+
+    def invalidate():
+        entries = []
+        if media_unique_id:
+            SHARE_LINKS.delete(str(media_unique_id), broadcast=False)
+            entries.append((SHARE_LINKS.name, str(media_unique_id)))
+        if created_by_id:
+            MEDIA_LISTS.delete(created_by_id, broadcast=False)
+            entries.append((MEDIA_LISTS.name, created_by_id))
+        publish(entries)
+
+    transaction.on_commit(invalidate)
@@ -0,0 +1,63 @@
+from django.db import transaction
+from django.db.models import F
+
+# CreditLedger.REASON_CHOICES
+OPENING_BALANCE = 0
+MEDIA_UPLOAD = 1
+PAYMENT_GRANT = 2
+REFUND = 3
+ADJUSTMENT = 4
+
+
+class InsufficientCredit(Exception):
+    """Raised when a debit would take User.remaining_credit below zero."""
+
+
+def debit_credit(user_id, amount=1, reason=MEDIA_UPLOAD, **ledger_fields):
+    """
+    Atomically take `amount` credits from a user and record it in the ledger.
+
+    The balance check and the decrement are one conditional UPDATE, so two
+    concurrent debits can never both spend the last credit, and only the two
+    credit columns are written.
+
+    Args:
+        user_id: The user to debit
+        amount: Number of credits to take
+        reason: One of CreditLedger.REASON_CHOICES
+        **ledger_fields: Extra CreditLedger fields (media_library, remarks, ...)
+
+    Returns:
+        CreditLedger: The ledger entry written for this debit
+
+    Raises:
+        InsufficientCredit: If the user has fewer than `amount` credits
+    """
+    from base.models import CreditLedger, User
+    from base.utils.cache import invalidate_user
+
+    with transaction.atomic():
+        updated = User.objects.filter(id=user_id, remaining_credit__gte=amount).update(
+            remaining_credit=F("remaining_credit") - amount,
+            used_credit=F("used_credit") + amount,
+        )
+        if not updated:
+            raise InsufficientCredit("You have no remaining credit")
+        invalidate_user(user_id)
+        return CreditLedger.objects.create(user_id=user_id, delta=-amount, reason=reason, **ledger_fields)
+
+
+def grant_credit(user_id, amount, reason=PAYMENT_GRANT, **ledger_fields):
+    """
+    Atomically add `amount` credits to a user and record it in the ledger.
+
+    Returns:
+        CreditLedger: The ledger entry written for this grant
+    """
+    from base.models import CreditLedger, User
+    from base.utils.cache import invalidate_user
+
+    with transaction.atomic():
+        User.objects.filter(id=user_id).update(remaining_credit=F("remaining_credit") + amount)
+        invalidate_user(user_id)
+        return CreditLedger.objects.create(user_id=user_id, delta=amount, reason=reason, **ledger_fields)
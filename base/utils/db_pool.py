@@ -0,0 +1,42 @@
+import os
+
+from django.db import connections
+
+
+def get_pool_stats():
+    """
+    Return connection-pool counters for every pooled database alias in this process.
+
+    Pools are per worker process, so the numbers describe the worker that served
+    the request (its pid is included). `waits` counts checkouts that found no
+    free connection and had to queue; `avg_wait_ms` is the queueing time spread
+    over all checkouts.
+
+    Returns:
+        dict: {"pid": int, "pools": {alias: {...}}}
+    """
+    pools = {}
+    for alias in connections:
+        connection = connections[alias]
+        if not connection.settings_dict.get("OPTIONS", {}).get("pool"):
+            continue
+
+        stats = connection.pool.get_stats()
+        requests_num = stats.get("requests_num", 0)
+        connections_num = stats.get("connections_num", 0)
+        pools[alias] = {
+            "size": stats.get("pool_size", 0),
+            "available": stats.get("pool_available", 0),
+            "min_size": stats.get("pool_min", 0),
+            "max_size": stats.get("pool_max", 0),
+            "checkouts": requests_num,
+            "waiting": stats.get("requests_waiting", 0),
+            "waits": stats.get("requests_queued", 0),
+            "wait_timeouts": stats.get("requests_errors", 0),
+            "avg_wait_ms": round(stats.get("requests_wait_ms", 0) / requests_num, 2) if requests_num else 0.0,
+            "avg_usage_ms": round(stats.get("usage_ms", 0) / requests_num, 2) if requests_num else 0.0,
+            "connections_opened": connections_num,
+            "avg_connect_ms": round(stats.get("connections_ms", 0) / connections_num, 2) if connections_num else 0.0,
+            "connections_lost": stats.get("connections_lost", 0),
+        }
+    return {"pid": os.getpid(), "pools": pools}
@@ -0,0 +1,138 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# True only while serving a safe request whose user has not written recently. Outside
+# requests (management commands, outbox drains, rollups) every read stays on the primary.
+_use_replica = ContextVar("use_replica", default=False)
+
+
+def check_db_pin_cache():
+    """
+    Refuse to start with replicas while read-your-writes pins live in a process-local cache.
+
+    A write handled by one worker would not pin the user's next read on another,
+    which could then serve stale rows from a lagging replica. DEBUG does not
+    exempt this; SHARED_CACHE_ALLOW_LOCAL (single-process deployments) does.
+    """
+    from base.utils.cache import is_process_local
+
+    if not settings.DB_REPLICA_ALIASES or settings.SHARED_CACHE_ALLOW_LOCAL:
+        return
+    if is_process_local(settings.DB_PIN_CACHE_ALIAS):
+        raise ImproperlyConfigured(
+            f"DB_REPLICA_HOSTS is set but cache {settings.DB_PIN_CACHE_ALIAS!r} is process-local, so other "
+            "workers would miss read-your-writes pins; set REDIS_URL (or SHARED_CACHE_ALLOW_LOCAL=True for a "
+            "single-process deployment)"
+        )
+
+
+def _pin_key(user_id):
+    return f"db_pin_primary_{user_id}"
+
+
+def mark_recent_write(user_id):
+    """Pin `user_id`'s reads to the primary for READ_YOUR_WRITES_SECONDS."""
+    caches[settings.DB_PIN_CACHE_ALIAS].set(_pin_key(user_id), True, settings.READ_YOUR_WRITES_SECONDS)
+
+
+@contextmanager
+def read_from_primary():
+    """Send the enclosed block's reads to the primary, even during a safe request."""
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def pin_reads_if_recent_write(user_id):
+    """Send the rest of this request's reads to the primary if `user_id` wrote within the window."""
+    if _use_replica.get() and caches[settings.DB_PIN_CACHE_ALIAS].get(_pin_key(user_id)):
+        _use_replica.set(False)
+
+
+class PrimaryReplicaRouter:
+    """
+    Route reads of safe requests to a random replica; everything else uses the primary.
+
+    Reads stay on the primary when the request writes, when the user wrote within
+    READ_YOUR_WRITES_SECONDS (so a studio sees its album right after uploading),
+    inside a transaction on the primary, and within `read_from_primary` (cache fills). Replicas are listed in
+    DB_REPLICA_ALIASES; with none configured this router is a no-op.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DB_REPLICA_ALIASES
+        if not replicas or not _use_replica.get() or connections["default"].in_atomic_block:
+            return "default"
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Schema reaches replicas through replication
+        if db in settings.DB_REPLICA_ALIASES:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Opens the replica window for safe requests and records writes for stickiness.
+
+    The user is only known once DRF authenticates, so RevocableJWTAuthentication
+    calls `pin_reads_if_recent_write`; after the response, a successful unsafe
+    request by an authenticated user starts that user's primary-only window.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = _use_replica.set(request.method in SAFE_METHODS)
+        try:
+            response = self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+        self._record_write(request, response)
+        return response
+
+    async def __acall__(self, request):
+        token = _use_replica.set(request.method in SAFE_METHODS)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+        if request.method not in SAFE_METHODS:
+            # request.user may still be the lazy session user, which needs the sync ORM
+            await sync_to_async(self._record_write)(request, response)
+        return response
+
+    def _record_write(self, request, response):
+        if request.method in SAFE_METHODS or response.status_code >= 400:
+            return
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            mark_recent_write(user.id)
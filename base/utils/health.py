@@ -0,0 +1,146 @@
+"""
+Readiness checks for the load balancer.
+
+Liveness (api/health/, api/health/live/) only shows that the worker answers.
+Readiness (api/health/ready/) also requires working dependencies:
+
+- the primary database (replicas are reported but don't gate readiness:
+  a replica outage hits every worker alike, so taking workers out of
+  rotation wouldn't route around it);
+- the S3 bucket, through the process's shared client;
+- spare request threads: shared pools fed through track_queue must not be
+  backed up beyond READINESS_MAX_QUEUE_DEPTH, and uploads in flight must
+  stay below READINESS_MAX_UPLOADS_IN_FLIGHT. Each upload request feeds its
+  own private pool, so that pool's backlog only reflects the album's size.
+
+Probing on every hit would add load exactly when things are slow. Instead a
+background thread in each worker re-runs the checks every
+READINESS_CHECK_INTERVAL seconds and the endpoint serves the last result. A
+result older than READINESS_MAX_AGE, for instance because a check hangs,
+counts as not ready.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from base.utils.metrics import in_flight, queue_depths
+
+logger = logging.getLogger(__name__)
+
+# Latest result; replaced whole, so readers never see a half-updated one
+_status = None
+_refresher_pid = None
+_refresher_lock = threading.Lock()
+
+
+def _check_database(alias):
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    finally:
+        # Back to the pool (or closed); the refresher thread shouldn't pin a connection
+        connection.close()
+    return {}
+
+
+def _check_s3():
+    from base.utils.s3_utils import get_s3_client
+
+    get_s3_client().head_bucket(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
+    return {}
+
+
+# Pools created per request (MediaView.post); a large album queues many files without saturating anything
+PER_REQUEST_POOLS = {"media_upload"}
+
+
+def _check_executors():
+    depths = queue_depths()
+    uploads = in_flight().get("media_upload", 0)
+    result = {"queue_depths": depths, "uploads_in_flight": uploads}
+    backed_up = any(
+        depth > settings.READINESS_MAX_QUEUE_DEPTH for pool, depth in depths.items() if pool not in PER_REQUEST_POOLS
+    )
+    max_uploads = settings.READINESS_MAX_UPLOADS_IN_FLIGHT
+    if backed_up or (max_uploads and uploads >= max_uploads):
+        return {"ok": False, "error": "saturated", **result}
+    return result
+
+
+def _run_check(name, required, check, *args):
+    """Run `check`, which returns extra result fields (optionally ok=False) or raises."""
+    started = time.perf_counter()
+    result = {"ok": True, "required": required}
+    exc = None
+    try:
+        result.update(check(*args))
+    except Exception as e:
+        exc = e
+        # Only the exception type: the endpoint is public and messages can name hosts
+        result.update(ok=False, error=type(e).__name__)
+    result["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    previous = (_status or {}).get("checks", {}).get(name)
+    if not result["ok"] and (previous is None or previous["ok"]):
+        # Logged on the transition only; probes keep failing every interval
+        logger.warning("Readiness check %s failed: %s", name, result["error"], exc_info=exc)
+    return result
+
+
+def run_checks():
+    """Run every readiness check now and return the result."""
+    checks = {"database": _run_check("database", True, _check_database, "default")}
+    for alias in settings.DB_REPLICA_ALIASES:
+        checks[alias] = _run_check(alias, False, _check_database, alias)
+    if settings.READINESS_CHECK_S3:
+        checks["s3"] = _run_check("s3", True, _check_s3)
+    checks["executors"] = _run_check("executors", True, _check_executors)
+    return {
+        "ready": all(check["ok"] for check in checks.values() if check["required"]),
+        "checked_at": time.time(),
+        "checks": checks,
+    }
+
+
+def _refresh_forever():
+    global _status
+
+    while True:
+        try:
+            _status = run_checks()
+        except Exception:
+            logger.exception("Readiness refresh failed")
+        time.sleep(settings.READINESS_CHECK_INTERVAL)
+
+
+def ensure_refresher():
+    """Start this process's refresher thread if it isn't running."""
+    global _refresher_pid, _status
+
+    if _refresher_pid == os.getpid():
+        return
+    with _refresher_lock:
+        if _refresher_pid == os.getpid():
+            return
+        # A forked child inherits the master's result but not its thread
+        _status = None
+        threading.Thread(target=_refresh_forever, name="readiness-refresher", daemon=True).start()
+        _refresher_pid = os.getpid()
+
+
+def get_readiness():
+    """The cached readiness result, marked not ready if missing or stale."""
+    ensure_refresher()
+    status = _status
+    if status is None:
+        return {"ready": False, "reason": "starting", "checks": {}}
+    age = time.time() - status["checked_at"]
+    if age > settings.READINESS_MAX_AGE:
+        return {**status, "ready": False, "reason": "stale", "age_seconds": round(age, 1)}
+    return {**status, "age_seconds": round(age, 1)}
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import IntegrityError
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+# IdempotencyKey.STATUS_CHOICES
+IN_PROGRESS = 0
+COMPLETED = 1
+
+
+def _describe(value):
+    # Uploads are identified by name and size rather than read and hashed
+    if isinstance(value, UploadedFile):
+        return {"file": value.name, "size": value.size}
+    return value
+
+
+def _body_digest(request):
+    data = request.data
+    if hasattr(data, "lists"):
+        # Form and multipart bodies (a QueryDict, files included); keeps repeated fields
+        data = {key: [_describe(value) for value in values] for key, values in data.lists()}
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _fingerprint(request):
+    # The path is cut short so the body digest always fits in request_fingerprint
+    return f"{request.method} {request.path[:200]} {_body_digest(request)}"
+
+
+def _claim(user, key, fingerprint):
+    """Insert the in-progress marker; returns None if we own the key, else the existing row."""
+    from base.models import IdempotencyKey
+
+    try:
+        IdempotencyKey.objects.create(user=user, key=key, request_fingerprint=fingerprint)
+        return None
+    except IntegrityError:
+        return IdempotencyKey.objects.filter(user=user, key=key).first()
+
+
+def _wait_for_completion(record):
+    """Poll an in-progress key until the first request finishes or IDEMPOTENCY_WAIT_SECONDS pass."""
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    while record is not None and record.status == IN_PROGRESS and time.monotonic() < deadline:
+        time.sleep(settings.IDEMPOTENCY_POLL_SECONDS)
+        record = type(record).objects.filter(id=record.id).first()
+    return record
+
+
+def _replay(record):
+    return Response(record.response_body, status=record.response_status, headers={"Idempotent-Replayed": "true"})
+
+
+def idempotent(view_method):
+    """
+    Make an APIView handler run at most once per (user, Idempotency-Key).
+
+    The first request claims the key and runs normally; its response is
+    stored when it finishes with a non-5xx status. A retry with the same key
+    gets the stored response replayed. A concurrent duplicate waits for the
+    first request to finish and then replays its result. Requests without the
+    header, or from anonymous users, are handled as before. Reusing a key
+    with a different method, path or body is rejected with 422.
+    """
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        from base.models import IdempotencyKey
+
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        user = request.user
+        if not key or not user or not user.is_authenticated:
+            return view_method(self, request, *args, **kwargs)
+
+        if len(key) > 255:
+            return Response(
+                {"error": f"{IDEMPOTENCY_HEADER} must be at most 255 characters"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fingerprint = _fingerprint(request)
+        existing = _claim(user, key, fingerprint)
+
+        # A marker left behind by a crashed worker is taken over rather than blocking retries forever
+        stale_before = timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+        if existing is not None and existing.status == IN_PROGRESS and existing.updated_at < stale_before:
+            existing.delete()
+            existing = _claim(user, key, fingerprint)
+
+        if existing is not None:
+            if existing.request_fingerprint != fingerprint:
+                return Response(
+                    {"error": f"{IDEMPOTENCY_HEADER} was already used for a different request"},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            existing = _wait_for_completion(existing)
+            if existing is not None and existing.status == COMPLETED:
+                return _replay(existing)
+            return Response(
+                {"error": "A request with this Idempotency-Key is still in progress"},
+                status=status.HTTP_409_CONFLICT,
+                headers={"Retry-After": "5"},
+            )
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            IdempotencyKey.objects.filter(user=user, key=key).delete()
+            raise
+
+        if response.status_code >= 500:
+            # Server-side failures are not final; let the client retry with the same key
+            IdempotencyKey.objects.filter(user=user, key=key).delete()
+        else:
+            IdempotencyKey.objects.filter(user=user, key=key).update(
+                status=COMPLETED,
+                response_status=response.status_code,
+                response_body=response.data,
+                updated_at=timezone.now(),
+            )
+        return response
+
+    return wrapper
@@ -0,0 +1,131 @@
+"""
+Cross-worker invalidation for the in-process tier of base.utils.cache.
+
+Deletes and namespace flushes are published on a Postgres NOTIFY channel. Each
+worker process runs one listener thread that evicts the matching local
+entries (and the shared-tier ones, when that backend is process-local). While
+a worker's listener is connected, its local tier can keep entries as long as
+the shared tier does.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Key that stands for "every entry in the namespace"
+ALL_KEYS = "*"
+
+_listener_pid = None
+_listener_lock = threading.Lock()
+_listening = threading.Event()
+
+
+def _bus_enabled():
+    return settings.CACHE_INVALIDATION_BUS and connections["default"].vendor == "postgresql"
+
+
+def is_listening():
+    """True if this process's listener is connected, i.e. peers' invalidations reach us."""
+    return _listener_pid == os.getpid() and _listening.is_set()
+
+
+def publish(entries):
+    """
+    Tell every other worker to evict `entries` from its local tier.
+
+    Inside a transaction, Postgres delivers the notification only on commit.
+
+    Args:
+        entries: Iterable of (namespace name, key) pairs; key may be ALL_KEYS
+    """
+    entries = [[name, key] for name, key in entries]
+    if not entries or not _bus_enabled():
+        return
+    payload = json.dumps({"pid": os.getpid(), "entries": entries}, separators=(",", ":"))
+    try:
+        with connections["default"].cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [settings.CACHE_INVALIDATION_CHANNEL, payload])
+    except Exception:
+        # Peers fall back to their local TTL for this change
+        logger.exception("Failed to publish cache invalidation")
+
+
+def _apply(payload):
+    from base.utils.cache import NAMESPACES
+
+    message = json.loads(payload)
+    if message.get("pid") == os.getpid():
+        # Evicted locally before publishing
+        return
+    for name, key in message["entries"]:
+        namespace = NAMESPACES.get(name)
+        if namespace is None:
+            continue
+        if key == ALL_KEYS:
+            namespace.clear_local()
+        else:
+            namespace.evict_local(key)
+
+
+def _clear_all_local():
+    from base.utils.cache import NAMESPACES
+
+    for namespace in NAMESPACES.values():
+        namespace.clear_local()
+
+
+def _listen_forever():
+    import psycopg
+
+    settings_dict = connections["default"].settings_dict
+    backoff = 1
+    while True:
+        try:
+            with psycopg.connect(
+                dbname=settings_dict["NAME"],
+                user=settings_dict["USER"],
+                password=settings_dict["PASSWORD"],
+                host=settings_dict["HOST"],
+                port=settings_dict["PORT"],
+                autocommit=True,
+                keepalives=1,
+                keepalives_idle=30,
+                application_name="cache-invalidation-listener",
+            ) as conn:
+                conn.execute(f'LISTEN "{settings.CACHE_INVALIDATION_CHANNEL}"')
+                # Anything cached while we weren't listening may have missed its eviction
+                _clear_all_local()
+                _listening.set()
+                backoff = 1
+                for notify in conn.notifies():
+                    try:
+                        _apply(notify.payload)
+                    except Exception:
+                        logger.exception("Bad cache invalidation message: %r", notify.payload)
+        except Exception:
+            logger.exception("Cache invalidation listener disconnected; retrying in %ss", backoff)
+        _listening.clear()
+        time.sleep(backoff)
+        backoff = min(backoff * 2, 30)
+
+
+def ensure_listener():
+    """Start this process's listener thread if it isn't running (safe to call on every cache read)."""
+    global _listener_pid
+
+    if _listener_pid == os.getpid() or not _bus_enabled():
+        return
+    with _listener_lock:
+        if _listener_pid == os.getpid():
+            return
+        # A forked child inherits the flag but not the thread
+        _listening.clear()
+        threading.Thread(target=_listen_forever, name="cache-invalidation-listener", daemon=True).start()
+        _listener_pid = os.getpid()
@@ -0,0 +1,79 @@
+"""
+Offline stand-in for the S3 client, for benchmarks, load tests and local development.
+
+Implements only the calls base.utils.s3_utils makes. Objects are kept in
+memory, or written under a directory when one is given. Optional per-call
+latency and bandwidth caps make upload timings resemble a real network.
+"""
+
+import os
+import threading
+import time
+
+
+class LocalS3Client:
+    """
+    Args:
+        root: Directory to write objects to (one file per key); None keeps
+            them in memory
+        latency_ms: Delay added to every call, like a network round trip
+        bandwidth_mbps: Upload throughput cap in MB/s per call; 0 for none
+    """
+
+    def __init__(self, root=None, latency_ms=0, bandwidth_mbps=0):
+        self.root = root
+        self.latency_ms = latency_ms
+        self.bandwidth_mbps = bandwidth_mbps
+        self.objects = {}
+        self.calls = 0
+        self.bytes_uploaded = 0
+        self._lock = threading.Lock()
+
+    def _path(self, bucket, key):
+        path = os.path.normpath(os.path.join(self.root, bucket, key))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise ValueError(f"Invalid key: {key!r}")
+        return path
+
+    def _wait(self, size=0):
+        delay = self.latency_ms / 1000
+        if self.bandwidth_mbps:
+            delay += size / (self.bandwidth_mbps * 1024 * 1024)
+        if delay:
+            time.sleep(delay)
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Config=None, **kwargs):
+        data = Fileobj.read()
+        self._wait(len(data))
+        if self.root:
+            path = self._path(Bucket, Key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as fh:
+                fh.write(data)
+        else:
+            with self._lock:
+                self.objects[(Bucket, Key)] = data
+        with self._lock:
+            self.calls += 1
+            self.bytes_uploaded += len(data)
+
+    def head_bucket(self, Bucket, **kwargs):
+        self._wait()
+        if self.root:
+            # Fails like an unreachable bucket if the directory can't be used
+            os.makedirs(os.path.join(self.root, Bucket), exist_ok=True)
+        return {}
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        self._wait()
+        if self.root:
+            try:
+                os.remove(self._path(Bucket, Key))
+            except FileNotFoundError:
+                pass
+        else:
+            with self._lock:
+                self.objects.pop((Bucket, Key), None)
+        with self._lock:
+            self.calls += 1
+        return {}
@@ -0,0 +1,204 @@
+"""
+Structured, non-blocking logging with request correlation.
+
+- RequestContextMiddleware gives every request an ID (the client's
+  X-Request-ID if it looks sane, otherwise a fresh one), echoes it in the
+  response and writes one access-log line per request.
+- RequestContextFilter stamps each record with that ID. Work submitted
+  through base.utils.metrics.track_queue runs in a copy of the request
+  context, so upload threads log under the same ID.
+- INFO and DEBUG records are sampled per request (LOG_INFO_SAMPLE_RATE):
+  a sampled request keeps all of its lines, the others keep only
+  warnings and errors.
+- QueueLogHandler only enqueues; one listener thread per process formats
+  records as JSON lines and writes them, so request threads never wait on
+  stdout. When the queue is full, records are dropped and counted rather
+  than blocking.
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+access_logger = logging.getLogger("base.request")
+
+REQUEST_ID_HEADER = "X-Request-ID"
+_REQUEST_ID_RE = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+_request_id = ContextVar("request_id", default=None)
+# Whether this request's INFO/DEBUG records are kept; None outside requests (keep everything)
+_info_sampled = ContextVar("info_sampled", default=None)
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+def get_request_id():
+    """The current request's ID, or None outside a request."""
+    return _request_id.get()
+
+
+class RequestContextFilter(logging.Filter):
+    """Adds `request_id` to records and drops INFO/DEBUG records of unsampled requests."""
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING and _info_sampled.get() is False:
+            return False
+        record.request_id = _request_id.get()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line; `extra=` fields are included as top-level keys."""
+
+    def format(self, record):
+        data = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "pid": record.process,
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            data["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(data, default=str)
+
+
+class QueueLogHandler(QueueHandler):
+    """
+    Hands records to a per-process listener thread that writes JSON lines to `stream`.
+
+    The queue and listener are (re)created lazily in each process, so a
+    handler configured in the gunicorn master before forking still works in
+    every worker.
+    """
+
+    def __init__(self, stream=None, max_queue_size=10_000):
+        super().__init__(None)
+        self.stream = stream
+        self.max_queue_size = max_queue_size
+        self.dropped = 0
+        self._pid = None
+        self._listener = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(self.max_queue_size)
+            target = logging.StreamHandler(self.stream or sys.stdout)
+            target.setFormatter(JSONFormatter())
+            self._listener = QueueListener(self.queue, target, respect_handler_level=False)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def prepare(self, record):
+        # Merge args now (they may be mutated later) but leave formatting, and exc_info, to the listener
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self._listener is not None and self._pid == os.getpid():
+            # Flushes what's queued before the process exits
+            self._listener.stop()
+            self._listener = None
+            self._pid = None
+        super().close()
+
+
+class RequestContextMiddleware:
+    """Assigns the request ID, decides log sampling and writes the access-log line."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        tokens = self._enter(request)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            self._finish(request, response, started)
+        finally:
+            self._exit(tokens)
+        return response
+
+    async def __acall__(self, request):
+        tokens = self._enter(request)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+            self._finish(request, response, started)
+        finally:
+            self._exit(tokens)
+        return response
+
+    def _enter(self, request):
+        request_id = request.headers.get(REQUEST_ID_HEADER, "")
+        if not _REQUEST_ID_RE.fullmatch(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+        return (
+            _request_id.set(request_id),
+            _info_sampled.set(random.random() < settings.LOG_INFO_SAMPLE_RATE),
+        )
+
+    def _exit(self, tokens):
+        request_token, sampled_token = tokens
+        _request_id.reset(request_token)
+        _info_sampled.reset(sampled_token)
+
+    def _finish(self, request, response, started):
+        response[REQUEST_ID_HEADER] = request.request_id
+        match = getattr(request, "resolver_match", None)
+        access_logger.info(
+            "%s %s %s",
+            request.method,
+            request.path,
+            response.status_code,
+            extra={
+                "method": request.method,
+                "path": request.path,
+                "view": match.view_name if match else None,
+                "status": response.status_code,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            },
+        )
@@ -0,0 +1,189 @@
+"""
+Prometheus metrics for request handling and the media pipeline.
+
+Under gunicorn, PROMETHEUS_MULTIPROC_DIR (set in gunicorn.conf.py) makes every
+worker write its samples to memory-mapped files in that directory, and the
+metrics endpoint merges them, so a scrape sees all workers whichever one
+answers. Without it (runserver, management commands) metrics stay in-process.
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db.backends.signals import connection_created
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by view", ["view", "method", "status"], buckets=LATENCY_BUCKETS
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "SQL queries per request", ["view"], buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Time spent in SQL per request", ["view"], buckets=LATENCY_BUCKETS
+)
+
+S3_UPLOAD_SECONDS = Histogram("s3_upload_duration_seconds", "S3 upload duration", ["outcome"], buckets=LATENCY_BUCKETS)
+S3_UPLOAD_BYTES = Counter("s3_upload_bytes", "Bytes uploaded to S3")
+
+IMAGE_STAGE_SECONDS = Histogram(
+    "image_compress_stage_seconds",
+    "Time per _compress_image stage",
+    ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+IMAGE_QUALITY_ITERATIONS = Histogram(
+    "image_compress_quality_iterations", "JPEG encodes needed to reach the target size", buckets=(1, 2, 3, 4, 6, 8, 10, 14)
+)
+
+THREAD_POOL_QUEUE_DEPTH = Gauge(
+    "thread_pool_queue_depth", "Tasks submitted but not yet started", ["pool"], multiprocess_mode="livesum"
+)
+
+# Per-request SQL tally; a mutable holder so queries run in sync_to_async threads add to it too
+_request_db = ContextVar("request_db", default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        tally = _request_db.get()
+        if tally is not None:
+            tally[0] += 1
+            tally[1] += time.perf_counter() - started
+
+
+def _install_query_recorder(sender, connection, **kwargs):
+    # Fires on every connect (including each pool checkout); the wrapper list outlives it
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(_install_query_recorder)
+
+# This process's share of THREAD_POOL_QUEUE_DEPTH, readable without going through the registry
+_queue_depths = defaultdict(int)
+_queue_depths_lock = threading.Lock()
+
+
+def track_queue(pool, fn):
+    """
+    Wrap `fn` for executor.submit so THREAD_POOL_QUEUE_DEPTH counts it until a thread picks it up.
+
+    `fn` runs in a copy of the submitter's context, so per-request state (the
+    SQL tally, an active profile) follows the work onto the pool thread.
+    """
+    gauge = THREAD_POOL_QUEUE_DEPTH.labels(pool=pool)
+    gauge.inc()
+    with _queue_depths_lock:
+        _queue_depths[pool] += 1
+    context = copy_context()
+
+    def run(*args, **kwargs):
+        gauge.dec()
+        with _queue_depths_lock:
+            _queue_depths[pool] -= 1
+        return context.run(fn, *args, **kwargs)
+
+    return run
+
+
+def queue_depths():
+    """{pool: tasks submitted through track_queue but not yet started} for this process."""
+    with _queue_depths_lock:
+        return dict(_queue_depths)
+
+
+_in_flight = defaultdict(int)
+
+
+@contextmanager
+def track_in_flight(name):
+    """Count the enclosed block (or decorated function) in in_flight()[name] while it runs."""
+    with _queue_depths_lock:
+        _in_flight[name] += 1
+    try:
+        yield
+    finally:
+        with _queue_depths_lock:
+            _in_flight[name] -= 1
+
+
+def in_flight():
+    """{name: blocks inside track_in_flight right now} for this process."""
+    with _queue_depths_lock:
+        return dict(_in_flight)
+
+
+def render_metrics():
+    """Return (body, content type) for a Prometheus scrape, merged across workers when possible."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """Records latency and SQL load per view (labelled by URL name, so cardinality stays fixed)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        tally = [0, 0.0]
+        token = _request_db.set(tally)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_db.reset(token)
+        self._observe(request, response, time.perf_counter() - started, tally)
+        return response
+
+    async def __acall__(self, request):
+        tally = [0, 0.0]
+        token = _request_db.set(tally)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_db.reset(token)
+        self._observe(request, response, time.perf_counter() - started, tally)
+        return response
+
+    def _observe(self, request, response, elapsed, tally):
+        match = getattr(request, "resolver_match", None)
+        view = (match.view_name or match.route) if match else "unmatched"
+        REQUEST_LATENCY.labels(view=view, method=request.method, status=f"{response.status_code // 100}xx").observe(
+            elapsed
+        )
+        REQUEST_DB_QUERIES.labels(view=view).observe(tally[0])
+        REQUEST_DB_SECONDS.labels(view=view).observe(tally[1])
@@ -0,0 +1,85 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+# OutboxEvent.STATUS_CHOICES
+PENDING = 0
+PROCESSED = 1
+FAILED = 2
+
+PAYMENT_COMPLETED = "payment_completed"
+
+# Each handler receives every pending event of its type in the batch and must be idempotent:
+# events are delivered at least once.
+HANDLERS = {
+    PAYMENT_COMPLETED: "base.utils.payments.grant_payment_credits",
+}
+
+
+def enqueue(event_type, events):
+    """
+    Record side effects to run after the surrounding transaction commits.
+
+    Call inside the same transaction as the write that causes them. Events
+    whose dedupe key already exists are skipped, so re-enqueueing is harmless.
+
+    Args:
+        event_type: One of the HANDLERS keys
+        events: Iterable of (dedupe_key, payload) pairs
+    """
+    from base.models import OutboxEvent
+
+    OutboxEvent.objects.bulk_create(
+        [OutboxEvent(event_type=event_type, dedupe_key=key, payload=payload) for key, payload in events],
+        ignore_conflicts=True,
+    )
+
+
+def drain_batch(batch_size=500, max_attempts=5):
+    """
+    Claim up to `batch_size` pending events and run their handlers.
+
+    Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED so several workers
+    can drain in parallel. Each event type runs in its own savepoint; a
+    failing type is retried on a later batch until `max_attempts`.
+
+    Returns:
+        int: Number of events claimed
+    """
+    from base.models import OutboxEvent
+
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True).filter(status=PENDING).order_by("id")[:batch_size]
+        )
+        if not events:
+            return 0
+
+        by_type = defaultdict(list)
+        for event in events:
+            by_type[event.event_type].append(event)
+
+        processed_ids = []
+        for event_type, group in by_type.items():
+            ids = [event.id for event in group]
+            try:
+                handler = import_string(HANDLERS[event_type])
+                with transaction.atomic():
+                    handler(group)
+                processed_ids.extend(ids)
+            except Exception as e:
+                OutboxEvent.objects.filter(id__in=ids).update(
+                    attempts=F("attempts") + 1,
+                    last_error=str(e)[:2000],
+                    status=Case(When(attempts__gte=max_attempts - 1, then=Value(FAILED)), default=Value(PENDING)),
+                )
+
+        if processed_ids:
+            OutboxEvent.objects.filter(id__in=processed_ids).update(
+                status=PROCESSED, attempts=F("attempts") + 1, processed_at=timezone.now()
+            )
+
+    return len(events)
@@ -0,0 +1,517 @@
+"""
+Monthly range partitioning of media_library_items by created_at (PostgreSQL only).
+
+Migrations create media_library_items as a plain table; `manage.py
+partition_media_items convert` turns it into a partitioned one online:
+
+1. A partitioned copy is created next to it, with one partition per month
+   and a default partition, and a trigger starts logging the ids of rows
+   written to the old table.
+2. Existing rows are copied in id batches; logged rows are then re-copied
+   from the old table until the log is nearly empty.
+3. Under a short exclusive lock the last logged rows are replayed and the
+   tables, indexes and id sequences swap names. The old table stays as
+   media_library_items_legacy until dropped, without its foreign keys, so
+   it never blocks deleting an album or a user.
+
+Postgres requires the primary key of a partitioned table to include the
+partition key, so the key becomes (id, created_at). Django still treats
+`id` as the primary key, which holds because ids all come from one sequence.
+
+Afterwards `ensure` keeps partitions created ahead of time, `detach` takes
+old months out of the table (optionally onto an archive tablespace), `attach`
+puts them back and `archive` exports a detached month to S3 and drops it.
+Items in a detached month no longer show up in their albums.
+
+Reads only skip partitions when the query bounds created_at, so album reads
+go through prefetch_album_items: an item is never older than its album, which
+gives a lower bound that prunes every month before the album's.
+"""
+
+import gzip
+import logging
+import re
+import tempfile
+import time
+from datetime import date, datetime, timezone
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Prefetch, prefetch_related_objects
+
+logger = logging.getLogger(__name__)
+
+TABLE = "media_library_items"
+NEW_TABLE = f"{TABLE}_new"
+LEGACY_TABLE = f"{TABLE}_legacy"
+CHANGES_TABLE = f"{TABLE}_changes"
+DEFAULT_PARTITION = f"{TABLE}_default"
+_PARTITION_RE = re.compile(rf"^{TABLE}_p(\d{{4}})(\d{{2}})$")
+_LOG_FUNCTION = f"{TABLE}_log_change"
+_LOG_TRIGGER = f"{TABLE}_log_change_trg"
+# Postgres truncates identifiers to this many bytes
+_MAX_NAME_LENGTH = 63
+
+
+class PartitioningError(Exception):
+    pass
+
+
+def _album_items(since):
+    from base.models import MediaLibraryItem
+
+    return Prefetch("media_library_items", queryset=MediaLibraryItem.objects.filter(created_at__gte=since))
+
+
+def prefetch_album_items(media_libraries):
+    """
+    Prefetch `media_library_items` for already-fetched albums, bounded below
+    by the oldest album's created_at so Postgres can skip older partitions.
+    """
+    media_libraries = [media_library for media_library in media_libraries if media_library is not None]
+    if media_libraries:
+        since = min(media_library.created_at for media_library in media_libraries)
+        prefetch_related_objects(media_libraries, _album_items(since))
+    return media_libraries
+
+
+async def aprefetch_album_items(media_libraries):
+    """Async version of prefetch_album_items."""
+    from django.db.models import aprefetch_related_objects
+
+    media_libraries = [media_library for media_library in media_libraries if media_library is not None]
+    if media_libraries:
+        since = min(media_library.created_at for media_library in media_libraries)
+        await aprefetch_related_objects(media_libraries, _album_items(since))
+    return media_libraries
+
+
+def month_start(value):
+    """First day of `value`'s month (UTC for datetimes)."""
+    if isinstance(value, datetime):
+        value = value.astimezone(timezone.utc).date()
+    return value.replace(day=1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def _partition_month(name):
+    match = _PARTITION_RE.match(name)
+    return date(int(match[1]), int(match[2]), 1) if match else None
+
+
+def _bound(month):
+    return datetime.combine(month, datetime.min.time(), timezone.utc)
+
+
+def _connection():
+    connection = connections["default"]
+    if connection.vendor != "postgresql":
+        raise PartitioningError(f"Partitioning needs PostgreSQL, not {connection.vendor}")
+    return connection
+
+
+def _set_lock_timeout(cursor):
+    # Never queue behind a long query while holding up every other writer; fail and let the caller retry
+    timeout = f"{settings.MEDIA_ITEMS_PARTITION_LOCK_TIMEOUT_MS}ms"
+    cursor.execute("SELECT set_config('lock_timeout', %s, true)", [timeout])
+
+
+def _relkind(cursor, name):
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [name])
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def is_partitioned():
+    with _connection().cursor() as cursor:
+        return _relkind(cursor, TABLE) == "p"
+
+
+def list_partitions():
+    """Monthly partitions, attached or detached, oldest first, then the default partition."""
+    with _connection().cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname, c.relispartition, c.reltuples::bigint, pg_total_relation_size(c.oid),
+                   coalesce(t.spcname, 'default')
+            FROM pg_class c
+            LEFT JOIN pg_tablespace t ON t.oid = c.reltablespace
+            WHERE c.relkind = 'r' AND c.relnamespace = current_schema()::regnamespace
+              AND (c.relname ~ %s OR c.relname = %s)
+            ORDER BY c.relname
+            """,
+            [_PARTITION_RE.pattern, DEFAULT_PARTITION],
+        )
+        rows = cursor.fetchall()
+    return [
+        {
+            "name": name,
+            "month": _partition_month(name),
+            "attached": attached,
+            # Planner estimate; -1 until the table has been analyzed
+            "rows_estimate": rows_estimate,
+            "bytes": size,
+            "tablespace": tablespace,
+        }
+        for name, attached, rows_estimate, size, tablespace in sorted(rows, key=lambda row: row[0] == DEFAULT_PARTITION)
+    ]
+
+
+def _create_partition(cursor, parent, month):
+    name = partition_name(month)
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{parent}" FOR VALUES FROM (%s) TO (%s)',
+        [_bound(month), _bound(add_months(month, 1))],
+    )
+    return name
+
+
+def ensure_partitions(months_ahead=None, today=None):
+    """Create any missing partition from this month to `months_ahead` months out; returns the new names."""
+    months_ahead = settings.MEDIA_ITEMS_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    current = month_start(today or datetime.now(timezone.utc))
+    wanted = [add_months(current, offset) for offset in range(months_ahead + 1)]
+    if not is_partitioned():
+        raise PartitioningError(f"{TABLE} is not partitioned yet; run the convert step first")
+    existing = {partition["month"] for partition in list_partitions()}
+    created = []
+    connection = _connection()
+    for month in wanted:
+        if month in existing:
+            continue
+        # One transaction per partition keeps each lock on the parent short
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            _set_lock_timeout(cursor)
+            created.append(_create_partition(cursor, TABLE, month))
+    return created
+
+
+def default_partition_rows():
+    """Rows that fell into the default partition; non-zero means `ensure` isn't keeping up."""
+    with _connection().cursor() as cursor:
+        if _relkind(cursor, DEFAULT_PARTITION) is None:
+            return 0
+        cursor.execute(f'SELECT count(*) FROM "{DEFAULT_PARTITION}"')
+        return cursor.fetchone()[0]
+
+
+def detach_partitions(before, tablespace=None):
+    """
+    Detach every monthly partition that ends on or before the month `before`
+    and move it to `tablespace` if given; returns the detached names.
+    """
+    before = month_start(before)
+    detached = []
+    connection = _connection()
+    for partition in list_partitions():
+        month = partition["month"]
+        if not partition["attached"] or month is None or add_months(month, 1) > before:
+            continue
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            _set_lock_timeout(cursor)
+            cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{partition["name"]}"')
+        if tablespace:
+            # Rewrites the table; nothing reads it any more, so the exclusive lock this takes doesn't matter
+            with connection.cursor() as cursor:
+                cursor.execute(f'ALTER TABLE "{partition["name"]}" SET TABLESPACE "{tablespace}"')
+        detached.append(partition["name"])
+    return detached
+
+
+def attach_partition(month):
+    """Re-attach a detached month, e.g. when an archived event is needed again."""
+    month = month_start(month)
+    name = partition_name(month)
+    connection = _connection()
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        _set_lock_timeout(cursor)
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)',
+            [_bound(month), _bound(add_months(month, 1))],
+        )
+    return name
+
+
+def archive_partition(name, s3_client=None):
+    """
+    Export a detached partition to S3 as gzipped CSV (header row included),
+    then drop it; returns (key, row count).
+    """
+    from base.utils.s3_utils import get_s3_client
+
+    connection = _connection()
+    partition = next((partition for partition in list_partitions() if partition["name"] == name), None)
+    if partition is None or partition["month"] is None:
+        raise PartitioningError(f"No monthly partition named {name}")
+    if partition["attached"]:
+        raise PartitioningError(f"{name} is still attached; detach it first")
+
+    key = f"{settings.MEDIA_ITEMS_ARCHIVE_S3_PREFIX.strip('/')}/{name}.csv.gz"
+    rows = 0
+    with tempfile.TemporaryFile() as buffer:
+        with gzip.GzipFile(fileobj=buffer, mode="wb") as archive, connection.cursor() as cursor:
+            with cursor.copy(f'COPY (SELECT * FROM "{name}" ORDER BY id) TO STDOUT WITH (FORMAT csv, HEADER)') as copy:
+                for chunk in copy:
+                    archive.write(chunk)
+            cursor.execute(f'SELECT count(*) FROM "{name}"')
+            rows = cursor.fetchone()[0]
+        buffer.seek(0)
+        extra_args = {"ContentType": "text/csv", "ContentEncoding": "gzip"}
+        if settings.MEDIA_ITEMS_ARCHIVE_STORAGE_CLASS:
+            extra_args["StorageClass"] = settings.MEDIA_ITEMS_ARCHIVE_STORAGE_CLASS
+        (s3_client or get_s3_client()).upload_fileobj(
+            buffer, settings.AWS_STORAGE_BUCKET_NAME, key, ExtraArgs=extra_args
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE "{name}"')
+    return key, rows
+
+
+def drop_legacy_table():
+    """Drop the pre-conversion table once the partitioned one has proven itself."""
+    with _connection().cursor() as cursor:
+        if _relkind(cursor, LEGACY_TABLE) is None:
+            return False
+        cursor.execute(f'DROP TABLE "{LEGACY_TABLE}"')
+    return True
+
+
+def _columns(cursor, table):
+    cursor.execute(
+        "SELECT attname FROM pg_attribute WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped "
+        "ORDER BY attnum",
+        [table],
+    )
+    return ", ".join(f'"{name}"' for name, in cursor.fetchall())
+
+
+def _temporary_name(name):
+    return f"{name[:_MAX_NAME_LENGTH - 4]}_new"
+
+
+def _legacy_name(name):
+    return f"{name[:_MAX_NAME_LENGTH - 7]}_legacy"
+
+
+def _secondary_indexes(cursor, table):
+    """(name, definition) of the table's indexes other than the primary key."""
+    cursor.execute(
+        """
+        SELECT c.relname, pg_get_indexdef(i.indexrelid), i.indisunique
+        FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = %s::regclass AND NOT i.indisprimary
+        ORDER BY c.relname
+        """,
+        [table],
+    )
+    indexes = []
+    for name, definition, unique in cursor.fetchall():
+        if unique:
+            # A unique index on a partitioned table must include created_at, which would change its meaning
+            raise PartitioningError(f"Unique index {name} can't be carried over to a partitioned {TABLE}")
+        indexes.append((name, definition))
+    return indexes
+
+
+def _foreign_keys(cursor, table):
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+        [table],
+    )
+    return cursor.fetchall()
+
+
+def _sequence(cursor, table):
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+    return cursor.fetchone()[0]
+
+
+def _months_covering(cursor, months_ahead):
+    cursor.execute(f'SELECT min(created_at) FROM "{TABLE}"')
+    oldest = cursor.fetchone()[0]
+    current = month_start(datetime.now(timezone.utc))
+    month = month_start(oldest) if oldest else current
+    months = []
+    while month <= add_months(current, months_ahead):
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def _replay_changes(cursor, columns, limit=None):
+    """Re-copy rows whose ids the trigger logged, from the old table's current state; returns how many."""
+    cursor.execute(
+        f'SELECT DISTINCT id FROM "{CHANGES_TABLE}" ORDER BY id' + (" LIMIT %s" if limit else ""),
+        [limit] if limit else [],
+    )
+    ids = [row[0] for row in cursor.fetchall()]
+    if ids:
+        # Log entries written after this statement survive and are picked up by the next round
+        cursor.execute(f'DELETE FROM "{CHANGES_TABLE}" WHERE id = ANY(%s)', [ids])
+        cursor.execute(f'DELETE FROM "{NEW_TABLE}" WHERE id = ANY(%s)', [ids])
+        cursor.execute(
+            f'INSERT INTO "{NEW_TABLE}" ({columns}) SELECT {columns} FROM "{TABLE}" WHERE id = ANY(%s)', [ids]
+        )
+    return len(ids)
+
+
+def _check_item_dates(cursor):
+    """Items dated before their album would be hidden by prefetch_album_items' lower bound."""
+    cursor.execute(
+        f"""
+        SELECT count(*) FROM "{TABLE}" i JOIN media_libraries m ON m.id = i.media_library_id
+        WHERE i.created_at < m.created_at
+        """
+    )
+    return cursor.fetchone()[0]
+
+
+def convert(batch_size=10_000, months_ahead=None, fix_item_dates=False, log=logger.info):
+    """
+    Convert the plain table into a partitioned one (see the module docstring).
+
+    Safe to re-run after an interruption: the copy restarts from the rows
+    already present in the new table. `log` receives progress messages.
+    """
+    months_ahead = settings.MEDIA_ITEMS_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    connection = _connection()
+
+    with connection.cursor() as cursor:
+        kind = _relkind(cursor, TABLE)
+        if kind == "p":
+            raise PartitioningError(f"{TABLE} is already partitioned")
+        if _relkind(cursor, LEGACY_TABLE) is not None:
+            raise PartitioningError(f"{LEGACY_TABLE} exists from an earlier conversion; drop it first")
+
+        misdated = _check_item_dates(cursor)
+        if misdated and not fix_item_dates:
+            raise PartitioningError(
+                f"{misdated} items are dated before their album; rerun with the option to move them to the album's date"
+            )
+        if misdated:
+            cursor.execute(
+                f"""
+                UPDATE "{TABLE}" i SET created_at = m.created_at FROM media_libraries m
+                WHERE m.id = i.media_library_id AND i.created_at < m.created_at
+                """
+            )
+            log(f"Moved {misdated} items to their album's created_at")
+
+        columns = _columns(cursor, TABLE)
+        resuming = _relkind(cursor, NEW_TABLE) is not None
+
+    if not resuming:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            _set_lock_timeout(cursor)
+            cursor.execute(
+                f'CREATE TABLE "{NEW_TABLE}" (LIKE "{TABLE}" INCLUDING DEFAULTS INCLUDING IDENTITY '
+                f"INCLUDING CONSTRAINTS INCLUDING STORAGE INCLUDING COMMENTS) PARTITION BY RANGE (created_at)"
+            )
+            cursor.execute(f'ALTER TABLE "{NEW_TABLE}" ADD PRIMARY KEY (id, created_at)')
+            for month in _months_covering(cursor, months_ahead):
+                _create_partition(cursor, NEW_TABLE, month)
+            cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{NEW_TABLE}" DEFAULT')
+
+            # From here on every write to the old table leaves its id behind for _replay_changes
+            cursor.execute(f'CREATE TABLE "{CHANGES_TABLE}" (id integer NOT NULL)')
+            cursor.execute(f'CREATE INDEX ON "{CHANGES_TABLE}" (id)')
+            cursor.execute(
+                f"""
+                CREATE FUNCTION "{_LOG_FUNCTION}"() RETURNS trigger LANGUAGE plpgsql AS $$
+                BEGIN
+                    IF TG_OP = 'DELETE' THEN
+                        INSERT INTO "{CHANGES_TABLE}" (id) VALUES (OLD.id);
+                    ELSE
+                        INSERT INTO "{CHANGES_TABLE}" (id) VALUES (NEW.id);
+                    END IF;
+                    RETURN NULL;
+                END $$
+                """
+            )
+            cursor.execute(
+                f'CREATE TRIGGER "{_LOG_TRIGGER}" AFTER INSERT OR UPDATE OR DELETE ON "{TABLE}" '
+                f'FOR EACH ROW EXECUTE FUNCTION "{_LOG_FUNCTION}"()'
+            )
+        log(f"Created {NEW_TABLE} and started logging writes to {TABLE}")
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT coalesce(max(id), 0) FROM "{NEW_TABLE}"')
+        copied_up_to = cursor.fetchone()[0]
+        cursor.execute(f'SELECT coalesce(max(id), 0) FROM "{TABLE}"')
+        last_id = cursor.fetchone()[0]
+
+    # Rows past last_id, and rows changed while copying, arrive through the change log
+    started = time.monotonic()
+    while copied_up_to < last_id:
+        upper = copied_up_to + batch_size
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO "{NEW_TABLE}" ({columns}) SELECT {columns} FROM "{TABLE}" '
+                "WHERE id > %s AND id <= %s ON CONFLICT DO NOTHING",
+                [copied_up_to, upper],
+            )
+        copied_up_to = upper
+        log(f"Copied ids up to {min(copied_up_to, last_id)} of {last_id} ({time.monotonic() - started:.0f}s)")
+
+    with connection.cursor() as cursor:
+        indexes = _secondary_indexes(cursor, TABLE)
+        for name, definition in indexes:
+            # Same definition, temporary name (index names are unique per schema)
+            definition = re.sub(
+                r"^CREATE INDEX \S+ ON (ONLY )?\S+ ",
+                f'CREATE INDEX IF NOT EXISTS "{_temporary_name(name)}" ON "{NEW_TABLE}" ',
+                definition,
+            )
+            cursor.execute(definition)
+        existing_foreign_keys = {name for name, _ in _foreign_keys(cursor, NEW_TABLE)}
+        for name, definition in _foreign_keys(cursor, TABLE):
+            if name not in existing_foreign_keys:
+                cursor.execute(f'ALTER TABLE "{NEW_TABLE}" ADD CONSTRAINT "{name}" {definition}')
+        cursor.execute(f'ANALYZE "{NEW_TABLE}"')
+    log(f"Built {len(indexes)} indexes and the foreign keys")
+
+    # Catch up outside the lock until what's left replays in a moment
+    while True:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            replayed = _replay_changes(cursor, columns, limit=batch_size)
+        if replayed <= batch_size // 10:
+            break
+        log(f"Replayed {replayed} changed rows")
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        _set_lock_timeout(cursor)
+        cursor.execute(f'LOCK TABLE "{TABLE}" IN ACCESS EXCLUSIVE MODE')
+        replayed = _replay_changes(cursor, columns)
+        cursor.execute(f'DROP TRIGGER "{_LOG_TRIGGER}" ON "{TABLE}"')
+        cursor.execute(f'DROP FUNCTION "{_LOG_FUNCTION}"()')
+        cursor.execute(f'DROP TABLE "{CHANGES_TABLE}"')
+
+        # New ids continue where the old sequence left off
+        old_sequence, new_sequence = _sequence(cursor, TABLE), _sequence(cursor, NEW_TABLE)
+        cursor.execute(f"SELECT last_value, is_called FROM {old_sequence}")
+        last_value, is_called = cursor.fetchone()
+        cursor.execute("SELECT setval(%s, %s, %s)", [new_sequence, last_value, is_called])
+
+        # Cascades only reach the new table; rows left in the old one would fail the delete at commit
+        for name, _ in _foreign_keys(cursor, TABLE):
+            cursor.execute(f'ALTER TABLE "{TABLE}" DROP CONSTRAINT "{name}"')
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME CONSTRAINT "{TABLE}_pkey" TO "{LEGACY_TABLE}_pkey"')
+        for name, _ in indexes:
+            cursor.execute(f'ALTER INDEX "{name}" RENAME TO "{_legacy_name(name)}"')
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{LEGACY_TABLE}"')
+        cursor.execute(f"ALTER SEQUENCE {old_sequence} RENAME TO \"{LEGACY_TABLE}_id_seq\"")
+
+        cursor.execute(f'ALTER TABLE "{NEW_TABLE}" RENAME TO "{TABLE}"')
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME CONSTRAINT "{NEW_TABLE}_pkey" TO "{TABLE}_pkey"')
+        for name, _ in indexes:
+            cursor.execute(f'ALTER INDEX "{_temporary_name(name)}" RENAME TO "{name}"')
+        cursor.execute(f"ALTER SEQUENCE {new_sequence} RENAME TO \"{TABLE}_id_seq\"")
+    log(f"Swapped in the partitioned {TABLE} ({replayed} rows replayed under lock); the old table is {LEGACY_TABLE}")
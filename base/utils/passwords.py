@@ -0,0 +1,163 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    PBKDF2PasswordHasher,
+    identify_hasher,
+    make_password,
+    must_update_salt,
+    verify_password,
+)
+from django.utils.crypto import constant_time_compare, get_random_string
+
+from base.utils.metrics import track_queue
+
+# Iteration count picked by `calibrate_hasher`, shared by every hasher instance in the process
+_calibrated_iterations = None
+_calibration_lock = threading.Lock()
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = None
+
+
+class PasswordVerificationBusy(Exception):
+    """Raised when the hashing pool is saturated and the caller should back off."""
+
+
+def calibrate_hasher(target_ms=None, probe_iterations=100_000):
+    """
+    Pick a PBKDF2 iteration count that takes roughly `target_ms` on this machine.
+
+    A short probe hash is timed and extrapolated linearly, then rounded to the
+    nearest 10k and clamped to PASSWORD_HASH_MIN_ITERATIONS so a slow box never
+    weakens stored hashes.
+
+    Returns:
+        int: The iteration count now used for new hashes
+    """
+    global _calibrated_iterations
+
+    if target_ms is None:
+        target_ms = settings.PASSWORD_HASH_TARGET_MS
+
+    with _calibration_lock:
+        hasher = PBKDF2PasswordHasher()
+        started = time.perf_counter()
+        hasher.encode("calibration-probe", get_random_string(22), probe_iterations)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        iterations = int(probe_iterations * target_ms / max(elapsed_ms, 0.001))
+        iterations = round(iterations, -4)
+        _calibrated_iterations = max(iterations, settings.PASSWORD_HASH_MIN_ITERATIONS)
+
+    return _calibrated_iterations
+
+
+class CalibratedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 hasher whose work factor is tuned to a target latency.
+
+    Hashes stay in the stock `pbkdf2_sha256$...` format, so rows remain readable
+    by Django's own hasher. Stored hashes are only ever upgraded: a worker that
+    calibrated slightly lower than another does not churn rows back down.
+    """
+
+    @property
+    def iterations(self):
+        if _calibrated_iterations is None:
+            calibrate_hasher()
+        return _calibrated_iterations
+
+    def must_update(self, encoded):
+        decoded = self.decode(encoded)
+        if decoded["iterations"] < self.iterations:
+            return True
+        return must_update_salt(decoded["salt"], self.salt_entropy)
+
+
+def _get_executor():
+    global _executor, _pending
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _pending = threading.BoundedSemaphore(settings.PASSWORD_VERIFY_MAX_PENDING)
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.PASSWORD_VERIFY_WORKERS, thread_name_prefix="password-hash"
+                )
+    return _executor
+
+
+def _run_in_pool(fn, *args):
+    """
+    Run a hashing call on the bounded pool and wait for its result.
+
+    At most PASSWORD_VERIFY_MAX_PENDING calls may be queued or running; beyond
+    that the caller gets `PasswordVerificationBusy` instead of piling onto the
+    CPU. The slot is released when the hash finishes, not when the caller stops
+    waiting, so timed-out requests still count against the bound. A hash that
+    doesn't finish within PASSWORD_VERIFY_TIMEOUT is reported the same way.
+    """
+    executor = _get_executor()
+    if not _pending.acquire(timeout=settings.PASSWORD_VERIFY_TIMEOUT):
+        raise PasswordVerificationBusy("Too many concurrent password checks")
+    try:
+        future = executor.submit(track_queue("password_hash", fn), *args)
+    except Exception:
+        _pending.release()
+        raise
+    future.add_done_callback(lambda _: _pending.release())
+    try:
+        return future.result(timeout=settings.PASSWORD_VERIFY_TIMEOUT)
+    except FutureTimeoutError:
+        raise PasswordVerificationBusy("Password check timed out")
+
+
+def _is_hashed(encoded):
+    try:
+        identify_hasher(encoded)
+    except ValueError:
+        return False
+    return True
+
+
+def verify_user_password(user, raw_password):
+    """
+    Check `raw_password` against `user`, rehashing the stored value when needed.
+
+    Legacy rows that still hold the plain-text password are migrated to a hash
+    on their first successful login. Hashing runs on the bounded pool; the row
+    is saved from the calling thread so pool threads never hold DB connections.
+
+    Args:
+        user: The User instance to check
+        raw_password: The password supplied by the client
+
+    Returns:
+        bool: True if the password matches
+
+    Raises:
+        PasswordVerificationBusy: If the hashing pool is saturated
+    """
+    if not user.has_usable_password():
+        return False
+
+    if _is_hashed(user.password):
+        is_correct, must_update = _run_in_pool(verify_password, raw_password, user.password)
+    else:
+        is_correct = bool(user.password) and constant_time_compare(user.password, raw_password)
+        must_update = is_correct
+
+    if is_correct and must_update:
+        user.password = hash_password(raw_password)
+        user.save(update_fields=["password"])
+    return is_correct
+
+
+def hash_password(raw_password):
+    """Hash `raw_password` on the bounded pool; see `verify_user_password`."""
+    return _run_in_pool(make_password, raw_password)
@@ -0,0 +1,142 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, F, IntegerField, Value, When
+
+# UserPaymentTransaction.TRANSACTION_STATUS_CHOICES
+PENDING = 0
+COMPLETED = 1
+FAILED = 2
+
+
+def apply_transaction_status_change(transaction, old_status, new_status):
+    """
+    Keep the owning User's payment aggregates in step with a transaction write.
+
+    Call inside the same database transaction as the write. Pass
+    `old_status=None` for a newly created transaction. Uses a single
+    F()-based UPDATE, so concurrent writes for the same user don't lose counts.
+
+    Args:
+        transaction: The UserPaymentTransaction that was created or updated
+        old_status: Status before the write, or None if it was just created
+        new_status: Status after the write
+    """
+    from base.models import User
+    from base.utils.cache import invalidate_user
+
+    changes = {}
+    pending_delta = int(new_status == PENDING) - int(old_status == PENDING)
+    if pending_delta:
+        changes["pending_transaction_count"] = F("pending_transaction_count") + pending_delta
+
+    paid_delta = int(new_status == COMPLETED) - int(old_status == COMPLETED)
+    if paid_delta:
+        changes["total_paid"] = F("total_paid") + paid_delta * transaction.transaction_amount
+
+    if old_status is None:
+        changes["last_payment_transaction"] = transaction
+
+    if changes:
+        User.objects.filter(id=transaction.user_id).update(**changes)
+    # The profile also shows the last transaction's status
+    invalidate_user(transaction.user_id)
+
+
+def apply_pending_transactions_resolved(transactions, new_status):
+    """
+    Set-based counterpart of `apply_transaction_status_change` for bulk transitions.
+
+    Every transaction passed must have just moved from Pending to `new_status`.
+    All affected users are updated by a single CASE-based UPDATE.
+
+    Args:
+        transactions: Iterable of (user_id, transaction_amount) pairs
+        new_status: The status the transactions moved to
+    """
+    from base.models import User
+    from base.utils.cache import invalidate_user
+
+    resolved_per_user = defaultdict(int)
+    paid_per_user = defaultdict(Decimal)
+    for user_id, amount in transactions:
+        resolved_per_user[user_id] += 1
+        paid_per_user[user_id] += amount
+    if not resolved_per_user:
+        return
+
+    def per_user(values, output_field):
+        return Case(
+            *[When(id=user_id, then=Value(value)) for user_id, value in values.items()],
+            default=Value(0),
+            output_field=output_field,
+        )
+
+    changes = {"pending_transaction_count": F("pending_transaction_count") - per_user(resolved_per_user, IntegerField())}
+    if new_status == COMPLETED:
+        changes["total_paid"] = F("total_paid") + per_user(paid_per_user, DecimalField(max_digits=12, decimal_places=2))
+    User.objects.filter(id__in=resolved_per_user).update(**changes)
+    for user_id in resolved_per_user:
+        invalidate_user(user_id)
+
+
+def enqueue_payment_completed(transaction_ids):
+    """Queue the credit grant for newly completed transactions; call inside the status-change transaction."""
+    from base.utils.outbox import PAYMENT_COMPLETED, enqueue
+
+    enqueue(
+        PAYMENT_COMPLETED,
+        (
+            (f"{PAYMENT_COMPLETED}:{transaction_id}", {"payment_transaction_id": transaction_id})
+            for transaction_id in transaction_ids
+        ),
+    )
+
+
+def grant_payment_credits(events):
+    """
+    Outbox handler: grant each completed transaction's `operation_count` credits.
+
+    Grants are coalesced per user into one CASE-based UPDATE plus one ledger
+    bulk insert, however many transactions the batch holds. Transactions that
+    already have a grant in the ledger are skipped, and the ledger's unique
+    constraint backs that up, so replays never double-credit.
+    """
+    from base.models import CreditLedger, User, UserPaymentTransaction
+    from base.utils.cache import invalidate_user
+    from base.utils.credits import PAYMENT_GRANT
+
+    transaction_ids = [event.payload["payment_transaction_id"] for event in events]
+    already_granted = CreditLedger.objects.filter(payment_transaction_id__in=transaction_ids, reason=PAYMENT_GRANT)
+    grants = list(
+        UserPaymentTransaction.objects.filter(
+            id__in=transaction_ids, transaction_status=COMPLETED, operation_count__gt=0
+        )
+        .exclude(id__in=already_granted.values("payment_transaction_id"))
+        .values_list("id", "user_id", "operation_count")
+    )
+    if not grants:
+        return
+
+    credits_per_user = defaultdict(int)
+    for _, user_id, operation_count in grants:
+        credits_per_user[user_id] += operation_count
+
+    User.objects.filter(id__in=credits_per_user).update(
+        remaining_credit=F("remaining_credit")
+        + Case(
+            *[When(id=user_id, then=Value(amount)) for user_id, amount in credits_per_user.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    )
+    CreditLedger.objects.bulk_create(
+        [
+            CreditLedger(
+                user_id=user_id, delta=operation_count, reason=PAYMENT_GRANT, payment_transaction_id=transaction_id
+            )
+            for transaction_id, user_id, operation_count in grants
+        ]
+    )
+    for user_id in credits_per_user:
+        invalidate_user(user_id)
@@ -0,0 +1,404 @@
+"""
+Sampled per-request profiling.
+
+A request is profiled when it wins the PROFILING_SAMPLE_RATE draw, or when it
+carries PROFILING_TRIGGER_HEADER along with a valid access token whose role
+claim is admin (the header is ignored otherwise, and the authenticated user is
+checked again before the profile is saved). While a request is profiled:
+
+- one sampler thread per process snapshots the request thread's stack every
+  PROFILING_INTERVAL_MS and counts identical stacks, in the folded
+  ("a;b;c count") format that flamegraph.pl and speedscope read directly;
+- SQL queries, S3 calls and image pipeline stages are recorded as timed spans,
+  including those run on executor threads submitted through `track_queue`.
+
+Each profile is written as one JSON file in PROFILING_DIR, shared by all
+workers on the host; files past PROFILING_RETENTION_HOURS or beyond
+PROFILING_MAX_FILES are pruned. ASGI requests are profiled with spans only,
+since their event-loop thread is shared with other requests.
+"""
+
+import functools
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ID_RE = re.compile(r"[0-9a-f]{12}")
+# <started ms>_<duration ms>_<id>.json, so listings can rank files without opening them
+_FILENAME_RE = re.compile(r"(\d+)_(\d+)_([0-9a-f]{12})\.json")
+
+MAX_SPANS = 2000
+MAX_SQL_LENGTH = 500
+PRUNE_INTERVAL_SECONDS = 60
+
+_current = ContextVar("current_profile", default=None)
+
+_running = set()
+_running_lock = threading.Lock()
+_sampler_pid = None
+_sampler_wakeup = threading.Event()
+_last_pruned_at = 0.0
+
+
+class Profile:
+    """Samples and spans collected for one request."""
+
+    def __init__(self, trigger, thread_id=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.trigger = trigger
+        self.thread_id = thread_id
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.duration = None
+        self.stacks = Counter()
+        self.spans = []
+        self.dropped_spans = 0
+
+    def add_span(self, kind, description, started, ended):
+        if len(self.spans) >= MAX_SPANS:
+            self.dropped_spans += 1
+            return
+        self.spans.append(
+            {
+                "kind": kind,
+                "description": description,
+                "start_ms": round((started - self.started) * 1000, 3),
+                "duration_ms": round((ended - started) * 1000, 3),
+                "thread": threading.current_thread().name,
+            }
+        )
+
+    def to_dict(self, request, response):
+        user = getattr(request, "user", None)
+        match = getattr(request, "resolver_match", None)
+        totals = {}
+        for span in self.spans:
+            kind_totals = totals.setdefault(span["kind"], {"count": 0, "duration_ms": 0.0})
+            kind_totals["count"] += 1
+            kind_totals["duration_ms"] = round(kind_totals["duration_ms"] + span["duration_ms"], 3)
+        return {
+            "id": self.id,
+            "trigger": self.trigger,
+            "view": (match.view_name or match.route) if match else None,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "user_id": user.pk if getattr(user, "is_authenticated", False) else None,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "interval_ms": settings.PROFILING_INTERVAL_MS,
+            "samples": sum(self.stacks.values()),
+            "span_totals": totals,
+            "dropped_spans": self.dropped_spans,
+            "spans": self.spans,
+            "stacks": dict(self.stacks.most_common()),
+        }
+
+
+def record_span(kind, description, started, ended):
+    """Add a span (perf_counter start/end) to the current request's profile, if it has one."""
+    profile = _current.get()
+    if profile is not None:
+        profile.add_span(kind, description, started, ended)
+
+
+@contextmanager
+def span(kind, description):
+    """Time the enclosed block as a span of the current profile."""
+    if _current.get() is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(kind, description, started, time.perf_counter())
+
+
+def _record_sql(execute, sql, params, many, context):
+    if _current.get() is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record_span("sql", sql[:MAX_SQL_LENGTH], started, time.perf_counter())
+
+
+def _install_sql_recorder(sender, connection, **kwargs):
+    if _record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_sql)
+
+
+connection_created.connect(_install_sql_recorder)
+
+
+@functools.lru_cache(maxsize=8192)
+def _frame_label(code):
+    filename = code.co_filename
+    for prefix in sorted(sys.path, key=len, reverse=True):
+        if prefix and filename.startswith(prefix + os.sep):
+            filename = filename[len(prefix) + 1 :]
+            break
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+
+
+def _fold(frame):
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+def _sample_forever():
+    while True:
+        if not _running:
+            _sampler_wakeup.wait()
+            _sampler_wakeup.clear()
+            continue
+        frames = sys._current_frames()
+        # Held while sampling, so a profile gets no samples once _stop returns
+        with _running_lock:
+            for profile in _running:
+                frame = frames.get(profile.thread_id)
+                if frame is not None:
+                    profile.stacks[_fold(frame)] += 1
+        del frames
+        time.sleep(settings.PROFILING_INTERVAL_MS / 1000)
+
+
+def _ensure_sampler():
+    global _sampler_pid
+
+    if _sampler_pid == os.getpid():
+        return
+    with _running_lock:
+        if _sampler_pid == os.getpid():
+            return
+        threading.Thread(target=_sample_forever, name="request-profiler", daemon=True).start()
+        _sampler_pid = os.getpid()
+
+
+def _start(profile):
+    """Register `profile` for sampling; False if PROFILING_MAX_CONCURRENT are already running."""
+    if profile.thread_id is not None:
+        _ensure_sampler()
+    with _running_lock:
+        if len(_running) >= settings.PROFILING_MAX_CONCURRENT:
+            return False
+        _running.add(profile)
+    _sampler_wakeup.set()
+    return True
+
+
+def _stop(profile):
+    with _running_lock:
+        _running.discard(profile)
+    profile.duration = time.perf_counter() - profile.started
+
+
+def _has_admin_token(request):
+    """True if the request's bearer token is valid and claims role 3/4; decoded only, no database hit."""
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    try:
+        raw_token = authentication.get_raw_token(header) if header else None
+        return raw_token is not None and AccessToken(raw_token).get("role") in [3, 4]
+    except (AuthenticationFailed, TokenError):
+        return False
+
+
+def _choose_trigger(request):
+    # Checked before profiling starts, so other callers can't make us run the sampler
+    if request.headers.get(settings.PROFILING_TRIGGER_HEADER) and _has_admin_token(request):
+        return "header"
+    if settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE:
+        return "sample"
+    return None
+
+
+def _write(data):
+    directory = settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+    filename = f"{int(data['started_at'] * 1000)}_{int(data['duration_ms'])}_{data['id']}.json"
+    tmp_path = os.path.join(directory, f".{filename}.tmp")
+    with open(tmp_path, "w") as fh:
+        json.dump(data, fh, separators=(",", ":"))
+    # Readers in other workers never see a half-written file
+    os.replace(tmp_path, os.path.join(directory, filename))
+
+
+def _scan():
+    """[(started ms, duration ms, id, path)] for every stored profile."""
+    try:
+        entries = list(os.scandir(settings.PROFILING_DIR))
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for entry in entries:
+        match = _FILENAME_RE.fullmatch(entry.name)
+        if match:
+            profiles.append((int(match.group(1)), int(match.group(2)), match.group(3), entry.path))
+    return profiles
+
+
+def prune_profiles():
+    """Delete profiles older than PROFILING_RETENTION_HOURS, then the oldest beyond PROFILING_MAX_FILES."""
+    cutoff_ms = (time.time() - settings.PROFILING_RETENTION_HOURS * 3600) * 1000
+    profiles = sorted(_scan())
+    expired = [p for p in profiles if p[0] < cutoff_ms]
+    kept = profiles[len(expired) :]
+    excess = kept[: max(0, len(kept) - settings.PROFILING_MAX_FILES)]
+    for _, _, _, path in expired + excess:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # Pruned concurrently by another worker
+            pass
+
+
+def _maybe_prune():
+    global _last_pruned_at
+
+    now = time.monotonic()
+    if now - _last_pruned_at >= PRUNE_INTERVAL_SECONDS:
+        _last_pruned_at = now
+        prune_profiles()
+
+
+def _save(request, response, profile):
+    """Persist `profile` if the request qualifies; returns True if it was written."""
+    if profile.trigger == "header" and getattr(getattr(request, "user", None), "role", None) not in [3, 4]:
+        return False
+    try:
+        _write(profile.to_dict(request, response))
+        _maybe_prune()
+    except Exception:
+        logger.exception("Failed to write request profile %s", profile.id)
+        return False
+    return True
+
+
+def load_profile(profile_id):
+    """The stored profile dict for `profile_id`, or None."""
+    if not PROFILE_ID_RE.fullmatch(profile_id):
+        return None
+    for _, _, found_id, path in _scan():
+        if found_id == profile_id:
+            try:
+                with open(path) as fh:
+                    return json.load(fh)
+            except FileNotFoundError:
+                return None
+    return None
+
+
+def list_slowest_profiles(limit=20, hours=None, view=None):
+    """
+    Summaries of the slowest stored profiles, slowest first.
+
+    Args:
+        limit: Maximum number of profiles to return
+        hours: Only consider profiles started in the last `hours`; defaults
+            to the whole retention window
+        view: Only include profiles of this URL name
+    """
+    profiles = _scan()
+    if hours is not None:
+        cutoff_ms = (time.time() - hours * 3600) * 1000
+        profiles = [p for p in profiles if p[0] >= cutoff_ms]
+    profiles.sort(key=lambda p: p[1], reverse=True)
+
+    summaries = []
+    for _, _, _, path in profiles:
+        if len(summaries) >= limit:
+            break
+        try:
+            with open(path) as fh:
+                data = json.load(fh)
+        except (FileNotFoundError, ValueError):
+            continue
+        if view is not None and data["view"] != view:
+            continue
+        data.pop("spans")
+        data.pop("stacks")
+        summaries.append(data)
+    return summaries
+
+
+def folded_stacks(profile):
+    """The profile's samples as folded-stack text for flame graph tools."""
+    return "".join(f"{stack} {count}\n" for stack, count in profile["stacks"].items())
+
+
+class ProfilingMiddleware:
+    """Profiles sampled or header-triggered requests; see the module docstring."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        trigger = _choose_trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+        profile = Profile(trigger, thread_id=threading.get_ident())
+        if not _start(profile):
+            return self.get_response(request)
+
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+            _stop(profile)
+        if _save(request, response, profile):
+            response["X-Profile-Id"] = profile.id
+        return response
+
+    async def __acall__(self, request):
+        trigger = _choose_trigger(request)
+        if trigger is None:
+            return await self.get_response(request)
+        profile = Profile(trigger)
+        if not _start(profile):
+            return await self.get_response(request)
+
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+            _stop(profile)
+        # request.user may still be the lazy session user, which needs the sync ORM
+        if await sync_to_async(_save)(request, response, profile):
+            response["X-Profile-Id"] = profile.id
+        return response
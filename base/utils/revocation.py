@@ -0,0 +1,109 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from base.utils.bloom import BloomFilter
+
+_lock = threading.Lock()
+_filter = None
+# Wall-clock start of the last rebuild or sync; every revocation created before it is in the filter
+_synced_at = None
+_last_sync = 0.0
+_last_rebuild = 0.0
+
+
+def _rebuild():
+    """Reload the filter from every unexpired revocation; also drops expired JTIs."""
+    from base.models import RevokedToken
+
+    global _filter, _synced_at, _last_rebuild
+
+    started = timezone.now()
+    jtis = list(RevokedToken.objects.filter(expires_at__gt=started).values_list("jti", flat=True))
+    bloom = BloomFilter(max(settings.REVOKED_TOKEN_FILTER_CAPACITY, len(jtis) * 2))
+    for jti in jtis:
+        bloom.add(jti)
+
+    _filter = bloom
+    _synced_at = started
+    _last_rebuild = time.monotonic()
+
+
+def _sync_new():
+    """
+    Fold revocations made by other workers since the last sync into the filter.
+
+    Ids and created_at are assigned before commit, so a row can become visible
+    after later ones were already read. Each sync re-reads the last
+    REVOKED_TOKEN_SYNC_OVERLAP_SECONDS as well, so such stragglers are still
+    picked up.
+    """
+    from base.models import RevokedToken
+
+    global _synced_at
+
+    started = timezone.now()
+    since = _synced_at - timedelta(seconds=settings.REVOKED_TOKEN_SYNC_OVERLAP_SECONDS)
+    for jti in RevokedToken.objects.filter(created_at__gte=since).values_list("jti", flat=True):
+        _filter.add(jti)
+    _synced_at = started
+
+
+def _ensure_fresh():
+    global _last_sync
+
+    now = time.monotonic()
+    if _filter is not None and now - _last_sync < settings.REVOKED_TOKEN_SYNC_SECONDS:
+        return
+
+    with _lock:
+        if _filter is not None and now - _last_sync < settings.REVOKED_TOKEN_SYNC_SECONDS:
+            return
+        if _filter is None or now - _last_rebuild >= settings.REVOKED_TOKEN_REBUILD_SECONDS:
+            _rebuild()
+        else:
+            _sync_new()
+        _last_sync = now
+
+
+def is_revoked(jti):
+    """
+    Return True if the token with this JTI has been revoked.
+
+    The in-memory Bloom filter answers the common "not revoked" case without a
+    query; only filter hits are confirmed against the database. Revocations
+    made by another worker become visible within REVOKED_TOKEN_SYNC_SECONDS.
+    """
+    from base.models import RevokedToken
+
+    _ensure_fresh()
+    if jti not in _filter:
+        return False
+    return RevokedToken.objects.filter(jti=jti).exists()
+
+
+def revoke_token(token, user=None):
+    """
+    Revoke a validated access token until it would have expired anyway.
+
+    Args:
+        token: A validated simplejwt token
+        user: Optional owner of the token
+    """
+    from rest_framework_simplejwt.settings import api_settings
+    from rest_framework_simplejwt.utils import datetime_from_epoch
+
+    from base.models import RevokedToken
+
+    jti = token[api_settings.JTI_CLAIM]
+    RevokedToken.objects.get_or_create(
+        jti=jti, defaults={"user": user, "expires_at": datetime_from_epoch(token["exp"])}
+    )
+
+    _ensure_fresh()
+    with _lock:
+        # Visible to this worker immediately, without waiting for the next sync
+        _filter.add(jti)
@@ -0,0 +1,157 @@
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from base.utils.credits import MEDIA_UPLOAD, REFUND
+
+REVENUE = "revenue_daily"
+CREDIT_USAGE = "credit_usage_daily"
+
+# Re-scan this far behind the watermark so rows committed late with an older
+# updated_at are still picked up; recomputing a day twice is harmless.
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+
+def _day_range_filter(days):
+    """created_at range covering `days`, so the recompute can use the created_at index."""
+    start = timezone.make_aware(datetime.combine(min(days), time.min))
+    end = timezone.make_aware(datetime.combine(max(days) + timedelta(days=1), time.min))
+    return Q(created_at__gte=start, created_at__lt=end)
+
+
+def _recompute_revenue_days(days):
+    from base.models import RevenueDailyRollup, UserPaymentTransaction
+
+    rows = (
+        UserPaymentTransaction.objects.filter(_day_range_filter(days))
+        .annotate(day=TruncDate("created_at"))
+        .filter(day__in=days)
+        .order_by()
+        .values("day", "transaction_method", "transaction_status", "user__role")
+        .annotate(
+            transaction_count=Count("id"),
+            total_amount=Sum("transaction_amount"),
+            total_operation_count=Sum("operation_count"),
+        )
+    )
+    RevenueDailyRollup.objects.filter(day__in=days).delete()
+    RevenueDailyRollup.objects.bulk_create(
+        [
+            RevenueDailyRollup(
+                day=row["day"],
+                transaction_method=row["transaction_method"],
+                transaction_status=row["transaction_status"],
+                role=row["user__role"],
+                transaction_count=row["transaction_count"],
+                total_amount=row["total_amount"] or 0,
+                total_operation_count=row["total_operation_count"] or 0,
+            )
+            for row in rows
+        ]
+    )
+
+
+def _recompute_credit_usage_days(days):
+    from base.models import CreditLedger, CreditUsageDailyRollup
+
+    rows = (
+        CreditLedger.objects.filter(_day_range_filter(days), reason__in=[MEDIA_UPLOAD, REFUND])
+        .annotate(day=TruncDate("created_at"))
+        .filter(day__in=days)
+        .order_by()
+        .values("day", "user")
+        .annotate(net_delta=Sum("delta"), upload_count=Count("id", filter=Q(reason=MEDIA_UPLOAD)))
+    )
+    CreditUsageDailyRollup.objects.filter(day__in=days).delete()
+    CreditUsageDailyRollup.objects.bulk_create(
+        [
+            CreditUsageDailyRollup(
+                day=row["day"],
+                user_id=row["user"],
+                credits_consumed=-(row["net_delta"] or 0),
+                upload_count=row["upload_count"],
+            )
+            for row in rows
+        ]
+    )
+
+
+def refresh_revenue_rollup():
+    """
+    Rebuild the revenue buckets for every day touched since the last run.
+
+    Changed transactions are found through the `updated_at` watermark; their
+    days are then recomputed from scratch, so status changes move amounts
+    between buckets correctly.
+
+    Returns:
+        int: Number of days recomputed
+    """
+    from base.models import RollupWatermark, UserPaymentTransaction
+
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=REVENUE)
+        changed = UserPaymentTransaction.objects.all()
+        if watermark.last_updated_at:
+            changed = changed.filter(updated_at__gt=watermark.last_updated_at - WATERMARK_OVERLAP)
+
+        high_water = changed.aggregate(high_water=Max("updated_at"))["high_water"]
+        if high_water is None:
+            return 0
+
+        days = set(changed.annotate(day=TruncDate("created_at")).order_by().values_list("day", flat=True).distinct())
+        _recompute_revenue_days(days)
+
+        watermark.last_updated_at = max(high_water, watermark.last_updated_at or high_water)
+        watermark.save()
+    return len(days)
+
+
+def refresh_credit_usage_rollup():
+    """
+    Rebuild credit-usage buckets for days with new ledger entries.
+
+    The ledger is append-only, so an `id` watermark finds new rows exactly.
+
+    Returns:
+        int: Number of days recomputed
+    """
+    from base.models import CreditLedger, RollupWatermark
+
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=CREDIT_USAGE)
+        new_rows = CreditLedger.objects.filter(id__gt=watermark.last_id)
+
+        high_water = new_rows.aggregate(high_water=Max("id"))["high_water"]
+        if high_water is None:
+            return 0
+
+        days = set(
+            new_rows.filter(reason__in=[MEDIA_UPLOAD, REFUND])
+            .annotate(day=TruncDate("created_at"))
+            .order_by()
+            .values_list("day", flat=True)
+            .distinct()
+        )
+        if days:
+            _recompute_credit_usage_days(days)
+
+        watermark.last_id = high_water
+        watermark.save()
+    return len(days)
+
+
+def refresh_rollups():
+    """Bring every reporting rollup up to date; returns {rollup name: days recomputed}."""
+    from base.utils.cache import PAYMENT_REPORTS
+
+    refreshed = {
+        REVENUE: refresh_revenue_rollup(),
+        CREDIT_USAGE: refresh_credit_usage_rollup(),
+    }
+    if any(refreshed.values()):
+        PAYMENT_REPORTS.invalidate_all()
+    return refreshed
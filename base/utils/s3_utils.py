@@ -1,22 +1,55 @@
+import logging
+import os
+import threading
+import time
 import uuid
 from io import BytesIO
 
-import boto3
-from boto3.s3.transfer import TransferConfig
-from botocore.config import Config as BotoCoreConfig
-from botocore.exceptions import ClientError
 from django.conf import settings
 from django.core.files.uploadedfile import InMemoryUploadedFile
-from PIL import Image, UnidentifiedImageError
+
+from base.utils.metrics import IMAGE_QUALITY_ITERATIONS, IMAGE_STAGE_SECONDS, S3_UPLOAD_BYTES, S3_UPLOAD_SECONDS
+from base.utils.profiling import record_span, span
+
+logger = logging.getLogger(__name__)
+
+# boto3/botocore and Pillow are imported inside the functions that use them: together
+# they are a large share of import time, and most processes (management commands,
+# requests that never touch S3) don't need them.
+
+
+_shared_client = None
+_shared_client_pid = None
+_shared_client_lock = threading.Lock()
 
 
 def get_s3_client():
     """
-    Create and return an S3 client.
+    Return this process's S3 client, creating it on first use.
 
-    Can be reused by callers to avoid reconnecting for every file
-    (e.g. create once before a loop and pass into upload helpers).
+    boto3 clients are thread-safe, so one client (and its connection pool) is
+    shared by every request thread. It is rebuilt after a fork so workers never
+    share sockets with the gunicorn master.
     """
+    global _shared_client, _shared_client_pid
+
+    if _shared_client is None or _shared_client_pid != os.getpid():
+        with _shared_client_lock:
+            if _shared_client is None or _shared_client_pid != os.getpid():
+                _shared_client = _create_s3_client()
+                _shared_client_pid = os.getpid()
+    return _shared_client
+
+
+def _create_s3_client():
+    if settings.AWS_S3_LOCAL_DIR:
+        from base.utils.local_s3 import LocalS3Client
+
+        return LocalS3Client(root=settings.AWS_S3_LOCAL_DIR, latency_ms=settings.AWS_S3_LOCAL_LATENCY_MS)
+
+    import boto3
+    from botocore.config import Config as BotoCoreConfig
+
     return boto3.client(
         "s3",
         aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
@@ -29,6 +62,12 @@ def get_s3_client():
     )
 
 
+def _observe_stage(stage, started):
+    ended = time.perf_counter()
+    IMAGE_STAGE_SECONDS.labels(stage=stage).observe(ended - started)
+    record_span("image", stage, started, ended)
+
+
 def _compress_image(file, max_width=1920, target_size_kb=400, initial_quality=85, min_quality=20):
     """
     Compress an image file in-memory aiming for a maximum size.
@@ -37,6 +76,8 @@ def _compress_image(file, max_width=1920, target_size_kb=400, initial_quality=85
     - Converts to JPEG and iteratively reduces quality until <= target_size_kb (or min_quality)
     - Returns the original file if it's not an image or compression fails
     """
+    from PIL import Image, UnidentifiedImageError
+
     target_bytes = target_size_kb * 1024
 
     # If the original file is already small enough, skip compression
@@ -45,6 +86,7 @@ def _compress_image(file, max_width=1920, target_size_kb=400, initial_quality=85
         file.seek(0)
         return file
 
+    started = time.perf_counter()
     try:
         # Ensure we're at the start of the file before reading
         file.seek(0)
@@ -53,7 +95,11 @@ def _compress_image(file, max_width=1920, target_size_kb=400, initial_quality=85
         # Not an image – just return original file
         file.seek(0)
         return file
+    # Image.open only reads the header; decode now so the stage timings are honest
+    image.load()
+    _observe_stage("decode", started)
 
+    started = time.perf_counter()
     # Convert to RGB for formats like JPEG that don't support alpha
     if image.mode in ("RGBA", "P"):
         image = image.convert("RGB")
@@ -64,12 +110,16 @@ def _compress_image(file, max_width=1920, target_size_kb=400, initial_quality=85
         ratio = max_width / float(width)
         new_size = (max_width, int(height * ratio))
         image = image.resize(new_size, Image.LANCZOS)
+    _observe_stage("resize", started)
 
     # Iteratively save to JPEG, reducing quality until under target size
     quality = initial_quality
     buffer = BytesIO()
+    iterations = 0
+    started = time.perf_counter()
 
     while True:
+        iterations += 1
         buffer.seek(0)
         buffer.truncate(0)
 
@@ -83,6 +133,8 @@ def _compress_image(file, max_width=1920, target_size_kb=400, initial_quality=85
         # Decrease quality and try again
         quality -= 5
 
+    _observe_stage("encode", started)
+    IMAGE_QUALITY_ITERATIONS.observe(iterations)
     buffer.seek(0)
 
     # Build a new file name with .jpg extension
@@ -118,6 +170,9 @@ def upload_file_to_s3(file, folder_name="media", s3_client=None):
     Returns:
         str: The URL of the uploaded file
     """
+    from boto3.s3.transfer import TransferConfig
+    from botocore.exceptions import ClientError
+
     try:
         # Ensure we have an S3 client (re-use if provided)
         if s3_client is None:
@@ -145,12 +200,30 @@ def upload_file_to_s3(file, folder_name="media", s3_client=None):
             file.seek(0)
         except Exception:
             pass
-        s3_client.upload_fileobj(
-            file,
-            settings.AWS_STORAGE_BUCKET_NAME,
+        started = time.perf_counter()
+        try:
+            s3_client.upload_fileobj(
+                file,
+                settings.AWS_STORAGE_BUCKET_NAME,
+                s3_key,
+                ExtraArgs={"ContentType": getattr(file, "content_type", "application/octet-stream")},
+                Config=transfer_config,
+            )
+        except Exception:
+            S3_UPLOAD_SECONDS.labels(outcome="error").observe(time.perf_counter() - started)
+            record_span("s3", f"upload_fileobj {s3_key} (failed)", started, time.perf_counter())
+            raise
+        S3_UPLOAD_SECONDS.labels(outcome="success").observe(time.perf_counter() - started)
+        record_span("s3", f"upload_fileobj {s3_key}", started, time.perf_counter())
+        S3_UPLOAD_BYTES.inc(getattr(file, "size", None) or 0)
+        logger.info(
+            "Uploaded %s to S3",
             s3_key,
-            ExtraArgs={"ContentType": getattr(file, "content_type", "application/octet-stream")},
-            Config=transfer_config,
+            extra={
+                "s3_key": s3_key,
+                "bytes": getattr(file, "size", None),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            },
         )
 
         # Return the URL
@@ -158,10 +231,10 @@ def upload_file_to_s3(file, folder_name="media", s3_client=None):
         return file_url
 
     except ClientError as e:
-        print(f"Error uploading file to S3: {e}")
+        logger.exception("Error uploading file to S3", extra={"file_name": getattr(file, "name", None)})
         raise Exception(f"Failed to upload file: {str(e)}")
     except Exception as e:
-        print(f"Unexpected error: {e}")
+        logger.exception("Unexpected error uploading file to S3", extra={"file_name": getattr(file, "name", None)})
         raise Exception(f"Failed to upload file: {str(e)}")
 
 
@@ -176,6 +249,8 @@ def delete_file_from_s3(file_url, s3_client=None):
     Returns:
         bool: True if successful, False otherwise
     """
+    from botocore.exceptions import ClientError
+
     try:
         # Ensure we have an S3 client (re-use if provided)
         if s3_client is None:
@@ -188,13 +263,14 @@ def delete_file_from_s3(file_url, s3_client=None):
             return False
 
         # Delete file
-        s3_client.delete_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=s3_key)
+        with span("s3", f"delete_object {s3_key}"):
+            s3_client.delete_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=s3_key)
 
         return True
 
-    except ClientError as e:
-        print(f"Error deleting file from S3: {e}")
+    except ClientError:
+        logger.exception("Error deleting file from S3", extra={"file_url": file_url})
         return False
-    except Exception as e:
-        print(f"Unexpected error: {e}")
+    except Exception:
+        logger.exception("Unexpected error deleting file from S3", extra={"file_url": file_url})
         return False
@@ -0,0 +1,184 @@
+import math
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.throttling import SimpleRateThrottle
+
+from base.utils.cache import is_process_local
+
+# Serialises read-modify-write of a bucket in a process-local cache (DEBUG or
+# SHARED_CACHE_ALLOW_LOCAL, i.e. a single process); on Redis the update runs as one script.
+_bucket_lock = threading.Lock()
+
+# Refill and take one token from a bucket kept as a Redis hash, atomically on the server.
+# The server clock keeps workers on different hosts in agreement. Returns {allowed, wait
+# seconds}; fractions go back as strings, since Redis truncates Lua numbers to integers.
+_TAKE_TOKEN_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_per_second = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * refill_per_second)
+if tokens < 1 then
+    return {0, tostring((1 - tokens) / refill_per_second)}
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens - 1), 'updated_at', tostring(now))
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return {1, '0'}
+"""
+
+THROTTLE_OUTCOMES = ("allowed", "throttled")
+
+
+def check_throttle_cache():
+    """
+    Refuse to start with throttle buckets in a process-local cache.
+
+    Every worker would keep its own buckets, multiplying each limit by the
+    worker count. Allowed with DEBUG on or SHARED_CACHE_ALLOW_LOCAL set.
+    """
+    if settings.DEBUG or settings.SHARED_CACHE_ALLOW_LOCAL:
+        return
+    if is_process_local(settings.THROTTLE_CACHE_ALIAS):
+        raise ImproperlyConfigured(
+            f"Cache {settings.THROTTLE_CACHE_ALIAS!r} is process-local, so each worker would throttle on its own; "
+            "set REDIS_URL (or SHARED_CACHE_ALLOW_LOCAL=True for a single-process deployment)"
+        )
+
+
+def _stats_key(scope, outcome):
+    return f"throttle_stats_{scope}_{outcome}"
+
+
+def _record(scope, outcome):
+    cache = caches[settings.THROTTLE_CACHE_ALIAS]
+    key = _stats_key(scope, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # First hit for this counter (or it was evicted); add() avoids clobbering a racing incr
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_throttle_stats(scopes):
+    """
+    Return allowed/throttled hit counters for each throttle scope.
+
+    Counters live in the shared throttle cache, so every worker reports the
+    same totals.
+    """
+    cache = caches[settings.THROTTLE_CACHE_ALIAS]
+    keys = {_stats_key(scope, outcome): (scope, outcome) for scope in scopes for outcome in THROTTLE_OUTCOMES}
+    values = cache.get_many(keys.keys())
+
+    stats = {scope: {outcome: 0 for outcome in THROTTLE_OUTCOMES} for scope in scopes}
+    for key, count in values.items():
+        scope, outcome = keys[key]
+        stats[scope][outcome] = count
+    return stats
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Token-bucket throttle backed by the shared throttle cache.
+
+    A rate of "10/min" means a bucket of 10 tokens refilled at 10 per minute, so
+    clients may burst up to the full bucket and are then held to the steady rate.
+    Throttles run in `APIView.initial()`, before the handler touches the database.
+    """
+
+    cache_format = "throttle_bucket_%(scope)s_%(ident)s"
+
+    @property
+    def cache(self):
+        return caches[settings.THROTTLE_CACHE_ALIAS]
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        refill_per_second = self.num_requests / self.duration
+        if isinstance(self.cache, RedisCache):
+            allowed, self.wait_seconds = self._take_token_redis(refill_per_second)
+        else:
+            allowed, self.wait_seconds = self._take_token_local(refill_per_second)
+
+        _record(self.scope, "allowed" if allowed else "throttled")
+        return allowed
+
+    def _take_token_redis(self, refill_per_second):
+        """(allowed, wait seconds), with the whole bucket update done by one Redis script."""
+        key = self.cache.make_and_validate_key(self.key)
+        client = self.cache._cache.get_client(key, write=True)
+        allowed, wait_seconds = client.register_script(_TAKE_TOKEN_SCRIPT)(
+            keys=[key], args=[self.num_requests, repr(refill_per_second), math.ceil(self.duration)]
+        )
+        return allowed == 1, float(wait_seconds) or None
+
+    def _take_token_local(self, refill_per_second):
+        """(allowed, wait seconds) for a bucket in a process-local cache."""
+        with _bucket_lock:
+            now = self.timer()
+            tokens, updated_at = self.cache.get(self.key, (self.num_requests, now))
+            tokens = min(self.num_requests, tokens + (now - updated_at) * refill_per_second)
+
+            if tokens < 1:
+                return False, (1 - tokens) / refill_per_second
+
+            self.cache.set(self.key, (tokens - 1, now), self.duration)
+        return True, None
+
+    def wait(self):
+        return getattr(self, "wait_seconds", None)
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """Bucket per client IP (honours NUM_PROXIES like DRF's own throttles)."""
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {"scope": self.scope, "ident": self.get_ident(request)}
+
+
+class PhoneTokenBucketThrottle(TokenBucketThrottle):
+    """Bucket per phone number in the request body; requests without one are not limited here."""
+
+    def get_cache_key(self, request, view):
+        phone = request.data.get("phone") if request.method == "POST" else None
+        if not phone:
+            return None
+        return self.cache_format % {"scope": self.scope, "ident": str(phone).strip()}
+
+
+class LoginIPThrottle(IPTokenBucketThrottle):
+    scope = "login_ip"
+
+
+class LoginPhoneThrottle(PhoneTokenBucketThrottle):
+    scope = "login_phone"
+
+
+class SignupIPThrottle(IPTokenBucketThrottle):
+    scope = "signup_ip"
+
+
+class SignupPhoneThrottle(PhoneTokenBucketThrottle):
+    scope = "signup_phone"
+
+
+AUTH_THROTTLE_SCOPES = [
+    LoginIPThrottle.scope,
+    LoginPhoneThrottle.scope,
+    SignupIPThrottle.scope,
+    SignupPhoneThrottle.scope,
+]
@@ -0,0 +1,44 @@
+import time
+
+
+def warm_up_worker():
+    """
+    Pay a fresh worker's one-off costs before it takes traffic.
+
+    - Runs a trivial ORM query, which imports the Postgres driver, builds the
+      query compiler caches and opens this worker's connection pool (min_size
+      connections) so request threads check out an already-open connection.
+    - Builds the process-wide S3 client (shared by every thread).
+    - Loads Pillow's format plugins, which _compress_image would otherwise
+      trigger on the first upload.
+    - Starts the readiness refresher, so the first probe finds a result.
+
+    Returns:
+        dict: Seconds spent on each step, for the boot log
+    """
+    from django.db import connection
+    from PIL import Image
+
+    from base.models import User
+    from base.utils.health import ensure_refresher
+    from base.utils.s3_utils import get_s3_client
+
+    timings = {}
+
+    started = time.perf_counter()
+    User.objects.only("id").first()
+    # Returns the connection to the pool (or closes it when pooling is off)
+    connection.close()
+    timings["db"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    get_s3_client()
+    timings["s3"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    Image.init()
+    timings["pillow"] = time.perf_counter() - started
+
+    ensure_refresher()
+
+    return timings
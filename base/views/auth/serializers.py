@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
 from base.models import User, UserPaymentTransaction, UserSocialLinks
+from base.utils.cache import PUBLIC_PROFILES, USER_PROFILES
 
 
 class UserPaymentTransactionSerializer(serializers.ModelSerializer):
@@ -47,6 +48,57 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 
+class LastPaymentTransactionSerializer(serializers.ModelSerializer):
+    transaction_status_name = serializers.CharField(source="get_transaction_status_display", read_only=True)
+
+    class Meta:
+        model = UserPaymentTransaction
+        fields = [
+            "id",
+            "transaction_id",
+            "transaction_amount",
+            "transaction_status",
+            "transaction_status_name",
+            "created_at",
+        ]
+
+
+class UserProfileSerializer(serializers.ModelSerializer):
+    """
+    Compact profile: payment history is summarised by the denormalised aggregates
+    on User; the full list lives behind the paginated transactions endpoint.
+    """
+
+    role_name = serializers.CharField(source="get_role_display", read_only=True)
+    gender_name = serializers.CharField(source="get_gender_display", read_only=True)
+    last_payment_transaction = LastPaymentTransactionSerializer(read_only=True)
+    user_social_links = UserSocialLinksSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = User
+        fields = [
+            "id",
+            "email",
+            "first_name",
+            "last_name",
+            "role",
+            "role_name",
+            "phone",
+            "gender",
+            "gender_name",
+            "date_of_birth",
+            "organization_name",
+            "created_at",
+            "is_active",
+            "remaining_credit",
+            "used_credit",
+            "total_paid",
+            "pending_transaction_count",
+            "last_payment_transaction",
+            "user_social_links",
+        ]
+
+
 class UserPublicSerializer(serializers.ModelSerializer):
     user_social_links = UserSocialLinksSerializer(many=True, read_only=True)
 
@@ -55,3 +107,48 @@ class UserPublicSerializer(serializers.ModelSerializer):
         fields = [
             "user_social_links",
         ]
+
+
+def get_cached_user_profile(user_id):
+    """UserProfileSerializer data for `user_id`, served from the USER_PROFILES cache."""
+
+    def load():
+        user = (
+            User.objects.filter(id=user_id)
+            .select_related("last_payment_transaction")
+            .prefetch_related("user_social_links")
+            .first()
+        )
+        return UserProfileSerializer(user).data
+
+    return USER_PROFILES.get_or_set(user_id, load)
+
+
+def get_cached_public_profile(user_id):
+    """UserPublicSerializer data for `user_id`, served from the PUBLIC_PROFILES cache."""
+    if user_id is None:
+        return UserPublicSerializer(None).data
+
+    def load():
+        user = User.objects.filter(id=user_id).prefetch_related("user_social_links").first()
+        return UserPublicSerializer(user).data
+
+    return PUBLIC_PROFILES.get_or_set(user_id, load)
+
+
+class UserImportRowSerializer(serializers.Serializer):
+    """Validates one CSV row for the admin bulk user import."""
+
+    email = serializers.EmailField()
+    phone = serializers.CharField(max_length=20)
+    first_name = serializers.CharField(max_length=150)
+    last_name = serializers.CharField(max_length=150)
+    organization_name = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+    role = serializers.ChoiceField(choices=[0, 1, 2], required=False, default=0)
+    gender = serializers.ChoiceField(choices=User.GENDER_CHOICE, required=False, allow_null=True)
+    date_of_birth = serializers.DateField(required=False, allow_null=True)
+
+    def to_internal_value(self, data):
+        # CSV cells arrive as strings; treat empty cells as "not provided"
+        data = {key: value.strip() for key, value in data.items() if key and value is not None and value.strip()}
+        return super().to_internal_value(data)
@@ -1,12 +1,26 @@
 from django.urls import path
+from rest_framework_simplejwt.views import TokenRefreshView
 
-from .views import CurrentUserView, LoginView, SocialLink, UserSignupView, UserView
+from .views import (
+    CurrentUserView,
+    LoginView,
+    LogoutView,
+    SocialLink,
+    ThrottleStatsView,
+    UserBulkImportView,
+    UserSignupView,
+    UserView,
+)
 
 # api/base/auth/ ->
 urlpatterns = [
     path("login/", LoginView.as_view(), name="login"),
+    path("logout/", LogoutView.as_view(), name="logout"),
+    path("token/refresh/", TokenRefreshView.as_view(), name="token-refresh"),
     path("user/", UserView.as_view(), name="user"),
+    path("user/bulk-import/", UserBulkImportView.as_view(), name="user-bulk-import"),
     path("signup/", UserSignupView.as_view(), name="signup"),
     path("current-user/", CurrentUserView.as_view(), name="current-user"),
     path("social-link/update/", SocialLink.as_view(), name="update-social-link"),
+    path("throttle-stats/", ThrottleStatsView.as_view(), name="throttle-stats"),
 ]
@@ -1,19 +1,34 @@
+import codecs
+import csv
 import json
 from datetime import datetime, timedelta
 
 import jwt
 from django.conf import settings
 from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from base.models import User, UserSocialLinks
-
-from .serializers import UserSerializer
+from base.utils.authentication import RevocableJWTAuthentication
+from base.utils.cache import invalidate_user
+from base.utils.passwords import PasswordVerificationBusy, hash_password, verify_user_password
+from base.utils.revocation import revoke_token
+from base.utils.throttling import (
+    AUTH_THROTTLE_SCOPES,
+    LoginIPThrottle,
+    LoginPhoneThrottle,
+    SignupIPThrottle,
+    SignupPhoneThrottle,
+    get_throttle_stats,
+)
+
+from .serializers import UserImportRowSerializer, UserSerializer, get_cached_user_profile
 
 
 # JWT Token utilities
@@ -35,6 +50,20 @@ def generate_jwt_token(user):
     }
 
 
+def _unique_violation_message(error):
+    """Map a unique-constraint IntegrityError on User to the field-specific message clients expect."""
+    message = str(error).lower()
+    if "phone" in message:
+        return "User with this phone number already exists"
+    if "email" in message or "username" in message:
+        return "User with this email already exists"
+    return f"Failed to create user: {str(error)}"
+
+
+def _unique_violation_response(error):
+    return Response({"error": _unique_violation_message(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+
 def decode_jwt_token(token):
     """Decode and validate JWT token"""
     try:
@@ -60,6 +89,7 @@ def get_user_from_token(token):
 
 class LoginView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [LoginIPThrottle, LoginPhoneThrottle]
 
     def get(self, request):
         return Response({"message": "Login endpoint"})
@@ -73,7 +103,7 @@ class LoginView(APIView):
 
         try:
             user = User.objects.get(phone=phone)
-            if user.password == password:  # In production, use proper password hashing
+            if verify_user_password(user, password):
                 # Generate JWT token
                 tokens = generate_jwt_token(user)
 
@@ -98,10 +128,41 @@ class LoginView(APIView):
                 return Response({"error": "Invalid Credentials"}, status=status.HTTP_401_UNAUTHORIZED)
         except User.DoesNotExist:
             return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
+        except PasswordVerificationBusy:
+            return Response(
+                {"error": "Too many login attempts, please retry shortly"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"},
+            )
+
+
+class LogoutView(APIView):
+    authentication_classes = [RevocableJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        refresh = request.data.get("refresh")
+
+        try:
+            if refresh:
+                refresh_token = RefreshToken(refresh)
+                if str(refresh_token.get("user_id")) != str(request.user.id):
+                    return Response(
+                        {"error": "Refresh token does not belong to this user"}, status=status.HTTP_400_BAD_REQUEST
+                    )
+                refresh_token.blacklist()
+
+            # Also kill the access token used for this request, so logout takes effect immediately
+            revoke_token(request.auth, user=request.user)
+
+            return Response({"message": "Logged out successfully"}, status=status.HTTP_200_OK)
+        except TokenError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
 class UserSignupView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [SignupIPThrottle, SignupPhoneThrottle]
 
     def post(self, request):
         try:
@@ -111,28 +172,22 @@ class UserSignupView(APIView):
                 if not request.data.get(field):
                     return Response({"error": f"Missing required field: {field}"}, status=status.HTTP_400_BAD_REQUEST)
 
-            if User.objects.filter(phone=request.data.get("phone")).exists():
-                return Response(
-                    {"error": "User with this phone number already exists"}, status=status.HTTP_400_BAD_REQUEST
+            # Create user; duplicates are caught by the unique constraints in the same round trip
+            try:
+                user = User.objects.create(
+                    username=request.data.get("email"),  # Use email as username
+                    email=request.data.get("email"),
+                    password=hash_password(request.data.get("password")),
+                    phone=request.data.get("phone"),
+                    first_name=request.data.get("first_name"),
+                    last_name=request.data.get("last_name"),
+                    role=request.data.get("role", 0),  # Default to customer
+                    gender=request.data.get("gender"),
+                    date_of_birth=request.data.get("date_of_birth"),
+                    organization_name=request.data.get("organization_name"),
                 )
-
-            # Check if user already exists
-            if User.objects.filter(email=request.data.get("email")).exists():
-                return Response({"error": "User with this email already exists"}, status=status.HTTP_400_BAD_REQUEST)
-
-            # Create user
-            user = User.objects.create(
-                username=request.data.get("email"),  # Use email as username
-                email=request.data.get("email"),
-                password=request.data.get("password"),  # In production, hash this
-                phone=request.data.get("phone"),
-                first_name=request.data.get("first_name"),
-                last_name=request.data.get("last_name"),
-                role=request.data.get("role", 0),  # Default to customer
-                gender=request.data.get("gender"),
-                date_of_birth=request.data.get("date_of_birth"),
-                organization_name=request.data.get("organization_name"),
-            )
+            except IntegrityError as e:
+                return _unique_violation_response(e)
 
             tokens = generate_jwt_token(user)
 
@@ -163,15 +218,15 @@ class UserSignupView(APIView):
 
 
 class CurrentUserView(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [RevocableJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         current_user = request.user
-
-        user = User.objects.filter(id=current_user.id).prefetch_related("user_payment_transactions", "user_social_links").first()
-        serializer = UserSerializer(user)
-        return Response({"message": "User retrieved successfully", "user": serializer.data}, status=status.HTTP_200_OK)
+        return Response(
+            {"message": "User retrieved successfully", "user": get_cached_user_profile(current_user.id)},
+            status=status.HTTP_200_OK,
+        )
 
     def put(self, request):
         try:
@@ -185,13 +240,14 @@ class CurrentUserView(APIView):
             if not isinstance(social_links, list):
                 return Response({"error": "Social links must be a list"}, status=status.HTTP_400_BAD_REQUEST)
             
-            UserSocialLinks.objects.filter(user=user).delete()
+            UserSocialLinks.all_with_inactive.filter(user=user).delete()
 
             social_links_data = []
             for social_link in social_links:
                 social_links_data.append(UserSocialLinks(user=user, social_media_platform=social_link.get("social_media_platform"), social_media_url=social_link.get("social_media_url")))
 
             UserSocialLinks.objects.bulk_create(social_links_data)
+            invalidate_user(user.id)
 
             return Response({"message": "Social links updated successfully"}, status=status.HTTP_200_OK)
 
@@ -205,7 +261,7 @@ class CurrentUserView(APIView):
 
 
 class UserView(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [RevocableJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
@@ -229,27 +285,21 @@ class UserView(APIView):
                 if not request.data.get(field):
                     return Response({"error": f"Missing required field: {field}"}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Check if user already exists
-            if User.objects.filter(email=request.data.get("email")).exists():
-                return Response({"error": "User with this email already exists"}, status=status.HTTP_400_BAD_REQUEST)
-
-            if User.objects.filter(phone=request.data.get("phone")).exists():
-                return Response(
-                    {"error": "User with this phone number already exists"}, status=status.HTTP_400_BAD_REQUEST
+            # Create user; duplicates are caught by the unique constraints in the same round trip
+            try:
+                user = User.objects.create(
+                    username=request.data.get("email"),  # Use email as username
+                    email=request.data.get("email"),
+                    password=hash_password(request.data.get("password")),
+                    phone=request.data.get("phone"),
+                    first_name=request.data.get("first_name"),
+                    last_name=request.data.get("last_name"),
+                    role=request.data.get("role", 0),  # Default to customer
+                    gender=request.data.get("gender"),
+                    date_of_birth=request.data.get("date_of_birth"),
                 )
-
-            # Create user
-            user = User.objects.create(
-                username=request.data.get("email"),  # Use email as username
-                email=request.data.get("email"),
-                password=request.data.get("password"),  # In production, hash this
-                phone=request.data.get("phone"),
-                first_name=request.data.get("first_name"),
-                last_name=request.data.get("last_name"),
-                role=request.data.get("role", 0),  # Default to customer
-                gender=request.data.get("gender"),
-                date_of_birth=request.data.get("date_of_birth"),
-            )
+            except IntegrityError as e:
+                return _unique_violation_response(e)
 
             return Response(
                 {
@@ -293,7 +343,7 @@ class UserView(APIView):
             if request.data.get("email"):
                 user.email = request.data.get("email")
             if request.data.get("password"):
-                user.password = request.data.get("password")
+                user.password = hash_password(request.data.get("password"))
             if request.data.get("phone"):
                 user.phone = request.data.get("phone")
             if request.data.get("first_name"):
@@ -357,8 +407,165 @@ class UserView(APIView):
             )
 
 
+class UserBulkImportView(APIView):
+    """
+    Admin-only CSV import of users (studios, labs and their customers).
+
+    The upload is read row by row; each batch is validated, checked against
+    existing emails/phones with one IN query per column, and inserted with a
+    single bulk_create. Imported accounts get an unusable password and must
+    have one set through UserView.put before they can log in.
+    """
+
+    authentication_classes = [RevocableJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    batch_size = 1000
+    required_columns = ["email", "phone", "first_name", "last_name"]
+
+    def post(self, request):
+        current_user = request.user
+        if current_user.role not in [3, 4]:
+            return Response(
+                {"error": "You are not authorized to access this endpoint"}, status=status.HTTP_403_FORBIDDEN
+            )
+
+        upload = request.FILES.get("file")
+        if not upload:
+            return Response({"error": "A CSV file is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            reader = csv.DictReader(codecs.iterdecode(upload, "utf-8-sig"))
+            missing_columns = [column for column in self.required_columns if column not in (reader.fieldnames or [])]
+            if missing_columns:
+                return Response(
+                    {"error": f"Missing required columns: {', '.join(missing_columns)}"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            self.seen_emails = set()
+            self.seen_phones = set()
+            created = 0
+            errors = []
+            batch = []
+            # Row 1 is the header, so data rows are numbered from 2 to match spreadsheet line numbers
+            for row_number, row in enumerate(reader, start=2):
+                batch.append((row_number, row))
+                if len(batch) >= self.batch_size:
+                    created += self._import_batch(batch, errors)
+                    batch = []
+            if batch:
+                created += self._import_batch(batch, errors)
+            errors.sort(key=lambda error: error["row"])
+
+            return Response(
+                {
+                    "message": "User import finished",
+                    "created": created,
+                    "failed": len(errors),
+                    "errors": errors,
+                },
+                status=status.HTTP_200_OK,
+            )
+        except UnicodeDecodeError:
+            return Response({"error": "CSV file must be UTF-8 encoded"}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response(
+                {"error": f"Failed to import users: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    def _import_batch(self, batch, errors):
+        valid_rows = []
+        for row_number, row in batch:
+            serializer = UserImportRowSerializer(data=row)
+            if not serializer.is_valid():
+                errors.append({"row": row_number, "errors": serializer.errors})
+                continue
+            data = serializer.validated_data
+            if data["email"] in self.seen_emails:
+                errors.append({"row": row_number, "errors": {"email": ["Duplicate email in file"]}})
+                continue
+            if data["phone"] in self.seen_phones:
+                errors.append({"row": row_number, "errors": {"phone": ["Duplicate phone in file"]}})
+                continue
+            self.seen_emails.add(data["email"])
+            self.seen_phones.add(data["phone"])
+            valid_rows.append((row_number, data))
+
+        if not valid_rows:
+            return 0
+
+        existing_emails = set(
+            User.objects.filter(email__in=[data["email"] for _, data in valid_rows]).values_list("email", flat=True)
+        )
+        existing_phones = set(
+            User.objects.filter(phone__in=[data["phone"] for _, data in valid_rows]).values_list("phone", flat=True)
+        )
+
+        new_rows = []
+        for row_number, data in valid_rows:
+            if data["email"] in existing_emails:
+                errors.append({"row": row_number, "errors": {"email": ["User with this email already exists"]}})
+            elif data["phone"] in existing_phones:
+                errors.append({"row": row_number, "errors": {"phone": ["User with this phone number already exists"]}})
+            else:
+                new_rows.append((row_number, self._build_user(data)))
+
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create([user for _, user in new_rows])
+            return len(new_rows)
+        except IntegrityError:
+            # Lost a race with a concurrent insert; fall back to per-row saves to pinpoint the offenders
+            return self._import_rows_individually(new_rows, errors)
+
+    def _import_rows_individually(self, new_rows, errors):
+        created = 0
+        for row_number, user in new_rows:
+            try:
+                with transaction.atomic():
+                    user.save()
+                created += 1
+            except IntegrityError as e:
+                errors.append({"row": row_number, "errors": {"non_field_errors": [_unique_violation_message(e)]}})
+        return created
+
+    @staticmethod
+    def _build_user(data):
+        role = data.get("role", 0)
+        return User(
+            username=data["email"],  # Use email as username
+            email=data["email"],
+            password=make_password(None),
+            phone=data["phone"],
+            first_name=data["first_name"],
+            last_name=data["last_name"],
+            organization_name=data.get("organization_name"),
+            role=role,
+            is_staff=role in [1, 3],  # bulk_create skips User.save()
+            gender=data.get("gender"),
+            date_of_birth=data.get("date_of_birth"),
+        )
+
+
+class ThrottleStatsView(APIView):
+    authentication_classes = [RevocableJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        current_user = request.user
+        if current_user.role not in [3, 4]:
+            return Response(
+                {"error": "You are not authorized to access this endpoint"}, status=status.HTTP_403_FORBIDDEN
+            )
+        return Response(
+            {"message": "Throttle stats retrieved successfully", "stats": get_throttle_stats(AUTH_THROTTLE_SCOPES)},
+            status=status.HTTP_200_OK,
+        )
+
+
 class SocialLink(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [RevocableJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def __init__(self) -> None:
@@ -0,0 +1,110 @@
+"""
+Async variants of the read-only media endpoints.
+
+They use Django's async ORM so an ASGI worker can serve other connections
+while Postgres answers. They are routed in place of the DRF views when
+ASYNC_VIEWS is enabled (see gunicorn.asgi.conf.py); responses match the
+sync views field for field.
+"""
+
+from asgiref.sync import sync_to_async
+from django.db.models import Prefetch
+from django.http import JsonResponse
+from django.views import View
+from rest_framework.exceptions import AuthenticationFailed
+
+from base.models import MediaLibrary, User
+from base.utils.authentication import RevocableJWTAuthentication
+from base.utils.partitions import aprefetch_album_items
+from base.views.auth.serializers import UserProfileSerializer, UserPublicSerializer
+from base.views.operation.serializers import MediaLibrarySerializer
+from base.views.operation.view import MediaView
+
+_sync_media_view = MediaView.as_view()
+
+
+async def _authenticate(request):
+    """Run the JWT check (token decode, revocation filter, user lookup) off the event loop."""
+    try:
+        result = await sync_to_async(RevocableJWTAuthentication().authenticate)(request)
+    except AuthenticationFailed as e:
+        return None, JsonResponse({"detail": str(e.detail.get("detail", e.detail))}, status=401)
+    if result is None:
+        return None, JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+    return result[0], None
+
+
+class AsyncMediaView(View):
+    """
+    Serves GET asynchronously; uploads and edits are handed to the DRF MediaView
+    in a worker thread, since a View's handlers must all be async.
+    """
+
+    http_method_names = ["get", "post", "put", "delete"]
+
+    # get all media
+    async def get(self, request, media_id=None):
+        user, error_response = await _authenticate(request)
+        if error_response:
+            return error_response
+
+        try:
+            media_libraries = MediaLibrary.objects.filter(created_by=user).order_by("-id")
+            profile = await (
+                User.objects.select_related("last_payment_transaction")
+                .prefetch_related("user_social_links")
+                .aget(id=user.id)
+            )
+
+            if media_id:
+                media_library = await media_libraries.filter(id=media_id).afirst()
+                await aprefetch_album_items([media_library])
+                data = MediaLibrarySerializer(media_library).data
+            else:
+                media_libraries = await aprefetch_album_items([media async for media in media_libraries])
+                data = MediaLibrarySerializer(media_libraries, many=True).data
+
+            return JsonResponse(
+                {
+                    "message": "media successfully retrieved",
+                    "user": UserProfileSerializer(profile).data,
+                    "data": data,
+                }
+            )
+        except Exception as e:
+            return JsonResponse({"message": f"An error occurred: {str(e)}"}, status=500)
+
+    async def _delegate(self, request, *args, **kwargs):
+        return await sync_to_async(_sync_media_view)(request, *args, **kwargs)
+
+    post = put = delete = _delegate
+
+
+class AsyncExternalMediaIdView(View):
+    http_method_names = ["get"]
+
+    # get all media
+    async def get(self, request, media_unique_id):
+        try:
+            if not media_unique_id:
+                return JsonResponse({"message": "media_unique_id is required"}, status=400)
+
+            media_library = await (
+                MediaLibrary.objects.select_related("created_by")
+                # Prefetched so serialising the public profile needs no query inside the event loop
+                .prefetch_related(Prefetch("created_by__user_social_links"))
+                .aget(media_unique_id=media_unique_id)
+            )
+            await aprefetch_album_items([media_library])
+            created_by = media_library.created_by
+            return JsonResponse(
+                {
+                    "message": "media successfully retrieved",
+                    "user": UserPublicSerializer(created_by).data,
+                    "data": MediaLibrarySerializer(media_library).data,
+                }
+            )
+        except MediaLibrary.DoesNotExist:
+            return JsonResponse({"message": "Media library not found"}, status=404)
+        except Exception as e:
+            return JsonResponse({"message": f"An error occurred: {str(e)}"}, status=500)
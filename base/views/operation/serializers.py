@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
 from base.models import MediaLibrary, MediaLibraryItem
+from base.utils.cache import invalidate_media
 
 
 class MediaLibraryItemSerializer(serializers.ModelSerializer):
@@ -68,6 +69,8 @@ class MediaLibrarySerializer(serializers.ModelSerializer):
             MediaLibraryItem(media_library=media_library, **media_item_data) for media_item_data in media_items_data
         ]
         MediaLibraryItem.objects.bulk_create(media_items)
+        # bulk_create sends no signals, so drop cached copies once the items exist
+        invalidate_media(media_library)
 
         return media_library
 
@@ -84,10 +87,11 @@ class MediaLibrarySerializer(serializers.ModelSerializer):
 
         # If media_items was provided in the payload, replace existing related items
         if media_items_data:
-            MediaLibraryItem.objects.filter(media_library=instance).delete()
+            MediaLibraryItem.all_with_inactive.filter(media_library=instance).delete()
             media_items = [
                 MediaLibraryItem(media_library=instance, **media_item_data) for media_item_data in media_items_data
             ]
             MediaLibraryItem.objects.bulk_create(media_items)
+            invalidate_media(instance)
 
         return instance
@@ -1,10 +1,22 @@
+from django.conf import settings
 from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
 
 from base.views.operation.view import ExternalMediaIdView, MediaView
 
+if settings.ASYNC_VIEWS:
+    # Under ASGI the read paths are served by async views (writes still reach the DRF view)
+    from base.views.operation.async_views import AsyncExternalMediaIdView, AsyncMediaView
+
+    media_view = csrf_exempt(AsyncMediaView.as_view())
+    external_media_view = AsyncExternalMediaIdView.as_view()
+else:
+    media_view = MediaView.as_view()
+    external_media_view = ExternalMediaIdView.as_view()
+
 # api/base/operation/ ->
 urlpatterns = [
-    path("media/", MediaView.as_view(), name="media"),
-    path("media/<int:media_id>/", MediaView.as_view(), name="media-detail"),
-    path("media/external/<str:media_unique_id>/", ExternalMediaIdView.as_view(), name="external-media-id"),
+    path("media/", media_view, name="media"),
+    path("media/<int:media_id>/", media_view, name="media-detail"),
+    path("media/external/<str:media_unique_id>/", external_media_view, name="external-media-id"),
 ]
@@ -3,22 +3,27 @@ import string
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from io import BytesIO
 
-import requests
+from django.db import transaction
 from django.db.models import Q
 from django.core.files.uploadedfile import InMemoryUploadedFile
-from base.views.auth.serializers import UserPublicSerializer, UserSerializer
+from base.views.auth.serializers import get_cached_public_profile, get_cached_user_profile
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from base.models import MediaLibrary, User
-from base.utils.s3_utils import get_s3_client, upload_file_to_s3
+from base.utils.authentication import RevocableJWTAuthentication
+from base.utils.cache import MEDIA_LISTS, SHARE_LINKS
+from base.utils.credits import MEDIA_UPLOAD, InsufficientCredit, debit_credit
+from base.utils.idempotency import idempotent
+from base.utils.metrics import track_in_flight, track_queue
+from base.utils.partitions import prefetch_album_items
+from base.utils.s3_utils import delete_file_from_s3, get_s3_client, upload_file_to_s3
 from base.views.operation.serializers import MediaLibrarySerializer
 
 
 class MediaView(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [RevocableJWTAuthentication]
     # permission_classes = [IsAuthenticated]
 
     # get all media
@@ -26,31 +31,36 @@ class MediaView(APIView):
         try:
             current_user = request.user
             has_single_media = False
-            filter_kwargs = Q(is_active=True, created_by=current_user)
+            filter_kwargs = Q(created_by=current_user)
             if media_id:
                 filter_kwargs &= Q(id=media_id)
                 has_single_media = True
 
-            media_libraries = (
-                MediaLibrary.objects.filter(filter_kwargs).prefetch_related("media_library_items").order_by("-id")
-            )
+            media_libraries = MediaLibrary.objects.filter(filter_kwargs).order_by("-id")
             if has_single_media:
-                media_libraries = media_libraries.first()
+                media_library = media_libraries.first()
+                prefetch_album_items([media_library])
+                data = MediaLibrarySerializer(media_library).data
             else:
-                media_libraries = media_libraries.all()
+                # The full list is what the studio dashboard polls; single items are cheap enough uncached
+                data = MEDIA_LISTS.get_or_set(
+                    current_user.id,
+                    lambda: MediaLibrarySerializer(prefetch_album_items(media_libraries), many=True).data,
+                )
 
-            media_libraries = MediaLibrarySerializer(media_libraries, many=not has_single_media)
             return Response(
                 {
                     "message": "media successfully retrieved", 
-                    "user": UserSerializer(current_user).data,
-                    "data": media_libraries.data
+                    "user": get_cached_user_profile(current_user.id),
+                    "data": data
                 }
             )
         except Exception as e:
             return Response({"message": f"An error occurred: {str(e)}"}, status=500)
 
     # save new media
+    @idempotent
+    @track_in_flight("media_upload")
     def post(self, request):
         try:
             # Get form data
@@ -77,6 +87,7 @@ class MediaView(APIView):
                         whatsapp_number = social_link.social_media_url
                 
             
+            # Cheap early exit only; the authoritative check is the atomic debit below
             if current_user.remaining_credit <= 0:
                 return Response({"message": "You have no remaining credit"}, status=400)
 
@@ -143,7 +154,7 @@ class MediaView(APIView):
             future_to_item = {}
             with ThreadPoolExecutor(max_workers=max_workers) as executor:
                 for item in prepared_items:
-                    future = executor.submit(upload_worker, item)
+                    future = executor.submit(track_queue("media_upload", upload_worker), item)
                     future_to_item[future] = item
                 for future in as_completed(future_to_item):
                     item = future_to_item[future]
@@ -172,10 +183,15 @@ class MediaView(APIView):
             # Create media library with items
             serializer = MediaLibrarySerializer(data=serializer_data)
             if serializer.is_valid():
-                serializer.save()
-                current_user.remaining_credit = current_user.remaining_credit - 1
-                current_user.used_credit = current_user.used_credit + 1
-                current_user.save()
+                try:
+                    with transaction.atomic():
+                        media_library = serializer.save()
+                        debit_credit(current_user.id, 1, MEDIA_UPLOAD, media_library=media_library)
+                except InsufficientCredit:
+                    # A concurrent upload spent the last credit while we were uploading
+                    for item in media_items_data:
+                        delete_file_from_s3(item["media_url"], s3_client=s3_client)
+                    return Response({"message": "You have no remaining credit"}, status=400)
                 return Response(
                     {
                         "message": "Media library created successfully",
@@ -192,7 +208,7 @@ class MediaView(APIView):
     # update media
     def put(self, request, media_id):
         try:
-            media_library = MediaLibrary.objects.get(id=media_id, is_active=True)
+            media_library = MediaLibrary.objects.get(id=media_id)
             media_items = request.FILES.getlist("media_items")
             media_unique_id = media_library.media_unique_id
             studio_name = request.data.get("studio_name", media_library.studio_name)
@@ -251,7 +267,7 @@ class MediaView(APIView):
 
     def delete(self, request, media_id):
         try:
-            media_library = MediaLibrary.objects.get(id=media_id, is_active=True)
+            media_library = MediaLibrary.objects.get(id=media_id)
             media_library.is_active = False
             media_library.save()
             return Response({"message": "Media library deleted successfully"}, status=200)
@@ -270,18 +286,20 @@ class ExternalMediaIdView(APIView):
             if not media_unique_id:
                 return Response({"message": "media_unique_id is required"}, status=400)
 
-            media_library = (
-                MediaLibrary.objects.filter(media_unique_id=media_unique_id)
-                .select_related("created_by")
-                .prefetch_related("media_library_items")
-                .first()
-            )
-            created_by = media_library.created_by
-            media_libraries = MediaLibrarySerializer(media_library)
+            def load():
+                media_library = MediaLibrary.objects.get(media_unique_id=media_unique_id)
+                prefetch_album_items([media_library])
+                return {"created_by_id": media_library.created_by_id, "data": MediaLibrarySerializer(media_library).data}
+
+            # Share links are public and hot; the owner's public profile is cached separately
+            # so a social-link change doesn't have to find every album they own
+            share_link = SHARE_LINKS.get_or_set(media_unique_id, load)
             return Response({
                 "message": "media successfully retrieved", 
-                "user": UserPublicSerializer(created_by).data,
-                "data": media_libraries.data
+                "user": get_cached_public_profile(share_link["created_by_id"]),
+                "data": share_link["data"]
             })
+        except MediaLibrary.DoesNotExist:
+            return Response({"message": "Media library not found"}, status=404)
         except Exception as e:
             return Response({"message": f"An error occurred: {str(e)}"}, status=500)
@@ -1,15 +1,18 @@
 from datetime import datetime
 
+from django.db import transaction
 from rest_framework import serializers
 
 from base.models import UserPaymentTransaction
+from base.utils.payments import COMPLETED, PENDING, apply_transaction_status_change, enqueue_payment_completed
 
 
 class PaymentGatewaySerializer(serializers.Serializer):
     transaction_id = serializers.CharField(required=True)
     transaction_amount = serializers.DecimalField(required=True, max_digits=10, decimal_places=2)
-    user_id = serializers.CharField(required=True, write_only=True)
+    user_id = serializers.IntegerField(required=True, write_only=True)
     transaction_status = serializers.IntegerField(required=False)
+    operation_count = serializers.IntegerField(required=False, min_value=0)
     transaction_status_name = serializers.CharField(source="get_transaction_status_display", read_only=True)
     transaction_method_name = serializers.CharField(source="get_transaction_method_display", read_only=True)
     transaction_active_from_date = serializers.DateTimeField(required=False)
@@ -30,13 +33,33 @@ class PaymentGatewaySerializer(serializers.Serializer):
         ]
         read_only_fields = ["id"]
 
+    # Fields that decide how many credits a transaction grants; only admins (role 3/4) may set them
+    admin_fields = ["transaction_status", "operation_count"]
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get("request")
+        if request is None or getattr(request.user, "role", None) not in [3, 4]:
+            for name in self.admin_fields:
+                fields[name].read_only = True
+        return fields
+
     def create(self, validated_data):
         # Map write-only user_id to FK
         user_id = validated_data.pop("user_id")
-        return UserPaymentTransaction.objects.create(user_id=user_id, **validated_data)
+        # New transactions always start pending; credits are granted only when an admin
+        # completes them (PaymentTransactionView.put) or reconciliation matches them
+        validated_data["transaction_status"] = PENDING
+        with transaction.atomic():
+            instance = UserPaymentTransaction.objects.create(user_id=user_id, **validated_data)
+            apply_transaction_status_change(instance, None, instance.transaction_status)
+        return instance
 
     def update(self, instance, validated_data):
-        # Only allow updating transaction_status (ignore other fields)
+        # Only allow updating transaction_status and operation_count (ignore other fields)
+        old_status = instance.transaction_status
+        if "operation_count" in validated_data:
+            instance.operation_count = validated_data["operation_count"]
         if "transaction_status" in validated_data:
             transaction_status = validated_data["transaction_status"]
             if transaction_status == 1:
@@ -44,5 +67,12 @@ class PaymentGatewaySerializer(serializers.Serializer):
 
             instance.transaction_status = validated_data["transaction_status"]
 
-        instance.save(update_fields=["transaction_status", "updated_at", "transaction_active_from_date"])
+        with transaction.atomic():
+            instance.save(
+                update_fields=["transaction_status", "operation_count", "updated_at", "transaction_active_from_date"]
+            )
+            apply_transaction_status_change(instance, old_status, instance.transaction_status)
+            # Credits are granted by the outbox worker (drain_outbox), keeping this request short
+            if old_status != COMPLETED and instance.transaction_status == COMPLETED:
+                enqueue_payment_completed([instance.id])
         return instance
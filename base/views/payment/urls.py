@@ -1,9 +1,12 @@
 from django.urls import path
 
-from .views import PaymentTransactionView
+from .views import PaymentReconciliationView, PaymentTransactionHistoryView, PaymentTransactionView, ReportView
 
 # api/base/payment/ ->
 urlpatterns = [
+    path("payment-transactions/", PaymentTransactionHistoryView.as_view(), name="payment-transactions"),
+    path("reports/", ReportView.as_view(), name="payment-reports"),
+    path("reconcile/", PaymentReconciliationView.as_view(), name="payment-reconcile"),
     path("create-payment-transaction/", PaymentTransactionView.as_view(), name="create-payment-transaction"),
     path(
         "update-payment-transaction/<int:payment_id>/",
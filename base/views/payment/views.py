@@ -1,31 +1,54 @@
+import codecs
+import csv
 import json
+import logging
 from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
 
 import jwt
 from django.conf import settings
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
-from base.models import UserPaymentTransaction
+from base.models import CreditUsageDailyRollup, RevenueDailyRollup, UserPaymentTransaction
+from base.utils.authentication import RevocableJWTAuthentication
+from base.utils.cache import PAYMENT_REPORTS
+from base.utils.idempotency import idempotent
+from base.utils.payments import (
+    COMPLETED,
+    FAILED,
+    PENDING,
+    apply_pending_transactions_resolved,
+    enqueue_payment_completed,
+)
+from base.views.auth.serializers import UserPaymentTransactionSerializer
 from base.views.payment.serializers import PaymentGatewaySerializer
 
+logger = logging.getLogger(__name__)
+
 
 class PaymentTransactionView(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [RevocableJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def post(self, request):
         try:
             serilzed_data = request.data.copy()
 
-            if "user_id" not in serilzed_data:
+            # Only admins may record a transaction for another user
+            if "user_id" not in serilzed_data or request.user.role not in [3, 4]:
                 serilzed_data["user_id"] = request.user.id
 
-            payment_gateway_serializer = PaymentGatewaySerializer(data=serilzed_data)
+            payment_gateway_serializer = PaymentGatewaySerializer(data=serilzed_data, context={"request": request})
             if payment_gateway_serializer.is_valid():
                 try:
                     payment_gateway_serializer.save()
@@ -53,30 +76,316 @@ class PaymentTransactionView(APIView):
                     {"error": "You are not authorized to access this endpoint"}, status=status.HTTP_403_FORBIDDEN
                 )
 
-            payment_gateway_instance = UserPaymentTransaction.objects.get(id=payment_id)
+            with transaction.atomic():
+                # Row lock until commit: a concurrent PUT or reconciliation waits and then sees
+                # the new status, so the user's payment aggregates are only moved once
+                payment_gateway_instance = UserPaymentTransaction.objects.select_for_update().get(id=payment_id)
 
-            if payment_gateway_instance.transaction_status in [1, 2]:
-                return Response(
-                    {"error": "Payment transaction can't be updated more"}, status=status.HTTP_400_BAD_REQUEST
-                )
+                if payment_gateway_instance.transaction_status in [1, 2]:
+                    return Response(
+                        {"error": "Payment transaction can't be updated more"}, status=status.HTTP_400_BAD_REQUEST
+                    )
 
-            serilzed_data = request.data.copy()
-            payment_gateway_serializer = PaymentGatewaySerializer(
-                instance=payment_gateway_instance, data=serilzed_data, partial=True
-            )
-            if payment_gateway_serializer.is_valid():
-                payment_gateway_serializer.save()
-                return Response(
-                    {
-                        "message": "Payment transaction updated successfully",
-                        "data": payment_gateway_serializer.data,
-                    },
-                    status=status.HTTP_200_OK,
+                serilzed_data = request.data.copy()
+                payment_gateway_serializer = PaymentGatewaySerializer(
+                    instance=payment_gateway_instance, data=serilzed_data, partial=True, context={"request": request}
                 )
+                if not payment_gateway_serializer.is_valid():
+                    return Response(
+                        {"error": payment_gateway_serializer.errors}, status=status.HTTP_400_BAD_REQUEST
+                    )
+                payment_gateway_serializer.save()
+            return Response(
+                {
+                    "message": "Payment transaction updated successfully",
+                    "data": payment_gateway_serializer.data,
+                },
+                status=status.HTTP_200_OK,
+            )
         except UserPaymentTransaction.DoesNotExist:
             return Response({"error": "Payment transaction not found"}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
-            import traceback
+            logger.exception("Failed to update payment transaction %s", payment_id)
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class TransactionCursorPagination(CursorPagination):
+    # Keyset pagination on the (user, -id) index: every page costs the same however long the history
+    ordering = "-id"
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class PaymentTransactionHistoryView(APIView):
+    authentication_classes = [RevocableJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            current_user = request.user
+            user_id = current_user.id
+
+            # Admins may page through another user's history
+            if request.query_params.get("user_id"):
+                if current_user.role not in [3, 4]:
+                    return Response(
+                        {"error": "You are not authorized to access this endpoint"}, status=status.HTTP_403_FORBIDDEN
+                    )
+                user_id = request.query_params.get("user_id")
+                if not user_id.isdecimal():
+                    return Response({"error": "user_id must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+            paginator = TransactionCursorPagination()
+            transactions = paginator.paginate_queryset(
+                UserPaymentTransaction.objects.filter(user_id=user_id), request, view=self
+            )
+            return Response(
+                {
+                    "message": "Payment transactions retrieved successfully",
+                    "next": paginator.get_next_link(),
+                    "previous": paginator.get_previous_link(),
+                    "data": UserPaymentTransactionSerializer(transactions, many=True).data,
+                },
+                status=status.HTTP_200_OK,
+            )
+        except APIException:
+            # e.g. NotFound for a stale or tampered cursor; DRF renders it with its own status code
+            raise
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ReportView(APIView):
+    """
+    Admin revenue and credit-usage report for a date range.
+
+    Answers come from the daily rollup tables (see refresh_rollups), so the
+    cost depends on the number of days asked for, not on how many
+    transactions exist.
+    """
+
+    authentication_classes = [RevocableJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    revenue_dimensions = {
+        "day": "day",
+        "method": "transaction_method",
+        "status": "transaction_status",
+        "role": "role",
+    }
+
+    def get(self, request):
+        current_user = request.user
+        if current_user.role not in [3, 4]:
+            return Response(
+                {"error": "You are not authorized to access this endpoint"}, status=status.HTTP_403_FORBIDDEN
+            )
+
+        start_date = parse_date(request.query_params.get("start_date") or "")
+        end_date = parse_date(request.query_params.get("end_date") or "")
+        if not start_date or not end_date or start_date > end_date:
+            return Response(
+                {"error": "start_date and end_date (YYYY-MM-DD, start <= end) are required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        group_by = [key.strip() for key in request.query_params.get("group_by", "day,method,status,role").split(",")]
+        unknown = [key for key in group_by if key not in self.revenue_dimensions]
+        if unknown:
+            return Response(
+                {"error": f"Unknown group_by values: {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        fields = [self.revenue_dimensions[key] for key in group_by]
+
+        def load():
+            revenue = (
+                RevenueDailyRollup.objects.filter(day__gte=start_date, day__lte=end_date)
+                .values(*fields)
+                .annotate(
+                    transaction_count=Sum("transaction_count"),
+                    total_amount=Sum("total_amount"),
+                    total_operation_count=Sum("total_operation_count"),
+                )
+                .order_by(*fields)
+            )
+            credit_usage = (
+                CreditUsageDailyRollup.objects.filter(day__gte=start_date, day__lte=end_date)
+                .values("user_id", "user__organization_name")
+                .annotate(credits_consumed=Sum("credits_consumed"), upload_count=Sum("upload_count"))
+                .order_by("-credits_consumed")
+            )
+            return {"revenue": list(revenue), "credit_usage": list(credit_usage)}
+
+        try:
+            # refresh_rollups invalidates the whole namespace whenever the rollups change
+            report = PAYMENT_REPORTS.get_or_set(f"{start_date}:{end_date}:{','.join(group_by)}", load)
+            return Response(
+                {
+                    "message": "Report retrieved successfully",
+                    "revenue": report["revenue"],
+                    "credit_usage": report["credit_usage"],
+                },
+                status=status.HTTP_200_OK,
+            )
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class PaymentReconciliationView(APIView):
+    """
+    Admin bank-statement reconciliation.
+
+    Streams an uploaded CSV with `transaction_id`, `status` (completed/failed)
+    and optional `amount` columns. Each batch of rows is matched against
+    pending transactions with one IN lookup; matched rows are moved with one
+    UPDATE per target status. The whole file runs in a single transaction, so
+    a failure applies nothing. Pass `dry_run=true` to get the report without
+    applying it.
+    """
+
+    authentication_classes = [RevocableJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    batch_size = 1000
+    status_aliases = {
+        "1": COMPLETED,
+        "completed": COMPLETED,
+        "success": COMPLETED,
+        "2": FAILED,
+        "failed": FAILED,
+        "rejected": FAILED,
+    }
+
+    def post(self, request):
+        current_user = request.user
+        if current_user.role not in [3, 4]:
+            return Response(
+                {"error": "You are not authorized to access this endpoint"}, status=status.HTTP_403_FORBIDDEN
+            )
 
-            traceback.print_exc()
+        upload = request.FILES.get("file")
+        if not upload:
+            return Response({"error": "A CSV file is required"}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = str(request.query_params.get("dry_run", "")).lower() in ["1", "true", "yes"]
+
+        try:
+            reader = csv.DictReader(codecs.iterdecode(upload, "utf-8-sig"))
+            columns = reader.fieldnames or []
+            missing_columns = [column for column in ["transaction_id", "status"] if column not in columns]
+            if missing_columns:
+                return Response(
+                    {"error": f"Missing required columns: {', '.join(missing_columns)}"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            self.seen_transaction_ids = set()
+            self.matched = {COMPLETED: 0, FAILED: 0}
+            mismatches = []
+            with transaction.atomic():
+                batch = []
+                # Row 1 is the header, so data rows are numbered from 2 to match spreadsheet line numbers
+                for row_number, row in enumerate(reader, start=2):
+                    batch.append((row_number, row))
+                    if len(batch) >= self.batch_size:
+                        self._reconcile_batch(batch, mismatches)
+                        batch = []
+                if batch:
+                    self._reconcile_batch(batch, mismatches)
+
+                if dry_run:
+                    transaction.set_rollback(True)
+            mismatches.sort(key=lambda mismatch: mismatch["row"])
+
+            return Response(
+                {
+                    "message": "Dry run finished, nothing was applied" if dry_run else "Reconciliation applied",
+                    "completed": self.matched[COMPLETED],
+                    "failed": self.matched[FAILED],
+                    "mismatch_count": len(mismatches),
+                    "mismatches": mismatches,
+                },
+                status=status.HTTP_200_OK,
+            )
+        except UnicodeDecodeError:
+            return Response({"error": "CSV file must be UTF-8 encoded"}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def _parse_row(self, row_number, row, mismatches):
+        transaction_id = (row.get("transaction_id") or "").strip()
+        target_status = self.status_aliases.get((row.get("status") or "").strip().lower())
+        if not transaction_id or target_status is None:
+            mismatches.append({"row": row_number, "transaction_id": transaction_id, "reason": "invalid_row"})
+            return None
+        if transaction_id in self.seen_transaction_ids:
+            mismatches.append({"row": row_number, "transaction_id": transaction_id, "reason": "duplicate_in_file"})
+            return None
+        self.seen_transaction_ids.add(transaction_id)
+
+        amount = (row.get("amount") or "").strip()
+        try:
+            amount = Decimal(amount) if amount else None
+        except InvalidOperation:
+            mismatches.append({"row": row_number, "transaction_id": transaction_id, "reason": "invalid_amount"})
+            return None
+        return transaction_id, target_status, amount
+
+    def _reconcile_batch(self, batch, mismatches):
+        parsed = {}
+        for row_number, row in batch:
+            result = self._parse_row(row_number, row, mismatches)
+            if result:
+                parsed[result[0]] = (row_number, result[1], result[2])
+        if not parsed:
+            return
+
+        transactions = {
+            transaction_id: (payment_id, user_id, amount, transaction_status)
+            for payment_id, transaction_id, user_id, amount, transaction_status in (
+                # Row locks, also taken by PaymentTransactionView.put, keep a concurrent single approval
+                # from slipping in between lookup and update
+                UserPaymentTransaction.objects.select_for_update()
+                .filter(transaction_id__in=parsed.keys())
+                .values_list("id", "transaction_id", "user_id", "transaction_amount", "transaction_status")
+            )
+        }
+
+        to_apply = {COMPLETED: [], FAILED: []}
+        for transaction_id, (row_number, target_status, statement_amount) in parsed.items():
+            found = transactions.get(transaction_id)
+            if found is None:
+                mismatches.append({"row": row_number, "transaction_id": transaction_id, "reason": "not_found"})
+                continue
+            payment_id, user_id, amount, transaction_status = found
+            if transaction_status != PENDING:
+                mismatches.append(
+                    {"row": row_number, "transaction_id": transaction_id, "reason": "already_processed"}
+                )
+                continue
+            if statement_amount is not None and statement_amount != amount:
+                mismatches.append(
+                    {
+                        "row": row_number,
+                        "transaction_id": transaction_id,
+                        "reason": "amount_mismatch",
+                        "expected_amount": str(amount),
+                        "statement_amount": str(statement_amount),
+                    }
+                )
+                continue
+            to_apply[target_status].append((payment_id, user_id, amount))
+
+        now = timezone.now()
+        for target_status, rows in to_apply.items():
+            if not rows:
+                continue
+            changes = {"transaction_status": target_status, "updated_at": now}
+            if target_status == COMPLETED:
+                changes["transaction_active_from_date"] = now.date()
+            updated_ids = [payment_id for payment_id, _, _ in rows]
+            UserPaymentTransaction.objects.filter(id__in=updated_ids).update(**changes)
+            apply_pending_transactions_resolved(((user_id, amount) for _, user_id, amount in rows), target_status)
+            if target_status == COMPLETED:
+                enqueue_payment_completed(updated_ids)
+            self.matched[target_status] += len(rows)
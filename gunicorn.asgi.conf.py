@@ -0,0 +1,42 @@
+"""
+ASGI server profile.
+
+    gunicorn -c gunicorn.asgi.conf.py rd_studio_backend.asgi:application
+
+Runs uvicorn workers under gunicorn and switches the read-heavy endpoints
+(health, media GET, external media) to their async views. Compare against
+the WSGI deployment with `manage.py bench_concurrency`.
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = "uvicorn_worker.UvicornWorker"
+# One event loop per core is enough; concurrency comes from the loop, not from processes
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+keepalive = 5
+
+raw_env = ["ASYNC_VIEWS=True"]
+
+# Read by settings.py in each worker. Sync ORM calls from concurrent requests run on
+# separate threads, so each worker's pool gets an even share of the connection budget
+# (less the worker's cache invalidation listener).
+db_max_connections = int(os.environ.get("DB_MAX_CONNECTIONS", "100"))
+os.environ.setdefault("DB_POOL_MAX_SIZE", str(max(1, db_max_connections // workers - 1)))
+
+# Workers write Prometheus samples here and /metrics/ merges them. Wiped on every
+# (re)start so counters from dead workers don't linger.
+metrics_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "rd-prometheus"))
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    # Drop the dead worker's live gauges (e.g. thread-pool queue depth)
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,75 @@
+"""
+Production WSGI server profile (picked up automatically by `gunicorn` from this directory).
+
+    gunicorn -c gunicorn.conf.py rd_studio_backend.wsgi:application
+
+Sizing, all overridable through the environment:
+- workers: 2 x CPU + 1, the usual gunicorn rule, capped by WEB_CONCURRENCY.
+- threads: uploads spend most of their time waiting on S3, so each worker gets
+  enough threads that UPLOAD_CONCURRENCY simultaneous uploads fit across all
+  workers, plus headroom for short requests.
+- DB pool: each worker's pool holds at most one connection per thread, and all
+  workers together stay within DB_MAX_CONNECTIONS (this instance's share of
+  Postgres max_connections), less one per worker for the cache invalidation
+  listener.
+"""
+
+import math
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+cpu_count = multiprocessing.cpu_count()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", cpu_count * 2 + 1))
+upload_concurrency = int(os.environ.get("UPLOAD_CONCURRENCY", "16"))
+threads = int(os.environ.get("GUNICORN_THREADS", max(4, math.ceil(upload_concurrency / workers) + 2)))
+
+# Read by settings.py when the app is loaded below
+db_max_connections = int(os.environ.get("DB_MAX_CONNECTIONS", "100"))
+os.environ.setdefault("DB_POOL_MAX_SIZE", str(max(1, min(threads, db_max_connections // workers - 1))))
+os.environ.setdefault("DB_POOL_MIN_SIZE", str(min(2, int(os.environ["DB_POOL_MAX_SIZE"]))))
+# Readiness turns a worker away once uploads hold all but one of its threads
+os.environ.setdefault("READINESS_MAX_UPLOADS_IN_FLIGHT", str(max(1, threads - 1)))
+
+# Workers write Prometheus samples here and /metrics/ merges them. Wiped on every
+# (re)start so counters from dead workers don't linger.
+metrics_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "rd-prometheus"))
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir, exist_ok=True)
+
+# A 200-photo album upload can legitimately run for minutes
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "300"))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "60"))
+keepalive = 5
+
+# Import Django (and calibrate the password hasher) once in the master; workers fork from it
+preload_app = True
+
+# Recycle workers to contain slow leaks; jitter keeps them from restarting in lockstep
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+
+def post_fork(server, worker):
+    from base.utils.warmup import warm_up_worker
+
+    try:
+        timings = warm_up_worker()
+    except Exception as e:
+        # A dependency being down must not stop the worker from booting; readiness reports it
+        server.log.warning("Worker %s warmup failed: %s", worker.pid, e)
+        return
+    server.log.info(
+        "Worker %s warmed up (%s)", worker.pid, ", ".join(f"{step}={seconds * 1000:.0f}ms" for step, seconds in timings.items())
+    )
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    # Drop the dead worker's live gauges (e.g. thread-pool queue depth)
+    multiprocess.mark_process_dead(worker.pid)
@@ -10,9 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import tempfile
 from pathlib import Path
 
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -31,6 +32,9 @@ DEBUG = config("DEBUG", default=False, cast=bool)
 
 ALLOWED_HOSTS = ["*"]
 
+# Route the read-heavy endpoints to their async views; set by the ASGI server profile
+ASYNC_VIEWS = config("ASYNC_VIEWS", default=False, cast=bool)
+
 
 # Application definition
 
@@ -43,15 +47,19 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "rest_framework",
     "rest_framework_simplejwt",
+    "rest_framework_simplejwt.token_blacklist",
     "corsheaders",
-    "debug_toolbar",
     # Local apps
     "base",
 ]
 
 MIDDLEWARE = [
+    # Outermost, so every log line (including other middleware's) carries the request ID
+    "base.utils.log.RequestContextMiddleware",
+    # Early, so its timings cover the rest of the stack
+    "base.utils.metrics.MetricsMiddleware",
+    "base.utils.profiling.ProfilingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -59,6 +67,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "base.utils.db_router.ReplicaRoutingMiddleware",
 ]
 
 ROOT_URLCONF = "rd_studio_backend.urls"
@@ -84,6 +93,11 @@ WSGI_APPLICATION = "rd_studio_backend.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Each worker process keeps a psycopg connection pool instead of connecting per request.
+# gunicorn.conf.py sizes DB_POOL_MAX_SIZE from workers/threads and DB_MAX_CONNECTIONS.
+# With DB_POOL=False, connections persist per thread for DB_CONN_MAX_AGE seconds instead.
+DB_POOL = config("DB_POOL", default=True, cast=bool)
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -92,9 +106,46 @@ DATABASES = {
         "PASSWORD": config("DB_PASSWORD", default="postgres"),
         "HOST": config("DB_HOST", default="localhost"),
         "PORT": config("DB_PORT", default="5432"),
+        # Pooled and persistent connections are checked before reuse
+        "CONN_HEALTH_CHECKS": True,
+        # Pooling requires CONN_MAX_AGE=0: Django hands the connection back to the pool after each request
+        "CONN_MAX_AGE": 0 if DB_POOL else config("DB_CONN_MAX_AGE", default=60, cast=int),
+        "OPTIONS": (
+            {
+                "pool": {
+                    "min_size": config("DB_POOL_MIN_SIZE", default=2, cast=int),
+                    "max_size": config("DB_POOL_MAX_SIZE", default=10, cast=int),
+                    # Seconds a request waits for a free connection before erroring
+                    "timeout": config("DB_POOL_TIMEOUT", default=10, cast=float),
+                    "max_idle": config("DB_POOL_MAX_IDLE", default=300, cast=float),
+                    "max_lifetime": config("DB_POOL_MAX_LIFETIME", default=1800, cast=float),
+                }
+            }
+            if DB_POOL
+            else {}
+        ),
     }
 }
 
+# Read replicas, e.g. DB_REPLICA_HOSTS=replica-1.internal,replica-2.internal:5433.
+# Locally, a second Postgres instance on another port works (DB_REPLICA_HOSTS=localhost:5433).
+# Replicas need REDIS_URL (or SHARED_CACHE_ALLOW_LOCAL=True) so read-your-writes pins reach every worker.
+DB_REPLICA_ALIASES = []
+for index, address in enumerate(config("DB_REPLICA_HOSTS", default="", cast=Csv()), start=1):
+    host, _, port = address.partition(":")
+    alias = f"replica_{index}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+    DB_REPLICA_ALIASES.append(alias)
+
+DATABASE_ROUTERS = ["base.utils.db_router.PrimaryReplicaRouter"]
+# After a successful write, that user's reads stay on the primary this long (covers replica lag)
+READ_YOUR_WRITES_SECONDS = config("READ_YOUR_WRITES_SECONDS", default=5, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -114,6 +165,112 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Throttle buckets, read-your-writes pins and the shared tier of base.utils.cache must be
+# visible to every worker, so the "shared" cache uses Redis when REDIS_URL is set; without
+# it each process falls back to its own in-memory stand-in, which is only allowed with DEBUG
+# on or SHARED_CACHE_ALLOW_LOCAL=True (a single-process deployment); otherwise startup fails.
+REDIS_URL = config("REDIS_URL", default="")
+SHARED_CACHE_ALLOW_LOCAL = config("SHARED_CACHE_ALLOW_LOCAL", default=False, cast=bool)
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "shared": (
+        {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REDIS_URL, "KEY_PREFIX": "rd"}
+        if REDIS_URL
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "shared"}
+    ),
+}
+SHARED_CACHE_ALIAS = "shared"
+THROTTLE_CACHE_ALIAS = SHARED_CACHE_ALIAS
+DB_PIN_CACHE_ALIAS = SHARED_CACHE_ALIAS
+# Entries per namespace in each process's in-memory tier
+CACHE_LOCAL_MAX_ENTRIES = config("CACHE_LOCAL_MAX_ENTRIES", default=1000, cast=int)
+# Broadcast cache deletes to every worker over Postgres LISTEN/NOTIFY (one extra
+# connection per worker); ignored on other databases
+CACHE_INVALIDATION_BUS = config("CACHE_INVALIDATION_BUS", default=True, cast=bool)
+CACHE_INVALIDATION_CHANNEL = "cache_invalidation"
+
+
+# Metrics
+# Served at /metrics/ in Prometheus text format; set a token to keep it private
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+
+
+# Readiness (api/health/ready/)
+# Each worker re-checks the database, S3 and its thread pools in the background every
+# READINESS_CHECK_INTERVAL seconds; a result older than READINESS_MAX_AGE counts as not ready.
+READINESS_CHECK_INTERVAL = config("READINESS_CHECK_INTERVAL", default=5, cast=float)
+READINESS_MAX_AGE = config("READINESS_MAX_AGE", default=30, cast=float)
+READINESS_CHECK_S3 = config("READINESS_CHECK_S3", default=True, cast=bool)
+# Tasks queued (not yet started) in one shared pool, per worker, before the worker reports itself saturated
+READINESS_MAX_QUEUE_DEPTH = config("READINESS_MAX_QUEUE_DEPTH", default=100, cast=int)
+# Upload requests running at once in one worker before it reports itself saturated; gunicorn.conf.py
+# sets it to the worker's threads less one, keeping a thread for short requests. 0 means no limit.
+READINESS_MAX_UPLOADS_IN_FLIGHT = config("READINESS_MAX_UPLOADS_IN_FLIGHT", default=0, cast=int)
+
+# Request profiling
+# Profiles a random fraction of requests, plus admin requests that send the trigger
+# header; listed at /api/profiles/. The directory is shared by the workers on a host.
+PROFILING_SAMPLE_RATE = config("PROFILING_SAMPLE_RATE", default=0.0, cast=float)
+PROFILING_TRIGGER_HEADER = "X-Profile"
+PROFILING_INTERVAL_MS = config("PROFILING_INTERVAL_MS", default=5, cast=int)
+PROFILING_MAX_CONCURRENT = config("PROFILING_MAX_CONCURRENT", default=4, cast=int)
+PROFILING_DIR = config("PROFILING_DIR", default=str(Path(tempfile.gettempdir()) / "rd_studio_profiles"))
+PROFILING_RETENTION_HOURS = config("PROFILING_RETENTION_HOURS", default=24, cast=int)
+PROFILING_MAX_FILES = config("PROFILING_MAX_FILES", default=500, cast=int)
+
+
+# Logging
+# JSON lines on stdout, written by a background thread per process (base.utils.log).
+# INFO/DEBUG lines are kept for LOG_INFO_SAMPLE_RATE of requests; warnings and errors always.
+LOG_LEVEL = config("LOG_LEVEL", default="INFO")
+LOG_INFO_SAMPLE_RATE = config("LOG_INFO_SAMPLE_RATE", default=1.0, cast=float)
+LOG_QUEUE_MAX_SIZE = config("LOG_QUEUE_MAX_SIZE", default=10_000, cast=int)
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "filters": {
+        "request_context": {"()": "base.utils.log.RequestContextFilter"},
+    },
+    "handlers": {
+        "queue": {
+            "()": "base.utils.log.QueueLogHandler",
+            "max_queue_size": LOG_QUEUE_MAX_SIZE,
+            "filters": ["request_context"],
+        },
+    },
+    "root": {"handlers": ["queue"], "level": LOG_LEVEL},
+    "loggers": {
+        # Replaces Django's console/mail_admins handlers; django.server (runserver) keeps its own
+        "django": {"handlers": ["queue"], "level": LOG_LEVEL, "propagate": False},
+    },
+}
+
+
+# Password hashing
+# New hashes use PBKDF2 tuned to PASSWORD_HASH_TARGET_MS; the stock hashers stay listed
+# so existing rows keep verifying and get upgraded on the next login.
+PASSWORD_HASHERS = [
+    "base.utils.passwords.CalibratedPBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+PASSWORD_HASH_TARGET_MS = config("PASSWORD_HASH_TARGET_MS", default=250, cast=int)
+# Floor for the calibrated count; Django 5.2's own PBKDF2 default, so tuning never ends up weaker than stock
+PASSWORD_HASH_MIN_ITERATIONS = config("PASSWORD_HASH_MIN_ITERATIONS", default=1_000_000, cast=int)
+
+# Bounded pool that runs hash verification off the request thread
+PASSWORD_VERIFY_WORKERS = config("PASSWORD_VERIFY_WORKERS", default=2, cast=int)
+PASSWORD_VERIFY_MAX_PENDING = config("PASSWORD_VERIFY_MAX_PENDING", default=16, cast=int)
+PASSWORD_VERIFY_TIMEOUT = config("PASSWORD_VERIFY_TIMEOUT", default=5, cast=int)
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -143,18 +300,26 @@ AUTH_USER_MODEL = "base.User"
 # REST Framework Configuration
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "base.utils.authentication.RevocableJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # Token-bucket sizes for base.utils.throttling; "10/min" = burst of 10, refilled at 10 per minute
+    "DEFAULT_THROTTLE_RATES": {
+        "login_ip": config("THROTTLE_LOGIN_IP", default="30/min"),
+        "login_phone": config("THROTTLE_LOGIN_PHONE", default="5/min"),
+        "signup_ip": config("THROTTLE_SIGNUP_IP", default="10/hour"),
+        "signup_phone": config("THROTTLE_SIGNUP_PHONE", default="3/hour"),
+    },
+    "NUM_PROXIES": config("NUM_PROXIES", default=None, cast=lambda v: None if v in (None, "") else int(v)),
 }
 
 # JWT Configuration
 from datetime import timedelta
 
 SIMPLE_JWT = {
-    "ACCESS_TOKEN_LIFETIME": timedelta(days=7),
+    "ACCESS_TOKEN_LIFETIME": timedelta(minutes=config("JWT_ACCESS_TOKEN_MINUTES", default=7 * 24 * 60, cast=int)),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=30),
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
@@ -180,6 +345,32 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_REFRESH_LIFETIME": timedelta(days=30),
 }
 
+# Revoked access tokens are checked against an in-memory Bloom filter per worker.
+# New revocations are pulled every REVOKED_TOKEN_SYNC_SECONDS; expired ones are dropped on a full rebuild.
+REVOKED_TOKEN_SYNC_SECONDS = config("REVOKED_TOKEN_SYNC_SECONDS", default=15, cast=int)
+# Each sync also re-reads revocations this much older than the previous one, catching rows that
+# committed late and clock skew between hosts
+REVOKED_TOKEN_SYNC_OVERLAP_SECONDS = config("REVOKED_TOKEN_SYNC_OVERLAP_SECONDS", default=60, cast=int)
+REVOKED_TOKEN_REBUILD_SECONDS = config("REVOKED_TOKEN_REBUILD_SECONDS", default=600, cast=int)
+REVOKED_TOKEN_FILTER_CAPACITY = config("REVOKED_TOKEN_FILTER_CAPACITY", default=100_000, cast=int)
+
+# Idempotency-Key handling for retried POSTs (base.utils.idempotency)
+IDEMPOTENCY_WAIT_SECONDS = config("IDEMPOTENCY_WAIT_SECONDS", default=60, cast=int)
+IDEMPOTENCY_POLL_SECONDS = config("IDEMPOTENCY_POLL_SECONDS", default=0.25, cast=float)
+IDEMPOTENCY_LOCK_TIMEOUT = config("IDEMPOTENCY_LOCK_TIMEOUT", default=600, cast=int)
+IDEMPOTENCY_KEY_TTL_HOURS = config("IDEMPOTENCY_KEY_TTL_HOURS", default=24, cast=int)
+
+# Monthly partitions of media_library_items (base.utils.partitions, manage.py partition_media_items)
+# Partitions are created this many months ahead; run `partition_media_items ensure` at least monthly.
+MEDIA_ITEMS_PARTITION_MONTHS_AHEAD = config("MEDIA_ITEMS_PARTITION_MONTHS_AHEAD", default=3, cast=int)
+# Partition DDL gives up instead of queueing behind long queries while blocking other writers
+MEDIA_ITEMS_PARTITION_LOCK_TIMEOUT_MS = config("MEDIA_ITEMS_PARTITION_LOCK_TIMEOUT_MS", default=5000, cast=int)
+# Detached months move to this tablespace (e.g. on cheaper disks) when set
+MEDIA_ITEMS_ARCHIVE_TABLESPACE = config("MEDIA_ITEMS_ARCHIVE_TABLESPACE", default="")
+# Archived months are written to the media bucket as <prefix>/<partition>.csv.gz
+MEDIA_ITEMS_ARCHIVE_S3_PREFIX = config("MEDIA_ITEMS_ARCHIVE_S3_PREFIX", default="archive/media_library_items")
+MEDIA_ITEMS_ARCHIVE_STORAGE_CLASS = config("MEDIA_ITEMS_ARCHIVE_STORAGE_CLASS", default="GLACIER_IR")
+
 # AWS S3 Configuration
 # TODO
 AWS_ACCESS_KEY_ID = config("AWS_ACCESS_KEY_ID")
@@ -187,6 +378,10 @@ AWS_SECRET_ACCESS_KEY = config("AWS_SECRET_ACCESS_KEY")
 AWS_STORAGE_BUCKET_NAME = config("AWS_STORAGE_BUCKET_NAME")
 AWS_S3_REGION_NAME = config("AWS_S3_REGION_NAME", default="ap-south-1")
 AWS_S3_CUSTOM_DOMAIN = f"{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com"
+# Write objects to this directory instead of S3 (offline benchmarks, load tests, local
+# development); see base.utils.local_s3. The latency is added to every call.
+AWS_S3_LOCAL_DIR = config("AWS_S3_LOCAL_DIR", default="")
+AWS_S3_LOCAL_LATENCY_MS = config("AWS_S3_LOCAL_LATENCY_MS", default=0, cast=int)
 
 AWS_DEFAULT_ACL = None
 AWS_S3_FILE_OVERWRITE = False
@@ -197,7 +392,10 @@ AWS_S3_OBJECT_PARAMETERS = {
 }
 
 # Debug Toolbar Configuration
+# Dev-only: production workers never import the toolbar or run its middleware
 if DEBUG:
+    INSTALLED_APPS += ["debug_toolbar"]
+    MIDDLEWARE.insert(MIDDLEWARE.index("corsheaders.middleware.CorsMiddleware") + 1, "debug_toolbar.middleware.DebugToolbarMiddleware")
     INTERNAL_IPS = [
         "127.0.0.1",
         "localhost",
@@ -24,7 +24,26 @@ import rd_studio_backend.view as views
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("base.urls")),
-    path("api/health/", views.HealthView.as_view(), name="health"),
+    path(
+        "api/health/",
+        views.async_health if settings.ASYNC_VIEWS else views.HealthView.as_view(),
+        name="health",
+    ),
+    path(
+        "api/health/live/",
+        views.async_health if settings.ASYNC_VIEWS else views.HealthView.as_view(),
+        name="health-live",
+    ),
+    path(
+        "api/health/ready/",
+        views.async_readiness if settings.ASYNC_VIEWS else views.readiness,
+        name="health-ready",
+    ),
+    path("api/db-pool-stats/", views.DatabasePoolStatsView.as_view(), name="db-pool-stats"),
+    path("api/cache-stats/", views.CacheStatsView.as_view(), name="cache-stats"),
+    path("api/profiles/", views.ProfileListView.as_view(), name="profiles"),
+    path("api/profiles/<str:profile_id>/", views.ProfileDetailView.as_view(), name="profile-detail"),
+    path("metrics/", views.metrics, name="metrics"),
 ]
 
 if settings.DEBUG:
@@ -1,11 +1,22 @@
-from rest_framework.permissions import AllowAny
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework import status
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from base.utils.authentication import RevocableJWTAuthentication
+from base.utils.cache import get_cache_stats
+from base.utils.db_pool import get_pool_stats
+from base.utils.health import get_readiness
+from base.utils.metrics import render_metrics
+from base.utils.profiling import folded_stacks, list_slowest_profiles, load_profile
+
 
 class HealthView(APIView):
     """
-    Public health-check endpoint.
+    Public liveness endpoint: answers as long as the worker does (see `readiness`).
 
     This view explicitly disables authentication and allows any caller,
     bypassing the global DRF auth/permission configuration.
@@ -16,3 +27,139 @@ class HealthView(APIView):
 
     def get(self, request):
         return Response({"message": "OK"})
+
+
+async def async_health(request):
+    """Async twin of HealthView, routed when ASYNC_VIEWS is enabled."""
+    return JsonResponse({"message": "OK"})
+
+
+def readiness(request):
+    """
+    Public readiness endpoint: 200 while this worker's dependencies are healthy, 503 otherwise.
+
+    Serves the result cached by base.utils.health's background refresher, so a
+    probe never touches the database or S3 itself.
+    """
+    return _readiness_response(get_readiness())
+
+
+async def async_readiness(request):
+    """Async twin of `readiness`, routed when ASYNC_VIEWS is enabled."""
+    return _readiness_response(get_readiness())
+
+
+def _readiness_response(result):
+    response = JsonResponse(result, status=200 if result["ready"] else 503)
+    if not result["ready"]:
+        # An expected answer, not a server error: keep django.request from logging every probe.
+        # base.utils.health logs when a check starts failing.
+        response._has_been_logged = True
+    return response
+
+
+class DatabasePoolStatsView(APIView):
+    """Connection-pool counters of the worker that serves the request (admins only)."""
+
+    authentication_classes = [RevocableJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        current_user = request.user
+        if current_user.role not in [3, 4]:
+            return Response(
+                {"error": "You are not authorized to access this endpoint"}, status=status.HTTP_403_FORBIDDEN
+            )
+        return Response(
+            {"message": "Database pool stats retrieved successfully", "stats": get_pool_stats()},
+            status=status.HTTP_200_OK,
+        )
+
+
+class CacheStatsView(APIView):
+    """Per-namespace hit/miss/eviction counters of the worker that serves the request (admins only)."""
+
+    authentication_classes = [RevocableJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        current_user = request.user
+        if current_user.role not in [3, 4]:
+            return Response(
+                {"error": "You are not authorized to access this endpoint"}, status=status.HTTP_403_FORBIDDEN
+            )
+        return Response(
+            {"message": "Cache stats retrieved successfully", "stats": get_cache_stats()},
+            status=status.HTTP_200_OK,
+        )
+
+
+class ProfileListView(APIView):
+    """
+    Slowest recent request profiles on this host (admins only).
+
+    Query params: `limit` (default 20, max 200), `hours` (default: the whole
+    retention window) and `view` (URL name, e.g. "media").
+    """
+
+    authentication_classes = [RevocableJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        current_user = request.user
+        if current_user.role not in [3, 4]:
+            return Response(
+                {"error": "You are not authorized to access this endpoint"}, status=status.HTTP_403_FORBIDDEN
+            )
+        try:
+            limit = min(int(request.query_params.get("limit", 20)), 200)
+            hours = request.query_params.get("hours")
+            hours = float(hours) if hours else None
+        except ValueError:
+            return Response({"error": "limit and hours must be numbers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        profiles = list_slowest_profiles(limit=limit, hours=hours, view=request.query_params.get("view") or None)
+        return Response(
+            {"message": "Profiles retrieved successfully", "profiles": profiles},
+            status=status.HTTP_200_OK,
+        )
+
+
+class ProfileDetailView(APIView):
+    """
+    One stored profile (admins only).
+
+    `?output=folded` returns the stack samples as folded text for flamegraph.pl
+    or speedscope instead of the JSON document.
+    """
+
+    authentication_classes = [RevocableJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, profile_id):
+        current_user = request.user
+        if current_user.role not in [3, 4]:
+            return Response(
+                {"error": "You are not authorized to access this endpoint"}, status=status.HTTP_403_FORBIDDEN
+            )
+        profile = load_profile(profile_id)
+        if profile is None:
+            return Response({"error": "Profile not found"}, status=status.HTTP_404_NOT_FOUND)
+        if request.query_params.get("output") == "folded":
+            return HttpResponse(folded_stacks(profile), content_type="text/plain; charset=utf-8")
+        return Response({"message": "Profile retrieved successfully", "profile": profile}, status=status.HTTP_200_OK)
+
+
+def metrics(request):
+    """
+    Prometheus scrape endpoint.
+
+    Open by default so a sidecar scraper needs no JWT; set METRICS_TOKEN to
+    require `Authorization: Bearer <token>`.
+    """
+    if settings.METRICS_TOKEN and not constant_time_compare(
+        request.headers.get("Authorization", ""), f"Bearer {settings.METRICS_TOKEN}"
+    ):
+        return HttpResponse(status=401)
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
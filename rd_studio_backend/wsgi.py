@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rd_studio_backend.settings')
 
 application = get_wsgi_application()
+
+# Tune the password hasher once per process instead of on the first login request
+from base.utils.passwords import calibrate_hasher  # noqa: E402
+
+calibrate_hasher()